@@ -2,30 +2,149 @@
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
 -- Table: device_telemetry (Hot Data / Recent)
--- Stores the validated telemetry data temporarily or permanently depending on retention policy
+-- Range-partitioned by day (UTC) on `timestamp`. Partitions are created ahead
+-- of time and dropped once their rows are confirmed in the Parquet archive
+-- (app/services/retention.py), so old data leaves with a DROP TABLE instead
+-- of a DELETE and indexes stay the size of the hot window.
+-- The partition key must be part of the primary key.
 CREATE TABLE IF NOT EXISTS device_telemetry (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     device_id VARCHAR(50) NOT NULL,
     patient_id_hash VARCHAR(64) NOT NULL, -- PII Hashed
     timestamp TIMESTAMPTZ NOT NULL,
     heart_rate INTEGER NOT NULL,
     spo2 FLOAT NOT NULL,
     battery_level FLOAT NOT NULL,
-    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Catches readings outside every daily partition (e.g. device clock skew)
+CREATE TABLE IF NOT EXISTS device_telemetry_default PARTITION OF device_telemetry DEFAULT;
 
 -- Index for time-series queries
 CREATE INDEX idx_telemetry_device_time ON device_telemetry(device_id, timestamp DESC);
 
 -- Table: anomalies (AI Results)
--- Stores only high-risk events detected by the Isolation Forest
+-- Stores only high-risk events detected by the Isolation Forest.
+-- Range-partitioned by day (UTC) on `detected_at`. telemetry_id is not a
+-- foreign key: a reference into a partitioned table would need the reading's
+-- timestamp too, and would stop telemetry partitions from being dropped.
 CREATE TABLE IF NOT EXISTS anomalies (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    telemetry_id UUID REFERENCES device_telemetry(id),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    telemetry_id UUID,
     device_id VARCHAR(50) NOT NULL,
     anomaly_score FLOAT NOT NULL,
     risk_level VARCHAR(20) NOT NULL CHECK (risk_level IN ('LOW', 'MEDIUM', 'HIGH')),
-    detected_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+    detected_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, detected_at)
+) PARTITION BY RANGE (detected_at);
+
+CREATE TABLE IF NOT EXISTS anomalies_default PARTITION OF anomalies DEFAULT;
+
+-- Keyset pagination of the alert feed: ORDER BY detected_at DESC, id DESC
+CREATE INDEX idx_anomalies_feed ON anomalies(detected_at DESC, id DESC);
+
+-- Filtered feeds (risk level / per device); the per-device index also serves
+-- the assistant's context lookups
+CREATE INDEX idx_anomalies_risk ON anomalies(risk_level, detected_at DESC, id DESC);
+CREATE INDEX idx_anomalies_device_time ON anomalies(device_id, detected_at DESC, id DESC);
+
+-- Tables: telemetry_rollup_1m / _1h / _1d (Dashboard Downsampling)
+-- Per-device vitals per bucket, merged incrementally from the ingest path
+-- (app/services/rollups.py). Sums and counts are stored instead of averages
+-- so partial aggregates from several workers combine exactly.
+-- Minute buckets are partitioned by day and expire; hours and days are small.
+CREATE TABLE IF NOT EXISTS telemetry_rollup_1m (
+    device_id VARCHAR(50) NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    n BIGINT NOT NULL,
+    hr_sum FLOAT NOT NULL,
+    hr_min FLOAT NOT NULL,
+    hr_max FLOAT NOT NULL,
+    spo2_sum FLOAT NOT NULL,
+    spo2_min FLOAT NOT NULL,
+    spo2_max FLOAT NOT NULL,
+    PRIMARY KEY (device_id, bucket)
+) PARTITION BY RANGE (bucket);
+
+CREATE TABLE IF NOT EXISTS telemetry_rollup_1m_default PARTITION OF telemetry_rollup_1m DEFAULT;
+
+CREATE TABLE IF NOT EXISTS telemetry_rollup_1h (
+    device_id VARCHAR(50) NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    n BIGINT NOT NULL,
+    hr_sum FLOAT NOT NULL,
+    hr_min FLOAT NOT NULL,
+    hr_max FLOAT NOT NULL,
+    spo2_sum FLOAT NOT NULL,
+    spo2_min FLOAT NOT NULL,
+    spo2_max FLOAT NOT NULL,
+    PRIMARY KEY (device_id, bucket)
 );
 
-CREATE INDEX idx_anomalies_risk ON anomalies(risk_level);
\ No newline at end of file
+CREATE TABLE IF NOT EXISTS telemetry_rollup_1d (
+    device_id VARCHAR(50) NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    n BIGINT NOT NULL,
+    hr_sum FLOAT NOT NULL,
+    hr_min FLOAT NOT NULL,
+    hr_max FLOAT NOT NULL,
+    spo2_sum FLOAT NOT NULL,
+    spo2_min FLOAT NOT NULL,
+    spo2_max FLOAT NOT NULL,
+    PRIMARY KEY (device_id, bucket)
+);
+
+-- Creates the daily partitions <parent>_pYYYYMMDD for `days` days starting at
+-- `first_day` (UTC bounds), skipping ones that exist. Rows that already
+-- landed in the default partition for a new day are moved into it.
+-- Returns the number of partitions created.
+CREATE OR REPLACE FUNCTION create_daily_partitions(parent TEXT, first_day DATE, days INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    key_column TEXT;
+    day DATE;
+    partition_name TEXT;
+    lower_bound TIMESTAMPTZ;
+    upper_bound TIMESTAMPTZ;
+    has_rows BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    SELECT a.attname INTO key_column
+    FROM pg_partitioned_table p
+    JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+    WHERE p.partrelid = parent::regclass;
+
+    FOR i IN 0..days - 1 LOOP
+        day := first_day + i;
+        partition_name := format('%s_p%s', parent, to_char(day, 'YYYYMMDD'));
+        CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+
+        lower_bound := day::timestamp AT TIME ZONE 'UTC';
+        upper_bound := (day + 1)::timestamp AT TIME ZONE 'UTC';
+
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= $1 AND %I < $2)', parent || '_default', key_column, key_column)
+        INTO has_rows USING lower_bound, upper_bound;
+
+        IF has_rows THEN
+            -- Attaching would fail while the default partition holds rows of this day
+            EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name, parent);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                parent || '_default', key_column, key_column, partition_name
+            ) USING lower_bound, upper_bound;
+            EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', parent, partition_name, lower_bound, upper_bound);
+        ELSE
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)', partition_name, parent, lower_bound, upper_bound);
+        END IF;
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Yesterday through a week ahead; the retention job keeps the window rolling
+SELECT create_daily_partitions('device_telemetry', (now() AT TIME ZONE 'UTC')::date - 1, 9);
+SELECT create_daily_partitions('anomalies', (now() AT TIME ZONE 'UTC')::date - 1, 9);
+SELECT create_daily_partitions('telemetry_rollup_1m', (now() AT TIME ZONE 'UTC')::date - 1, 9);
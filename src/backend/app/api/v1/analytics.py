@@ -1,10 +1,181 @@
-from fastapi import APIRouter
+import asyncio
+import base64
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.domain.schemas import DEVICE_ID_PATTERN
+from app.services.alerts import alert_hub
+from app.services.history import ARCHIVE_COLUMNS, DEFAULT_COLUMNS, as_utc, history_schema, ipc_stream, list_partition_files, read_history
+from app.services.object_store import create_object_store
+from app.services.rollups import choose_resolution
 from app.services.storage import storage
 
 router = APIRouter()
 
+# Rows per NDJSON chunk when streaming archive results
+STREAM_CHUNK_ROWS = 10_000
+
+def encode_cursor(row: dict) -> str:
+    """Opaque pagination cursor for a row: its (detected_at, id) keyset position."""
+    raw = f"{row['detected_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        detected_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(detected_at), uuid.UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/anomalies")
-async def get_anomalies():
-    """Returns the latest high-risk alerts."""
-    data = await storage.get_recent_anomalies()
-    return {"data": data}
\ No newline at end of file
+async def get_anomalies(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Cursor: page of alerts older than this one (use next_cursor)"),
+    before: Optional[str] = Query(None, description="Cursor: page of alerts newer than this one"),
+    since: Optional[str] = Query(None, description="Cursor: incremental poll, only alerts newer than this one (use latest_cursor)"),
+    device_id: Optional[str] = None,
+    risk_level: Optional[Literal["LOW", "MEDIUM", "HIGH"]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """
+    Returns high-risk alerts, newest first, with keyset pagination.
+    Poll cheaply by passing the previous response's `latest_cursor` as `since`
+    and its ETag as If-None-Match (304 when nothing changed).
+    """
+    if sum(c is not None for c in (after, before, since)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of 'after', 'before' or 'since'")
+
+    newer_cursor = since or before
+    rows, has_more = await storage.get_anomalies_page(
+        limit=limit,
+        older_than=decode_cursor(after) if after else None,
+        newer_than=decode_cursor(newer_cursor) if newer_cursor else None,
+        device_id=device_id,
+        risk_level=risk_level,
+        start=start,
+        end=end
+    )
+
+    body = jsonable_encoder({
+        "data": rows,
+        "has_more": has_more,
+        # Older page (only meaningful when paging backwards in time)
+        "next_cursor": encode_cursor(rows[-1]) if rows and has_more and not newer_cursor else None,
+        # Newest alert seen so far: pass as ?since= on the next poll
+        "latest_cursor": encode_cursor(rows[0]) if rows else newer_cursor
+    })
+    payload = json.dumps(body, separators=(",", ":")).encode()
+
+    etag = f'W/"{hashlib.sha256(payload).hexdigest()[:32]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag})
+
+@router.get("/anomalies/stream")
+async def stream_anomalies(
+    device_id: Optional[List[str]] = Query(None, description="Only alerts for these devices"),
+    risk_level: List[Literal["MEDIUM", "HIGH"]] = Query(["HIGH"], description="Risk levels to receive")
+):
+    """
+    Live alerts pushed from the ingest path as Server-Sent Events.
+    If the client falls too far behind, the server sends `event: dropped`
+    and closes the stream; reconnect and resync with GET /anomalies?since=.
+    """
+    subscriber = alert_hub.subscribe(device_ids=device_id, risk_levels=risk_level)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    alert = await subscriber.next(timeout=settings.ALERT_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n" # Keeps proxies from closing idle streams
+                    continue
+                if alert is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield f"id: {alert['id']}\ndata: {json.dumps(alert)}\n\n"
+        finally:
+            alert_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/telemetry/series")
+async def get_telemetry_series(
+    device_id: str,
+    start: datetime,
+    end: datetime,
+    points: int = Query(500, ge=1, le=settings.ROLLUP_MAX_POINTS, description="Minimum number of points wanted across the range")
+):
+    """
+    Downsampled heart rate / SpO2 (min, avg, max per bucket) for trend charts,
+    read from the incrementally maintained rollups. The coarsest of 1m/1h/1d
+    that still gives `points` buckets over the range is used, capped at
+    ROLLUP_MAX_POINTS buckets per response.
+    """
+    # Naive bounds are UTC; comparing naive with aware would raise
+    start, end = as_utc(start), as_utc(end)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'end' must not be before 'start'")
+
+    oldest_minute = datetime.now(timezone.utc) - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+    resolution = choose_resolution(start, end, points, settings.ROLLUP_MAX_POINTS, oldest_minute)
+
+    rows = await storage.get_rollup_series(device_id, resolution, start, end)
+    return {"device_id": device_id, "resolution": resolution, "points": rows}
+
+@router.get("/archive/telemetry")
+async def query_archive(
+    start: datetime,
+    end: datetime,
+    device_id: str = Query(..., pattern=DEVICE_ID_PATTERN),
+    columns: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(ARCHIVE_COLUMNS)}"),
+    format: Literal["ndjson", "arrow"] = "ndjson",
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    Historical telemetry for one device from the cold Parquet archive.
+    Streams NDJSON (one reading per line) or an Arrow IPC stream, reading one
+    hour partition at a time.
+    """
+    start, end = as_utc(start), as_utc(end)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'end' must not be before 'start'")
+    if (end - start).days > settings.ARCHIVE_QUERY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range exceeds {settings.ARCHIVE_QUERY_MAX_DAYS} days")
+
+    selected = [c.strip() for c in columns.split(",")] if columns else DEFAULT_COLUMNS
+    unknown = set(selected) - set(ARCHIVE_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(sorted(unknown))}")
+
+    # Listing partitions talks to MinIO synchronously; keep it off the event loop
+    store = storage.archive_store or create_object_store(settings.MINIO_BUCKET_RAW)
+    partitions = await run_in_threadpool(list_partition_files, store, device_id, start, end)
+
+    # Sync generators are iterated in a worker thread by StreamingResponse,
+    # so the scan itself never blocks the event loop either.
+    frames = read_history(store, partitions, start, end, selected, limit)
+    if format == "arrow":
+        return StreamingResponse(ipc_stream(frames, history_schema(selected)), media_type="application/vnd.apache.arrow.stream")
+
+    def ndjson_stream():
+        for frame in frames:
+            for chunk in frame.iter_slices(n_rows=STREAM_CHUNK_ROWS):
+                yield chunk.write_ndjson()
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
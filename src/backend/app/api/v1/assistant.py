@@ -1,41 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from openai import AsyncOpenAI
+from typing import Optional, Tuple
 from app.core.config import settings
 from app.services.context import get_device_context
-from app.services.report import generate_medical_pdf
+from app.services.llm import create_llm_client
+from app.services.response_cache import ResponseCache, make_cache_key
+from app.services.report import ReportBusyError, report_renderer
+import asyncio
+import json
 import re
 import logging
+from contextlib import aclosing
 
 # Initialize Router
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI Client
-# We check if the key exists to prevent startup errors, though Settings usually enforces it.
-client = None
-if settings.OPENAI_API_KEY:
-    client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+# Initialize LLM Client (OpenAI, or the offline stand-in when LLM_BACKEND="fake")
+client = create_llm_client()
 
-class ChatRequest(BaseModel):
-    message: str
-
-@router.post("/chat")
-async def chat_with_assistant(req: ChatRequest):
-    """
-    Context-Aware Chatbot endpoint.
-    1. Parses user message for Device IDs (e.g., WEARABLE-007).
-    2. Fetches real-time telemetry context from Postgres.
-    3. Sends prompt + context to OpenAI GPT-4o-mini.
-    """
-    if not client:
-        raise HTTPException(status_code=503, detail="OpenAI API Key not configured.")
+# Shared answers for identical questions about identical device context
+response_cache = ResponseCache(
+    max_entries=settings.CHAT_CACHE_MAX_ENTRIES,
+    ttl_s=settings.CHAT_CACHE_TTL_S
+)
 
-    user_query = req.message
-    
-    # System Prompt Engineering
-    system_context = """
+# System Prompt Engineering
+SYSTEM_PROMPT = """
     You are BioStream Sentinel, an advanced AI assistant for cardiac monitoring.
     Your goal is to assist clinicians in analyzing patient telemetry.
     
@@ -47,59 +39,181 @@ async def chat_with_assistant(req: ChatRequest):
     - If no data is provided, answer general medical questions but state you lack specific patient context.
     """
 
-    # 1. Detect Device ID (Regex matches WEARABLE-001 to WEARABLE-999)
+class ChatRequest(BaseModel):
+    message: str
+
+def detect_device_id(user_query: str) -> Optional[str]:
+    """Detect Device ID (Regex matches WEARABLE-001 to WEARABLE-999)."""
     # Simulator uses WEARABLE-XXX format.
     device_match = re.search(r"(WEARABLE-\d{3})", user_query, re.IGNORECASE)
-    
-    if device_match:
-        device_id = device_match.group(1).upper()
-        logger.info(f"AI: Detected intent for device {device_id}")
-        
+    return device_match.group(1).upper() if device_match else None
+
+async def build_system_context(device_id: Optional[str], context_task: Optional[asyncio.Task]) -> Tuple[str, bool]:
+    """
+    Appends the device's live telemetry (RAG) to the system prompt.
+    Returns the prompt and whether it is cacheable (the lookup did not fail).
+    """
+    system_context = SYSTEM_PROMPT
+
+    if device_id:
         # RAG: Fetch DB Data
         try:
-            db_context = await get_device_context(device_id)
+            db_context = await context_task
             system_context += f"\n\n--- CURRENT PATIENT DATA ({device_id}) ---\n{db_context}\n-----------------------------------"
         except Exception as e:
             logger.error(f"AI: Failed to fetch context: {e}")
             system_context += f"\n\n(System Error: Could not retrieve live data for {device_id})"
+            return system_context, False
     else:
         system_context += "\n\n(No specific device ID detected in query. Answer based on general medical knowledge.)"
 
-    # 2. Call OpenAI API
+    return system_context, True
+
+def start_context_lookup(device_id: Optional[str]) -> Optional[asyncio.Task]:
+    if not device_id:
+        return None
+    logger.info(f"AI: Detected intent for device {device_id}")
+    return asyncio.create_task(get_device_context(device_id))
+
+def completion_args(system_context: str, user_query: str) -> dict:
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": system_context},
+            {"role": "user", "content": user_query}
+        ],
+        temperature=0.3, # Low temperature for more deterministic/factual answers
+        max_tokens=500
+    )
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/chat")
+async def chat_with_assistant(req: ChatRequest):
+    """
+    Context-Aware Chatbot endpoint.
+    1. Parses user message for Device IDs (e.g., WEARABLE-007).
+    2. Fetches real-time telemetry context from Postgres.
+    3. Sends prompt + context to OpenAI GPT-4o-mini.
+    """
+    if not client:
+        raise HTTPException(status_code=503, detail="OpenAI API Key not configured.")
+
+    user_query = req.message
+
+    # 1. Detect Device ID + RAG lookup
+    device_id = detect_device_id(user_query)
+    system_context, cacheable = await build_system_context(device_id, start_context_lookup(device_id))
+
+    async def complete() -> str:
+        response = await client.chat.completions.create(**completion_args(system_context, user_query))
+        return response.choices[0].message.content
+
+    # 2. Call OpenAI API (cached, with concurrent identical requests sharing one call)
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_context},
-                {"role": "user", "content": user_query}
-            ],
-            temperature=0.3, # Low temperature for more deterministic/factual answers
-            max_tokens=500
-        )
-        return {"reply": response.choices[0].message.content}
+        if not cacheable:
+            return {"reply": await complete()}
+        reply = await response_cache.get_or_compute(make_cache_key(user_query, system_context), complete)
+        return {"reply": reply}
         
     except Exception as e:
         logger.error(f"AI: OpenAI Error: {e}")
         raise HTTPException(status_code=500, detail=f"AI Service Error: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_with_assistant_stream(req: ChatRequest, request: Request):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+    Emits `data: {"token": ...}` events as tokens arrive from the model,
+    then `event: done`. The device-context lookup starts before the response
+    opens, so it overlaps with the client receiving headers. Cached replies
+    are sent as a single token event; concurrent identical questions share
+    one upstream stream, which is cancelled once all of their clients leave.
+    """
+    if not client:
+        raise HTTPException(status_code=503, detail="OpenAI API Key not configured.")
+
+    user_query = req.message
+    device_id = detect_device_id(user_query)
+    context_task = start_context_lookup(device_id)
+
+    async def event_stream():
+        try:
+            # Flush headers immediately so the client knows the request is alive
+            yield ": connected\n\n"
+
+            system_context, cacheable = await build_system_context(device_id, context_task)
+
+            async def produce():
+                stream = await client.chat.completions.create(
+                    **completion_args(system_context, user_query),
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        token = chunk.choices[0].delta.content if chunk.choices else None
+                        if token:
+                            yield token
+                finally:
+                    await stream.close() # Stops token generation upstream
+
+            # Cached, or shared with concurrent identical requests (one upstream call)
+            tokens = response_cache.stream_or_compute(make_cache_key(user_query, system_context), produce) if cacheable else produce()
+            async with aclosing(tokens):
+                async for token in tokens:
+                    if await request.is_disconnected():
+                        logger.info("AI: Client disconnected, leaving completion")
+                        return
+                    yield sse_event({"token": token})
+            yield sse_event({}, event="done")
+
+        except Exception as e:
+            logger.error(f"AI: OpenAI Error: {e}")
+            yield sse_event({"detail": f"AI Service Error: {str(e)}"}, event="error")
+
+        finally:
+            # Runs on normal completion, errors and client disconnects (cancellation)
+            if context_task and not context_task.done():
+                context_task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat/cache-stats")
+async def chat_cache_stats():
+    """Hit/miss counters of the assistant response cache (for TTL/size tuning)."""
+    return response_cache.stats()
+
 @router.post("/generate-report")
 async def create_report(req: ChatRequest):
     """
     Generates a PDF report based on the AI's explanation or raw text.
-    Returns a downloadable PDF stream.
+    Returns the PDF as a download (ReportLab builds the whole document, so it
+    is sent in one response rather than streamed).
     """
     try:
-        # Generate PDF in-memory using ReportLab
-        pdf_buffer = generate_medical_pdf("AI-GENERATED CLINICAL REPORT", req.message)
-        
-        return StreamingResponse(
-            pdf_buffer, 
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=clinical_report.pdf",
-                "Access-Control-Expose-Headers": "Content-Disposition"
-            }
+        # Rendered in a worker process (ReportLab is CPU-bound), cached by content hash
+        pdf_bytes = await report_renderer.render("AI-GENERATED CLINICAL REPORT", req.message)
+    except ReportBusyError:
+        raise HTTPException(
+            status_code=503,
+            detail="Report generation is busy, please retry",
+            headers={"Retry-After": str(int(settings.REPORT_QUEUE_TIMEOUT_S))}
         )
     except Exception as e:
         logger.error(f"PDF Generation Error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate PDF report")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to generate PDF report")
+
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": "attachment; filename=clinical_report.pdf",
+            "Access-Control-Expose-Headers": "Content-Disposition"
+        }
+    )
@@ -1,26 +1,145 @@
-from fastapi import APIRouter, Depends, Request
-from app.domain.schemas import TelemetryPayload, IngestionResponse
+import io
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from app.core.config import settings
+from app.core.logging import routine_logger
+from app.core.metrics import INGEST_STAGE_SECONDS, READINGS_TOTAL
+from app.domain.schemas import TelemetryPayload, IngestionResponse, BatchIngestionResponse, BatchItemAssessment
+from app.services.admission import IngestOverloadedError, admission
 from app.services.detector import detector # Import the singleton
+from app.services.features import feature_store
 from app.services.storage import storage # Import storage
 import logging
 
+if TYPE_CHECKING:
+    import polars as pl
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/telemetry", response_model=IngestionResponse, status_code=202)
-async def ingest_telemetry(payload: TelemetryPayload, request: Request):
+TELEMETRY_BATCH = TypeAdapter(List[TelemetryPayload])
+
+# Compact binary alternatives to JSON, selected by Content-Type
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+def request_body(content: dict) -> dict:
+    """OpenAPI request body for routes that validate the body themselves."""
+    return {"requestBody": {"required": True, "content": content}}
+
+def media_type(request: Request) -> str:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+def invalid_body(error_type: str, msg: str) -> RequestValidationError:
+    return RequestValidationError([{"type": error_type, "loc": ("body",), "msg": msg, "input": None}])
+
+def decode_msgpack_payload(body: bytes) -> TelemetryPayload:
+    """One MessagePack map -> TelemetryPayload (msgpack timestamps or ISO strings)."""
+    import msgpack
+    try:
+        data = msgpack.unpackb(body, timestamp=3)
+    except Exception as e:
+        raise invalid_body("msgpack_invalid", f"Invalid MessagePack body: {e}")
+    return TelemetryPayload.model_validate(data)
+
+def decode_arrow_batch(body: bytes) -> "pl.DataFrame":
+    """
+    Arrow IPC stream -> validated columnar batch. The biological constraints
+    are checked with column expressions; no per-row models are built.
+    """
+    # Polars is only loaded once a gateway actually sends Arrow
+    import polars as pl
+    from app.domain.columnar import validate_telemetry_frame
+    try:
+        df = pl.read_ipc_stream(io.BytesIO(body))
+    except Exception as e:
+        raise invalid_body("arrow_invalid", f"Invalid Arrow IPC stream: {e}")
+    check_batch_size(df.height)
+    frame, errors = validate_telemetry_frame(df)
+    if errors:
+        raise RequestValidationError(errors)
+    return frame
+
+def decode_json_batch(body: bytes) -> List[TelemetryPayload]:
+    """
+    JSON array -> payloads. The array is parsed into plain values first so
+    an oversized batch is refused before any per-item model is built.
+    """
+    try:
+        items = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise invalid_body("json_invalid", f"Invalid JSON body: {e}")
+    if isinstance(items, list):
+        check_batch_size(len(items))
+    return TELEMETRY_BATCH.validate_python(items)
+
+def check_batch_size(n: int):
+    if n > settings.INGEST_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n} readings exceeds limit of {settings.INGEST_BATCH_MAX_SIZE}"
+        )
+
+def check_body_size(request: Request):
+    """Refuses a batch by its declared Content-Length, before the body is read."""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > settings.INGEST_BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Body of {length} bytes exceeds limit of {settings.INGEST_BATCH_MAX_BYTES}"
+        )
+
+async def parse_body(request: Request, validate):
+    """
+    Validates the raw body inside the route (rather than via a typed
+    parameter) so validation time is measured as its own ingest stage and
+    the decoder can follow the Content-Type.
+    Errors are reported exactly like FastAPI's own 422 responses.
+    """
+    body = await request.body()
+    with INGEST_STAGE_SECONDS.time(stage="validate"):
+        try:
+            return validate(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+                body=body
+            )
+
+@router.post("/telemetry", response_model=IngestionResponse, status_code=202,
+             openapi_extra=request_body({
+                 "application/json": {"schema": TelemetryPayload.model_json_schema()},
+                 MSGPACK: {"schema": TelemetryPayload.model_json_schema()}
+             }))
+async def ingest_telemetry(request: Request):
     correlation_id = getattr(request.state, "correlation_id", "unknown")
+    if media_type(request) == MSGPACK:
+        payload = await parse_body(request, decode_msgpack_payload)
+    else:
+        payload = await parse_body(request, TelemetryPayload.model_validate_json)
     
     # 1. AI Analysis
-    # We run this synchronously here for simplicity. 
+    # Rolling per-device features (trends, variability) are updated in O(1),
+    # then scored. We run this synchronously here for simplicity.
     # In high-scale production, this would be offloaded to a background worker.
-    analysis = detector.predict(
-        payload.heart_rate, 
-        payload.spo2, 
-        payload.battery_level
-    )
+    # The admission lane depends on the risk, so the update is checkpointed
+    # and rolled back if the reading is then rejected (the client retries it).
+    with INGEST_STAGE_SECONDS.time(stage="features"):
+        checkpoint = feature_store.checkpoint([payload.device_id])
+        features = feature_store.update(
+            payload.device_id,
+            (payload.heart_rate, payload.spo2, payload.battery_level)
+        )
+    with INGEST_STAGE_SECONDS.time(stage="predict"):
+        analysis = detector.predict_features(features)
     
     risk_level = analysis["risk_level"]
+    READINGS_TOTAL.inc(risk=risk_level)
     score = float(analysis["anomaly_score"]) # Ensure float for DB
     
     # 2. Logging with Context
@@ -33,18 +152,111 @@ async def ingest_telemetry(payload: TelemetryPayload, request: Request):
     
     # 3. Persistence (Async)
     # In a real app, use BackgroundTasks. Here we await to ensure data safety for the demo.
-    await storage.store_telemetry(payload, risk_level, score)
+    # Admission control bounds concurrent writes; HIGH risk takes the priority lane.
+    async with admitted(risk_level == "HIGH", checkpoint):
+        await storage.store_telemetry(payload, risk_level, score)
 
-    # FORCE PRINT TO CONSOLE FOR DEMO PURPOSES
+    # HIGH risk is always logged; routine lines are sampled (settings.LOG_ROUTINE_SAMPLE_RATE)
     if risk_level == "HIGH":
-        print(f"🚨 [ALERT] High Risk Detected! Device: {payload.device_id} | HR: {payload.heart_rate} | Score: {log_payload['score']}")
-        logger.warning(f"ANOMALY DETECTED: {payload.device_id}", extra=log_payload)
+        logger.warning(f"🚨 ANOMALY DETECTED: {payload.device_id} | HR: {payload.heart_rate} | Score: {log_payload['score']}", extra=log_payload)
     else:
-        logger.info(f"Telemetry Accepted", extra=log_payload)
+        routine_logger.info(f"Telemetry Accepted", extra=log_payload)
     
     return IngestionResponse(
         status="accepted",
         message="Telemetry processed",
         correlation_id=correlation_id,
         risk_assessment=risk_level
-    )
\ No newline at end of file
+    )
+
+@asynccontextmanager
+async def admitted(high_priority: bool, checkpoint: dict):
+    """
+    Holds an admission slot for the persistence stage; overload becomes a
+    fast 429. If the readings are not persisted (429, 503, cancellation)
+    their feature updates are rolled back, so a retry is not counted twice.
+    """
+    try:
+        try:
+            await admission.acquire(high_priority)
+        except IngestOverloadedError:
+            raise HTTPException(
+                status_code=429,
+                detail="Ingest is overloaded, please retry",
+                headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_S)}
+            )
+        try:
+            yield
+        finally:
+            admission.release()
+    except BaseException:
+        feature_store.restore(checkpoint)
+        raise
+
+@router.post("/telemetry/batch", response_model=BatchIngestionResponse, status_code=202,
+             openapi_extra=request_body({
+                 "application/json": {"schema": TELEMETRY_BATCH.json_schema()},
+                 ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}}
+             }))
+async def ingest_telemetry_batch(request: Request):
+    """
+    Gateway endpoint: accepts an array of readings in one request, as JSON
+    or as an Arrow IPC stream with one column per TelemetryPayload field.
+    The whole batch is scored with one vectorized model call and persisted
+    with a single bulk write, instead of one round trip per reading.
+    """
+    correlation_id = getattr(request.state, "correlation_id", "unknown")
+    # Oversized batches are refused before the body is parsed: by declared
+    # size here, by item count inside the decoders
+    check_body_size(request)
+
+    if media_type(request) == ARROW_STREAM:
+        from app.domain.columnar import frame_rows
+        frame = await parse_body(request, decode_arrow_batch)
+        device_ids = frame["device_id"].to_list()
+        readings = frame.select("heart_rate", "spo2", "battery_level").to_numpy().astype(np.float64)
+        payloads = frame_rows(frame)
+    else:
+        payloads = await parse_body(request, decode_json_batch)
+        device_ids = [p.device_id for p in payloads]
+        readings = np.array(
+            [(p.heart_rate, p.spo2, p.battery_level) for p in payloads],
+            dtype=np.float64
+        ).reshape(-1, 3)
+
+    # 1. AI Analysis (Vectorized)
+    # Readings update device state in order; the resulting feature matrix is scored in one call
+    with INGEST_STAGE_SECONDS.time(stage="features"):
+        checkpoint = feature_store.checkpoint(device_ids)
+        features = feature_store.update_batch(device_ids, readings)
+    with INGEST_STAGE_SECONDS.time(stage="predict"):
+        analysis = detector.predict_batch(features)
+
+    risks = analysis["risk_level"].tolist()
+    for risk in ("HIGH", "MEDIUM", "LOW"):
+        if (count := risks.count(risk)):
+            READINGS_TOTAL.inc(count, risk=risk)
+    scores = analysis["anomaly_score"].astype(float).tolist()
+
+    # 2. Persistence (Bulk)
+    # A batch holding any HIGH-risk reading is admitted on the priority lane
+    if payloads:
+        async with admitted("HIGH" in risks, checkpoint):
+            await storage.store_telemetry_batch(payloads, risks, scores)
+
+    # 3. Logging with Context
+    high_risk = [p.device_id for p, risk in zip(payloads, risks) if risk == "HIGH"]
+    for device_id in high_risk:
+        logger.warning(f"ANOMALY DETECTED: {device_id}", extra={"device_id": device_id, "risk": "HIGH"})
+    routine_logger.info(f"Telemetry Batch Accepted: {len(payloads)} readings, {len(high_risk)} high risk")
+
+    return BatchIngestionResponse(
+        status="accepted",
+        message="Telemetry batch processed",
+        correlation_id=correlation_id,
+        accepted=len(payloads),
+        results=[
+            BatchItemAssessment(device_id=p.device_id, risk_assessment=risk, anomaly_score=score)
+            for p, risk, score in zip(payloads, risks, scores)
+        ]
+    )
@@ -1,13 +1,26 @@
 import os
+from typing import List, Literal, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "BioStream Sentinel"
     VERSION: str = "0.1.0"
     API_PREFIX: str = "/api/v1"
+    # "ingest" serves ingestion + analytics only: the assistant router (OpenAI,
+    # ReportLab) is not imported or mounted, for lean ingest-only workers
+    DEPLOYMENT_PROFILE: Literal["full", "ingest"] = "full"
 
-    # OpenAI (Required for Chatbot)
-    OPENAI_API_KEY: str 
+    # OpenAI (Required for Chatbot): only the "full" profile mounts the
+    # assistant, so ingest-only workers may leave it unset
+    OPENAI_API_KEY: Optional[str] = None
+    # "fake" swaps in an offline stand-in (no key/network) for local testing
+    LLM_BACKEND: Literal["openai", "fake"] = "openai"
+    LLM_FAKE_FIRST_TOKEN_MS: float = 300.0
+    LLM_FAKE_TOKEN_MS: float = 20.0
+    # Assistant response cache (keyed on question + device context fingerprint)
+    CHAT_CACHE_TTL_S: float = 30.0
+    CHAT_CACHE_MAX_ENTRIES: int = 512
     
     # Infrastructure - Defaults are set for LOCAL development (localhost)
     # Docker will override these via environment variables
@@ -16,6 +29,23 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost" 
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "biostream_db"
+    # Optional read replica for dashboard/assistant queries (asyncpg DSN)
+    POSTGRES_READ_DSN: Optional[str] = None
+
+    # Postgres Pools
+    # Ingest writes and dashboard/assistant reads use separate pools, so a
+    # burst of reads can never hold the connections ingest needs. Reads wait
+    # at most PG_READ_ACQUIRE_TIMEOUT_S for a connection (then 503) and are
+    # cancelled server-side after PG_READ_STATEMENT_TIMEOUT_MS.
+    PG_WRITE_POOL_MIN: int = 4
+    PG_WRITE_POOL_MAX: int = 16
+    PG_WRITE_ACQUIRE_TIMEOUT_S: float = 10.0
+    PG_READ_POOL_MIN: int = 1
+    PG_READ_POOL_MAX: int = 4
+    PG_READ_ACQUIRE_TIMEOUT_S: float = 2.0
+    PG_READ_STATEMENT_TIMEOUT_MS: int = 5000
+    # Prepared statements kept per connection (asyncpg LRU, keyed by SQL text)
+    PG_STATEMENT_CACHE_SIZE: int = 256
     
     # Security
     PII_SALT: str = "default_unsafe_salt_for_dev"
@@ -28,6 +58,151 @@ class Settings(BaseSettings):
     MINIO_ROOT_PASSWORD: str = "minio_secure_pass"
     MINIO_BUCKET_RAW: str = "telemetry-raw"
 
+    # Cold Storage Archiver
+    # Uploads run on a background thread. Batches beyond the queue size, or
+    # still failing after ARCHIVE_MAX_RETRIES, are spilled to ARCHIVE_SPILL_PATH
+    # and retried every ARCHIVE_SPILL_RETRY_S (keep it on a persistent volume).
+    ARCHIVE_QUEUE_SIZE: int = 100
+    ARCHIVE_MAX_RETRIES: int = 5
+    ARCHIVE_RETRY_BACKOFF_S: float = 0.5
+    ARCHIVE_SPILL_PATH: str = "./data/archive-spill"
+    ARCHIVE_SPILL_RETRY_S: float = 30.0
+    # The API buffers readings and hands them over at ARCHIVE_BATCH_SIZE
+    # records or once the oldest has waited ARCHIVE_FLUSH_INTERVAL_S.
+    # Object names carry ARCHIVE_WORKER_ID (default <hostname>-<pid>) so
+    # backend containers never write to the same key.
+    ARCHIVE_BATCH_SIZE: int = 50
+    ARCHIVE_FLUSH_INTERVAL_S: float = 5.0
+    ARCHIVE_WORKER_ID: Optional[str] = None
+    # "minio" in deployment; "local" writes the same layout under ARCHIVE_LOCAL_PATH
+    ARCHIVE_BACKEND: Literal["minio", "local"] = "minio"
+    ARCHIVE_LOCAL_PATH: str = "./data/archive"
+    # Parquet layout (rows per row group) and compaction thresholds
+    ARCHIVE_ROW_GROUP_SIZE: int = 64_000
+    ARCHIVE_COMPACT_SMALL_FILE_BYTES: int = 8 * 1024 * 1024
+    ARCHIVE_COMPACT_MIN_FILES: int = 2
+    # Widest time range (days) a single historical archive query may span
+    ARCHIVE_QUERY_MAX_DAYS: int = 31
+
+    # Ingestion
+    # Upper bound on readings accepted by a single POST /telemetry/batch call.
+    INGEST_BATCH_MAX_SIZE: int = 1000
+    # Bodies declaring more than this (Content-Length) are refused with 413
+    # before they are read; ~1 KiB per reading leaves ample headroom
+    INGEST_BATCH_MAX_BYTES: int = 1024 * 1024
+    # Admission control: requests persisting at once. Routine readings are
+    # shed (429) beyond MAX_IN_FLIGHT - HIGH_PRIORITY_RESERVE; HIGH-risk ones
+    # may use the reserve and then queue ahead of everything else.
+    INGEST_MAX_IN_FLIGHT: int = 256
+    INGEST_HIGH_PRIORITY_RESERVE: int = 32
+    INGEST_HIGH_PRIORITY_QUEUE: int = 1024
+    INGEST_RETRY_AFTER_S: int = 1
+
+    # Hot Storage Write-Behind (opt-in)
+    # When enabled, single readings are queued and coalesced into COPY batches
+    # bounded by size (rows) and time (ms) instead of one INSERT per request.
+    # Durability "flush" acks a request only after its batch is committed;
+    # "enqueue" acks as soon as the reading is queued (faster, may lose the
+    # in-flight queue if the process crashes).
+    STORAGE_WRITE_BEHIND: bool = False
+    WRITE_BEHIND_QUEUE_SIZE: int = 10000
+    WRITE_BEHIND_MAX_BATCH: int = 500
+    WRITE_BEHIND_MAX_DELAY_MS: float = 5.0
+    WRITE_BEHIND_DURABILITY: Literal["flush", "enqueue"] = "flush"
+
+    # Hot Storage Partitions & Retention
+    # device_telemetry/anomalies are partitioned by day (UTC). The maintenance
+    # job creates PREMAKE_DAYS of partitions ahead and drops telemetry days
+    # older than HOT_RETENTION_DAYS, and anomaly days older than
+    # ANOMALY_RETENTION_DAYS, once the archive holds every one of their
+    # readings (archived with id, risk level and anomaly score).
+    # WARNING: this job DROPS hot-table data. It is on by default because it
+    # also pre-creates the daily partitions ingest writes into; disabling it
+    # means running `make retention` (or `--dry-run` first) on a schedule.
+    PARTITION_MAINTENANCE_ENABLED: bool = True
+    PARTITION_MAINTENANCE_INTERVAL_S: float = 3600
+    PARTITION_PREMAKE_DAYS: int = 7
+    HOT_RETENTION_DAYS: int = 7
+    ANOMALY_RETENTION_DAYS: int = 90
+    # Max wait for the table lock when detaching, so ingest never queues behind it
+    PARTITION_LOCK_TIMEOUT_S: float = 5.0
+
+    # Dashboard Rollups
+    # Per-device min/avg/max vitals in 1m/1h/1d buckets, aggregated in memory
+    # on ingest and merged into Postgres every ROLLUP_FLUSH_INTERVAL_S (a crash
+    # loses at most that window). Minute buckets are dropped after
+    # ROLLUP_MINUTE_RETENTION_DAYS; hour and day buckets are kept.
+    ROLLUP_FLUSH_INTERVAL_S: float = 5.0
+    ROLLUP_MINUTE_RETENTION_DAYS: int = 14
+    ROLLUP_MAX_POINTS: int = 5000
+
+    # Live Alert Stream
+    # Alerts buffered per subscriber before a slow consumer is disconnected
+    ALERT_SUBSCRIBER_BUFFER: int = 256
+    ALERT_KEEPALIVE_S: float = 15.0
+
+    # Rolling Feature Engine
+    # Per-device windows (in readings) over which trend features are computed
+    FEATURE_WINDOWS: List[int] = [10, 60]
+    FEATURE_MAX_DEVICES: int = 10000
+    FEATURE_IDLE_TTL_S: float = 900.0
+
+    # Logging
+    # Records are written by a background thread; routine per-reading lines
+    # ("Telemetry Accepted") are sampled at this rate. Warnings are never sampled.
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_ROUTINE_SAMPLE_RATE: float = 0.1
+    # With the queue full, a warning waits at most this long for space on the
+    # event loop before it is dropped (and counted) too
+    LOG_WARNING_PUT_TIMEOUT_S: float = 0.05
+
+    # Metrics
+    # How often the event-loop lag probe wakes up
+    METRICS_LOOP_LAG_INTERVAL_S: float = 0.5
+
+    # Anomaly Model Registry
+    # Fitted models are persisted here and memory-mapped at startup; bump
+    # MODEL_VERSION to force a retrain.
+    MODEL_DIR: str = "./data/models"
+    MODEL_VERSION: str = "2"
+
+    # Risk Levels
+    # Score cut-offs for the rolling-feature model: MEDIUM is about the 1st
+    # percentile of held-out normal readings, HIGH sits below the lowest
+    # (~0.01%). Independently, readings whose NEWS2 heart-rate + SpO2
+    # sub-score reaches RISK_VITALS_HIGH_SCORE are HIGH whatever the model
+    # says: trend features dilute single acute readings on a warm device.
+    RISK_HIGH_SCORE: float = -0.12
+    RISK_MEDIUM_SCORE: float = -0.04
+    RISK_VITALS_HIGH_SCORE: int = 3
+
+    # Background Retraining
+    # Periodically refits the forest on recent telemetry in a worker process
+    # and hot-swaps it in once it passes validation.
+    RETRAIN_ENABLED: bool = False
+    RETRAIN_INTERVAL_S: float = 6 * 3600
+    RETRAIN_LOOKBACK_HOURS: int = 24
+    RETRAIN_MIN_SAMPLES: int = 1000
+    RETRAIN_MAX_SAMPLES: int = 50000
+
+    # PDF Reports
+    # Rendering runs in a process pool; requests beyond REPORT_MAX_CONCURRENCY
+    # wait up to REPORT_QUEUE_TIMEOUT_S for a slot, then get a 503. Reports
+    # print only their generation date, so they are cached by content + date.
+    REPORT_WORKERS: int = 2
+    REPORT_MAX_CONCURRENCY: int = 4
+    REPORT_QUEUE_TIMEOUT_S: float = 5.0
+    REPORT_CACHE_MAX_ENTRIES: int = 64
+    REPORT_CACHE_TTL_S: float = 3600.0
+
+    # Assistant Context Cache
+    # Per-device ring buffers of recent vitals/alerts, kept current by ingest.
+    # The TTL bounds staleness against rows written outside this process.
+    CONTEXT_CACHE_MAX_DEVICES: int = 5000
+    CONTEXT_CACHE_VITALS: int = 10
+    CONTEXT_CACHE_ALERTS: int = 5
+    CONTEXT_CACHE_TTL_S: float = 300.0
+
     # Directs Pydantic to look for .env in the PROJECT ROOT if running locally
     # Path is relative to where this python command is run, or absolute.
     # We look 2 levels up from src/backend if running from there, or just .env
@@ -37,4 +212,10 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
+    @model_validator(mode="after")
+    def require_openai_key(self) -> "Settings":
+        if self.DEPLOYMENT_PROFILE == "full" and self.LLM_BACKEND == "openai" and not self.OPENAI_API_KEY:
+            raise ValueError('OPENAI_API_KEY is required for DEPLOYMENT_PROFILE="full" (use "ingest" or LLM_BACKEND="fake" without it)')
+        return self
+
 settings = Settings()
\ No newline at end of file
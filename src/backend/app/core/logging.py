@@ -1,9 +1,54 @@
+import copy
 import logging
-import json
+import queue
+import random
 import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 from uuid import uuid4
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+
+import orjson
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Correlation id of the request being handled. Context variables follow the
+# request into awaited calls, tasks it spawns (create_task copies the context)
+# and threadpool work, so loggers never need it passed explicitly.
+correlation_id_var: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+def get_correlation_id() -> Optional[str]:
+    return correlation_id_var.get()
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps the current correlation id onto every record (explicit extra= wins)."""
+    def filter(self, record):
+        if getattr(record, "correlation_id", None) is None:
+            record.correlation_id = correlation_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records below WARNING; WARNING and above always pass."""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+# High-volume, per-reading lines ("Telemetry Accepted") go through this logger
+# so they can be sampled without touching anything else
+routine_logger = logging.getLogger("biostream.routine")
+routine_logger.addFilter(SamplingFilter(settings.LOG_ROUTINE_SAMPLE_RATE))
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "biostream_log_records_dropped",
+    "Log records dropped because the logging queue was full.",
+    labelnames=("level",)
+)
+
+# Context fields copied from extra= into the JSON line when present
+EXTRA_FIELDS = ("device_id", "risk", "score")
 
 class JsonFormatter(logging.Formatter):
     """Formats log records as a JSON object."""
@@ -15,35 +60,136 @@ class JsonFormatter(logging.Formatter):
             "module": record.module,
             "correlation_id": getattr(record, "correlation_id", None),
         }
-        # Add exception info if present
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                log_record[field] = getattr(record, field)
+        # Add exception info if present (pre-rendered by the queue handler)
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_record)
+        elif record.exc_text:
+            log_record["exception"] = record.exc_text
+        return orjson.dumps(log_record, default=str).decode()
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread instead of writing to stdout on the
+    event loop. When the queue is full, routine records are dropped (and
+    counted) rather than stalling requests; WARNING and above wait briefly
+    (LOG_WARNING_PUT_TIMEOUT_S) for space before being dropped as well.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message now (args may change later) but leave JSON
+        # formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                try:
+                    self.queue.put(record, timeout=settings.LOG_WARNING_PUT_TIMEOUT_S)
+                    return
+                except queue.Full:
+                    pass
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc(level=record.levelname)
+
+class _BlockingSentinelListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The stdlib uses put_nowait, which fails if the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
 
 def setup_logging():
-    """Configures the root logger to output JSON."""
-    handler = logging.StreamHandler()
-    handler.setFormatter(JsonFormatter())
-    logging.root.addHandler(handler)
+    """
+    Configures the root logger to output JSON through a background thread.
+    Safe to call more than once (e.g. per app lifespan in tests).
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    # Handler filters run in the logging caller's context (not on the
+    # listener thread), so the request's ContextVar is still visible here
+    _queue_handler.addFilter(CorrelationIdFilter())
+
+    _listener = _BlockingSentinelListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    logging.root.addHandler(_queue_handler)
     logging.root.setLevel(logging.INFO)
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    """Attaches a unique ID to every request for traceability."""
-    async def dispatch(self, request: Request, call_next):
-        correlation_id = request.headers.get("X-Correlation-ID", str(uuid4()))
+def shutdown_logging():
+    """Flushes queued records and detaches the pipeline."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    logging.root.removeHandler(_queue_handler)
+    _listener.stop()
+    _queue_handler, _listener = None, None
+
+
+class CorrelationIdMiddleware:
+    """
+    Attaches a unique ID to every request for traceability.
+
+    Raw ASGI middleware: unlike BaseHTTPMiddleware it does not re-wrap the
+    response body in an extra task and memory stream, so streaming responses
+    (SSE, archive exports) pass through untouched and per-request overhead
+    stays small.
+    """
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger("api.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-correlation-id":
+                correlation_id = value.decode("latin-1")
+                break
+        correlation_id = correlation_id or str(uuid4())
+
         # Store in request state for access in endpoints
-        request.state.correlation_id = correlation_id
-        
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        # Log the request completion
-        logger = logging.getLogger("api.access")
-        extra = {"correlation_id": correlation_id}
-        # We manually attach the attribute to the record in a real implementation, 
-        # or use a ContextVar. For simplicity here:
-        logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.4f}s", extra=extra)
-        
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
\ No newline at end of file
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        token = correlation_id_var.set(correlation_id)
+
+        status_code = 500
+        header = (b"x-correlation-id", correlation_id.encode("latin-1"))
+
+        async def send_with_correlation_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), header]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_correlation_id)
+        finally:
+            # Logged once the response (including any streamed body) is complete
+            process_time = time.perf_counter() - start_time
+            self.logger.info(f"{scope['method']} {scope['path']} - {status_code} - {process_time:.4f}s")
+            correlation_id_var.reset(token)
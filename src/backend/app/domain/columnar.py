@@ -0,0 +1,137 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import polars as pl
+from app.domain.schemas import (
+    HEART_RATE_TRACKING_MAX,
+    HEART_RATE_TRACKING_MIN,
+    TelemetryPayload,
+    physiological_limits_message,
+)
+
+# Validation errors reported per request; a bad gateway batch can hold thousands
+MAX_REPORTED_ERRORS = 50
+
+REQUIRED_COLUMNS = ["device_id", "patient_id", "heart_rate", "spo2", "battery_level"]
+STRING_COLUMNS = ["device_id", "patient_id"]
+NUMERIC_COLUMNS = ["heart_rate", "spo2", "battery_level"]
+
+class TelemetryRow(NamedTuple):
+    """
+    Plain-tuple stand-in for TelemetryPayload on the columnar path. It exposes
+    the same attributes, so storage code accepts either, without pydantic
+    building a model per row.
+    """
+    device_id: str
+    patient_id: str
+    timestamp: datetime
+    heart_rate: int
+    spo2: float
+    battery_level: float
+
+def _field_constraints(name: str) -> Dict[str, Any]:
+    """ge/le/min_length/max_length/pattern declared on TelemetryPayload, so both paths share one source."""
+    constraints = {}
+    for item in TelemetryPayload.model_fields[name].metadata:
+        for attr in ("ge", "le", "min_length", "max_length", "pattern"):
+            if hasattr(item, attr):
+                constraints[attr] = getattr(item, attr)
+    return constraints
+
+def _error(error_type: str, row: int, field: str, msg: str, value: Any = None) -> Dict[str, Any]:
+    # Same shape as FastAPI's request validation errors
+    return {"type": error_type, "loc": ("body", row, field), "msg": msg, "input": value}
+
+def validate_telemetry_frame(df: pl.DataFrame) -> Tuple[pl.DataFrame, List[Dict[str, Any]]]:
+    """
+    Applies TelemetryPayload's rules (types, bounds, lengths and
+    check_physiological_limits) to a whole batch with column expressions.
+    Returns the normalized frame (UTC timestamps, typed columns) and a list of
+    errors, which is empty when every row is valid. Python objects are only
+    built for the rows that fail.
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in df.columns]
+    if missing:
+        return df, [{"type": "missing", "loc": ("body", name), "msg": "Field required", "input": None} for name in missing]
+
+    checks = []
+
+    # 1. Types: cast leniently, anything that turned into null was unparseable
+    frame = df.with_columns(
+        [pl.col(name).cast(pl.Utf8, strict=False) for name in STRING_COLUMNS]
+        + [pl.col(name).cast(pl.Float64, strict=False).alias(f"_{name}") for name in NUMERIC_COLUMNS]
+    )
+    for name in REQUIRED_COLUMNS:
+        checks.append((pl.col(name).is_null(), "missing", name, "Field required"))
+    for name in NUMERIC_COLUMNS:
+        checks.append((pl.col(name).is_not_null() & pl.col(f"_{name}").is_null(), "float_parsing", name, "Input should be a valid number"))
+    checks.append((pl.col("_heart_rate") != pl.col("_heart_rate").floor(), "int_from_float", "heart_rate", "Input should be a valid integer, got a number with a fractional part"))
+    if "timestamp" in df.columns:
+        frame = frame.with_columns(_utc_timestamp(df["timestamp"]).alias("_timestamp"))
+        checks.append((pl.col("timestamp").is_not_null() & pl.col("_timestamp").is_null(), "datetime_parsing", "timestamp", "Input should be a valid datetime"))
+
+    # 2. Bounds and lengths declared on the model fields
+    for name in STRING_COLUMNS:
+        limits = _field_constraints(name)
+        length = pl.col(name).str.len_chars()
+        checks.append((length < limits["min_length"], "string_too_short", name, f"String should have at least {limits['min_length']} characters"))
+        checks.append((length > limits["max_length"], "string_too_long", name, f"String should have at most {limits['max_length']} characters"))
+        if "pattern" in limits:
+            checks.append((~pl.col(name).str.contains(limits["pattern"]), "string_pattern_mismatch", name, f"String should match pattern '{limits['pattern']}'"))
+    for name in NUMERIC_COLUMNS:
+        limits = _field_constraints(name)
+        checks.append((pl.col(f"_{name}") < limits["ge"], "greater_than_equal", name, f"Input should be greater than or equal to {limits['ge']}"))
+        checks.append((pl.col(f"_{name}") > limits["le"], "less_than_equal", name, f"Input should be less than or equal to {limits['le']}"))
+
+    # 3. check_physiological_limits (message rendered per failing row below)
+    hr, hr_limits = pl.col("_heart_rate"), _field_constraints("heart_rate")
+    outside_tracking = hr.is_between(hr_limits["ge"], hr_limits["le"]) & ~hr.is_between(HEART_RATE_TRACKING_MIN, HEART_RATE_TRACKING_MAX)
+    checks.append((outside_tracking, "value_error", "heart_rate", None))
+
+    masks = frame.select([check.fill_null(False).alias(f"_check{i}") for i, (check, *_) in enumerate(checks)]).with_row_index("_row")
+    failing = masks.filter(pl.any_horizontal(pl.exclude("_row")))
+
+    errors = []
+    for record in failing.head(MAX_REPORTED_ERRORS).iter_rows(named=True):
+        row = record["_row"]
+        for i, (_, error_type, field, msg) in enumerate(checks):
+            if record[f"_check{i}"]:
+                value = df[field][row]
+                if msg is None:
+                    msg = f"Value error, {physiological_limits_message(int(value))}"
+                errors.append(_error(error_type, row, field, msg, value))
+                break # One error per row keeps the report readable
+    if errors:
+        return df, errors
+
+    # 4. Normalize: typed columns, timestamps as UTC (missing -> now, like the model default)
+    now = datetime.now(timezone.utc)
+    if "timestamp" not in df.columns:
+        timestamp = pl.lit(now).alias("timestamp")
+    else:
+        timestamp = pl.col("_timestamp").fill_null(now).alias("timestamp")
+
+    normalized = frame.select(
+        pl.col("device_id"),
+        pl.col("patient_id"),
+        timestamp,
+        pl.col("_heart_rate").cast(pl.Int64).alias("heart_rate"),
+        pl.col("_spo2").alias("spo2"),
+        pl.col("_battery_level").alias("battery_level")
+    )
+    return normalized, []
+
+def _utc_timestamp(column: pl.Series) -> pl.Series:
+    """Accepts Arrow timestamps (naive = UTC) or ISO 8601 strings."""
+    if column.dtype == pl.Utf8:
+        column = column.str.to_datetime(time_zone="UTC", strict=False)
+    if isinstance(column.dtype, pl.Datetime):
+        if column.dtype.time_zone is None:
+            return column.dt.replace_time_zone("UTC")
+        return column.dt.convert_time_zone("UTC")
+    return column.cast(pl.Datetime("us", "UTC"), strict=False)
+
+def frame_rows(df: pl.DataFrame) -> List[TelemetryRow]:
+    """Rows of a validated frame, in TelemetryPayload field order."""
+    columns = [df[name].to_list() for name in TelemetryRow._fields]
+    return list(map(TelemetryRow._make, zip(*columns)))
@@ -1,13 +1,24 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+# Heart rates outside this range are treated as sensor error (see check_physiological_limits)
+HEART_RATE_TRACKING_MIN = 30
+HEART_RATE_TRACKING_MAX = 250
+
+# Device ids become object-store path segments (device_id=<id>/...), so they
+# are limited to characters that need no escaping
+DEVICE_ID_PATTERN = r"^[A-Za-z0-9_-]+$"
+
+def physiological_limits_message(heart_rate) -> str:
+    return f"Heart rate {heart_rate} is outside physiological tracking limits ({HEART_RATE_TRACKING_MIN}-{HEART_RATE_TRACKING_MAX})"
 
 class TelemetryPayload(BaseModel):
     """
     Represents raw telemetry data from a wearable device.
     Strict validation ensures no physically impossible data enters the system.
     """
-    device_id: str = Field(..., min_length=3, max_length=50, description="Unique hardware identifier")
+    device_id: str = Field(..., min_length=3, max_length=50, pattern=DEVICE_ID_PATTERN, description="Unique hardware identifier (letters, digits, '-' and '_')")
     patient_id: str = Field(..., min_length=3, max_length=50, description="Patient identifier (will be hashed)")
     timestamp: datetime = Field(default_factory=datetime.now, description="ISO 8601 timestamp")
     
@@ -38,12 +49,24 @@ class TelemetryPayload(BaseModel):
         likely sensor error or severe medical emergency requiring different protocol.
         Here we treat extreme outliers as 'dirty data' for the purpose of the assignment.
         """
-        if v < 30 or v > 250:
-            raise ValueError(f"Heart rate {v} is outside physiological tracking limits (30-250)")
+        if v < HEART_RATE_TRACKING_MIN or v > HEART_RATE_TRACKING_MAX:
+            raise ValueError(physiological_limits_message(v))
         return v
 
 class IngestionResponse(BaseModel):
     status: str
     message: str
     correlation_id: str
-    risk_assessment: Optional[str] = "PROCESSING"
\ No newline at end of file
+    risk_assessment: Optional[str] = "PROCESSING"
+
+class BatchItemAssessment(BaseModel):
+    device_id: str
+    risk_assessment: str
+    anomaly_score: float
+
+class BatchIngestionResponse(BaseModel):
+    status: str
+    message: str
+    correlation_id: str
+    accepted: int
+    results: List[BatchItemAssessment]
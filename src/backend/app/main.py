@@ -1,30 +1,61 @@
-from fastapi import FastAPI
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.logging import setup_logging, CorrelationIdMiddleware
+from app.core.logging import setup_logging, shutdown_logging, CorrelationIdMiddleware
+from app.core.metrics import metrics, MetricsRegistry, LoopLagMonitor, EVENT_LOOP_LAG
+from app.services.admission import admission
 from app.services.detector import detector
-from app.services.storage import storage
-# Import all routers
-from app.api.v1 import ingestion, analytics, assistant
+from app.services.features import feature_store
+from app.services.storage import storage, DatabaseBusyError
+from app.services.retraining import retrainer
+from app.services.retention import partition_maintainer
+# Import all routers (the assistant only in the full profile)
+from app.api.v1 import ingestion, analytics
+if settings.DEPLOYMENT_PROFILE == "full":
+    from app.api.v1 import assistant
+    from app.services.report import report_renderer
+
+loop_lag_monitor = LoopLagMonitor(EVENT_LOOP_LAG, settings.METRICS_LOOP_LAG_INTERVAL_S)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Rolling features and live alerts live in this process: one worker only
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        raise RuntimeError("WEB_CONCURRENCY > 1 is not supported: each worker would see only part of every device's readings and alerts")
+
     # 1. Configure Logging
     setup_logging()
     
     # 2. Connect to Infrastructure (Postgres & MinIO)
     await storage.connect()
 
-    # 3. Train the AI model (Isolation Forest) on startup
-    detector.train_baseline()
+    # 3. Load the AI model (Isolation Forest) from the registry, training only if missing
+    detector.load_or_train()
+
+    # 4. Periodically refit on recent telemetry (opt-in, see settings.RETRAIN_ENABLED)
+    retrainer.start()
+    # 5. Keep daily hot-table partitions ahead of the clock, retire archived ones
+    partition_maintainer.start()
+    loop_lag_monitor.start()
     
     print(f"🚀 Starting {settings.PROJECT_NAME}...")
     yield
     
-    # 4. Graceful Shutdown
+    # 6. Graceful Shutdown
+    await loop_lag_monitor.stop()
+    await partition_maintainer.stop()
+    await retrainer.stop()
+    # close() drains the write-behind queue (if enabled) before releasing the pool,
+    # then hands the partial archive buffer over and waits for its upload
     await storage.close()
+    if settings.DEPLOYMENT_PROFILE == "full":
+        report_renderer.shutdown()
     print("🛑 Shutting down...")
+    # Last: flush records still queued for the logging thread
+    shutdown_logging()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -52,13 +83,38 @@ app.add_middleware(CorrelationIdMiddleware)
 # Register Routers
 app.include_router(ingestion.router, prefix=settings.API_PREFIX, tags=["Ingestion"])
 app.include_router(analytics.router, prefix=settings.API_PREFIX, tags=["Analytics"])
-app.include_router(assistant.router, prefix=settings.API_PREFIX, tags=["AI Assistant"]) # New Feature
+if settings.DEPLOYMENT_PROFILE == "full":
+    app.include_router(assistant.router, prefix=settings.API_PREFIX, tags=["AI Assistant"]) # New Feature
+
+@app.exception_handler(DatabaseBusyError)
+async def database_busy_handler(request: Request, exc: DatabaseBusyError):
+    """Pool exhausted past its acquire timeout: ask the client to retry instead of hanging."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Database busy ({exc.pool} pool), retry shortly"},
+        headers={"Retry-After": str(settings.INGEST_RETRY_AFTER_S)}
+    )
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "ok", 
         "version": settings.VERSION,
+        "profile": settings.DEPLOYMENT_PROFILE,
         "model_ready": detector.is_ready,
-        "db_connected": storage.pool is not None
-    }
\ No newline at end of file
+        "model_version": detector.model_version,
+        "retraining": retrainer.stats(),
+        "partitions": partition_maintainer.stats(),
+        "tracked_devices": feature_store.stats()["devices"],
+        "db_connected": storage.pool is not None,
+        "db_read_connected": storage.read_pool is not None,
+        "archive_worker": storage.archiver.worker_id,
+        "archive_queue_depth": storage.archiver.queue_depth,
+        "archive_spilled_batches": storage.archiver.spill_depth,
+        "ingest_admission": admission.stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return Response(metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
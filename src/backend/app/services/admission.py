@@ -0,0 +1,95 @@
+import asyncio
+import collections
+from typing import Deque, Dict
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+class IngestOverloadedError(Exception):
+    """Raised when a reading cannot be admitted to the persistence stage."""
+
+class AdmissionController:
+    """
+    Bounds how many ingest requests may be persisting at once.
+
+    Routine readings may use up to max_in_flight - high_reserve slots and are
+    rejected immediately beyond that (or while any HIGH reading is waiting),
+    so a slow database turns into fast 429s instead of an unbounded pile-up
+    on pool.acquire(). HIGH-risk readings may use every slot and, when all
+    are busy, wait in a FIFO priority lane that is served before anything
+    else as slots free up. Only if that lane itself is full is HIGH rejected.
+    """
+    def __init__(self, max_in_flight: int = None, high_reserve: int = None, high_queue_size: int = None):
+        self.max_in_flight = max_in_flight or settings.INGEST_MAX_IN_FLIGHT
+        self.high_reserve = settings.INGEST_HIGH_PRIORITY_RESERVE if high_reserve is None else high_reserve
+        self.high_queue_size = high_queue_size or settings.INGEST_HIGH_PRIORITY_QUEUE
+        self.in_flight = 0
+        self._high_waiters: Deque[asyncio.Future] = collections.deque()
+        self.shed: Dict[str, int] = {"HIGH": 0, "ROUTINE": 0}
+
+    @property
+    def routine_limit(self) -> int:
+        return max(self.max_in_flight - self.high_reserve, 0)
+
+    @property
+    def high_waiting(self) -> int:
+        return len(self._high_waiters)
+
+    async def acquire(self, high_priority: bool):
+        if not high_priority:
+            if self.in_flight >= self.routine_limit or self._high_waiters:
+                self._shed("ROUTINE")
+            self.in_flight += 1
+            return
+
+        if self.in_flight < self.max_in_flight and not self._high_waiters:
+            self.in_flight += 1
+            return
+        if len(self._high_waiters) >= self.high_queue_size:
+            self._shed("HIGH")
+
+        # Wait for release() to hand over a slot (in_flight is transferred, not decremented)
+        waiter = asyncio.get_running_loop().create_future()
+        self._high_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release() # The slot was handed over just as we were cancelled
+            else:
+                self._high_waiters.remove(waiter)
+            raise
+
+    def release(self):
+        while self._high_waiters:
+            waiter = self._high_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _shed(self, lane: str):
+        self.shed[lane] += 1
+        INGEST_SHED.inc(lane=lane)
+        raise IngestOverloadedError(f"Ingest is overloaded ({self.in_flight} in flight)")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "high_waiting": self.high_waiting,
+            "shed_routine": self.shed["ROUTINE"],
+            "shed_high": self.shed["HIGH"]
+        }
+
+INGEST_SHED = metrics.counter(
+    "biostream_ingest_shed",
+    "Ingest requests rejected with 429 by admission control, by lane.",
+    labelnames=("lane",)
+)
+
+# Singleton
+admission = AdmissionController()
+
+metrics.gauge("biostream_ingest_in_flight", "Ingest requests currently persisting.", lambda: admission.in_flight)
+metrics.gauge("biostream_ingest_high_waiting", "HIGH-risk readings waiting for a persistence slot.", lambda: admission.high_waiting)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class AlertSubscriber:
+    """One live alert consumer (e.g. an open dashboard) with its own bounded buffer."""
+    def __init__(self, buffer_size: int, device_ids: Optional[Set[str]], risk_levels: Set[str]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.device_ids = device_ids
+        self.risk_levels = risk_levels
+        self.dropped = False
+
+    def matches(self, alert: Dict[str, Any]) -> bool:
+        if alert["risk_level"] not in self.risk_levels:
+            return False
+        return self.device_ids is None or alert["device_id"] in self.device_ids
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next alert, None once dropped. Raises asyncio.TimeoutError when idle."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class AlertHub:
+    """
+    In-process fan-out of live alerts from the ingest path to subscribers.
+    publish() never blocks ingestion: a subscriber whose buffer is full is
+    disconnected (it can resync from GET /anomalies?since=) rather than
+    slowing everyone else down.
+    """
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self._subscribers: Set[AlertSubscriber] = set()
+        # Counters
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, device_ids: Optional[Iterable[str]] = None,
+                  risk_levels: Iterable[str] = ("HIGH",)) -> AlertSubscriber:
+        subscriber = AlertSubscriber(
+            self.buffer_size,
+            set(device_ids) if device_ids else None,
+            set(risk_levels)
+        )
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: AlertSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, alert: Dict[str, Any]):
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if not subscriber.matches(alert):
+                continue
+            try:
+                subscriber.queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: AlertSubscriber):
+        """Disconnects a slow consumer: discard its backlog and signal end-of-stream."""
+        self._subscribers.discard(subscriber)
+        subscriber.dropped = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        self.dropped_subscribers += 1
+        logger.warning("ALERTS: Dropped slow subscriber (buffer full)")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+# Singleton
+alert_hub = AlertHub(buffer_size=settings.ALERT_SUBSCRIBER_BUFFER)
@@ -0,0 +1,309 @@
+import collections
+import io
+import os
+import queue
+import re
+import socket
+import threading
+import time
+import uuid
+import logging
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.metrics import INGEST_STAGE_SECONDS
+from app.domain.schemas import DEVICE_ID_PATTERN
+
+if TYPE_CHECKING:
+    # Imported on first flush (archiver thread), keeping it off API cold start
+    import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Hive-style layout: device_id=<id>/date=<YYYY-MM-DD>/hour=<HH>/<file>.parquet
+PARTITION_COLUMNS = ["device_id", "date", "hour"]
+
+def device_prefix(device_id: str) -> str:
+    """
+    Top-level archive prefix of a device. Ids are validated on ingest
+    (DEVICE_ID_PATTERN); anything else would escape its partition (or, with
+    the local backend, the bucket directory), so it is rejected here too.
+    """
+    if not re.fullmatch(DEVICE_ID_PATTERN, device_id):
+        raise ValueError(f"Invalid device id for the archive: {device_id!r}")
+    return f"device_id={device_id}"
+
+def date_prefix(device_id: str, day) -> str:
+    """Prefix of one device's UTC day (`day` is a date/datetime or YYYY-MM-DD string), with trailing slash."""
+    day = day if isinstance(day, str) else f"{day:%Y-%m-%d}"
+    return f"{device_prefix(device_id)}/date={day}/"
+
+def partition_prefix(device_id: str, date: str, hour: int) -> str:
+    return f"{date_prefix(device_id, date)}hour={hour:02d}"
+
+def default_worker_id() -> str:
+    """Tag for this process's archive objects: ARCHIVE_WORKER_ID or <hostname>-<pid>."""
+    worker_id = settings.ARCHIVE_WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+    # Ends up in object keys
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", worker_id)
+
+def encode_parquet(df: "pl.DataFrame", compression: str = "snappy") -> bytes:
+    """Serializes a frame with the configured row-group size."""
+    buffer = io.BytesIO()
+    df.write_parquet(
+        buffer,
+        compression=compression,
+        row_group_size=settings.ARCHIVE_ROW_GROUP_SIZE
+    )
+    return buffer.getvalue()
+
+def split_partitions(df: "pl.DataFrame") -> Dict[str, "pl.DataFrame"]:
+    """
+    Groups archive rows by Hive partition. Partition columns are encoded in
+    the object key and dropped from the file body, as Hive readers expect.
+    """
+    import polars as pl
+    ts = pl.col("timestamp")
+    if df.schema["timestamp"].time_zone is None:
+        ts = ts.dt.replace_time_zone("UTC")
+    else:
+        ts = ts.dt.convert_time_zone("UTC")
+
+    df = df.with_columns(ts.alias("timestamp")).with_columns(
+        pl.col("timestamp").dt.strftime("%Y-%m-%d").alias("date"),
+        pl.col("timestamp").dt.hour().alias("hour")
+    )
+
+    return {
+        partition_prefix(device_id, date, hour): part.drop(PARTITION_COLUMNS)
+        for (device_id, date, hour), part in df.partition_by(PARTITION_COLUMNS, as_dict=True).items()
+    }
+
+class ColdArchiver:
+    """
+    Background uploader for Cold Storage (MinIO Parquet).
+    Runs on a dedicated thread so Parquet encoding and the blocking MinIO
+    client never execute on the event loop. Callers hand over full buffers
+    with submit() and must not touch them afterwards.
+
+    Batches that cannot be queued or uploaded are spilled to local disk
+    (ARCHIVE_SPILL_PATH) and retried in the background instead of dropped.
+
+    Object names are tagged with the process's worker id
+    (part-<worker_id>-<batch_id>.parquet), so backend containers write
+    disjoint files into the shared partitions.
+    """
+    def __init__(self, bucket_name: str, worker_id: Optional[str] = None, spill_path: Optional[str] = None):
+        self.bucket_name = bucket_name
+        self.worker_id = worker_id
+        self.spill_path = spill_path or settings.ARCHIVE_SPILL_PATH
+        self.store = None
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.ARCHIVE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._known_buckets: set = set()
+        self._in_flight = 0
+        # Batches the full queue turned away; spilled to disk by the archiver thread
+        self._overflow: collections.deque = collections.deque()
+        self._spill_files = 0
+        # Counters (exposed via /health)
+        self.uploaded_batches = 0
+        self.failed_batches = 0
+        self.spilled_batches = 0
+        self.dropped_batches = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Batches waiting for upload, including the one currently being written."""
+        return self._queue.qsize() + self._in_flight
+
+    @property
+    def spill_depth(self) -> int:
+        """Batches parked on local disk (or about to be), waiting for the object store to recover."""
+        return self._spill_files + len(self._overflow)
+
+    def start(self, store):
+        """Starts the uploader thread writing to an object store (see object_store.py)."""
+        if self._thread:
+            return
+        self.store = store
+        # Resolved here, inside the worker process, so a forked worker gets its own pid
+        self.worker_id = self.worker_id or default_worker_id()
+        # Batches left by a previous run; tracked incrementally from here on
+        self._spill_files = len(self._spilled_paths())
+        self._thread = threading.Thread(target=self._run, name="cold-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Uploads everything already submitted, then stops the thread. Blocking."""
+        if not self._thread:
+            return
+        self._queue.put(None) # Sentinel: drain and exit
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, records: List[Dict[str, Any]], block: bool = False) -> bool:
+        """
+        Queues a batch for upload without blocking.
+        If the archiver is saturated the batch goes to an overflow list that
+        the archiver thread spills to local disk and uploads later, so a slow
+        MinIO neither stalls ingestion (no encoding or disk I/O here) nor
+        loses data; returns False in that case. block=True waits for room
+        instead (shutdown drain; call it off the event loop).
+        """
+        if block:
+            self._queue.put(records)
+            return True
+        try:
+            self._queue.put_nowait(records)
+            return True
+        except queue.Full:
+            logger.warning(f"ARCHIVE: Upload queue full, spilling batch of {len(records)} records to disk")
+            self._overflow.append(records)
+            return False
+
+    def _run(self):
+        # Spilled batches (including ones left by a previous run) are retried
+        # every ARCHIVE_SPILL_RETRY_S, even while new batches keep arriving
+        next_replay = 0.0
+        while True:
+            try:
+                self._spill_overflow()
+                if time.monotonic() >= next_replay:
+                    next_replay = time.monotonic() + settings.ARCHIVE_SPILL_RETRY_S
+                    self._replay_spilled()
+                records = self._queue.get(timeout=max(0.0, next_replay - time.monotonic()))
+            except queue.Empty:
+                continue
+            except Exception as e:
+                # Never let one bad pass end the thread (and every later upload)
+                logger.error(f"ARCHIVE ERROR: Archiver pass failed: {e}")
+                continue
+            if records is None:
+                break
+            self._in_flight = 1
+            try:
+                self._archive_with_retry(records)
+            except Exception as e:
+                logger.error(f"ARCHIVE ERROR: Archiving a batch of {len(records)} records failed: {e}")
+            finally:
+                self._in_flight = 0
+        self._spill_overflow()
+
+    def _archive_with_retry(self, records: List[Dict[str, Any]]):
+        """Retries failed uploads with exponential backoff, then spills the batch to disk."""
+        delay = settings.ARCHIVE_RETRY_BACKOFF_S
+        # Stable across retries so a partially uploaded batch is overwritten, not duplicated
+        batch_id = str(uuid.uuid4())
+        for attempt in range(1, settings.ARCHIVE_MAX_RETRIES + 1):
+            try:
+                self._archive(records, batch_id, self.worker_id)
+                self.uploaded_batches += 1
+                return
+            except Exception as e:
+                logger.warning(f"ARCHIVE: Upload attempt {attempt}/{settings.ARCHIVE_MAX_RETRIES} failed: {e}")
+                # The bucket may have been removed underneath us
+                self._known_buckets.discard(self.bucket_name)
+                if attempt < settings.ARCHIVE_MAX_RETRIES:
+                    # Overflow keeps building while MinIO is slow: park it before waiting
+                    self._spill_overflow()
+                    time.sleep(delay)
+                    delay *= 2
+
+        self.failed_batches += 1
+        logger.error(f"ARCHIVE ERROR: Failed to flush {len(records)} records to MinIO after {settings.ARCHIVE_MAX_RETRIES} attempts, spilling to disk")
+        self._spill(records, batch_id, self.worker_id)
+
+    def _archive(self, records: List[Dict[str, Any]], batch_id: str, worker_id: str):
+        """Writes one batch as one Parquet object per Hive partition."""
+        import polars as pl
+        # Create DataFrame
+        df = pl.DataFrame(records)
+
+        # Check bucket once per process (idempotency)
+        self._ensure_bucket()
+
+        # Upload one object per device/date/hour partition
+        for prefix, part in split_partitions(df).items():
+            key = f"{prefix}/part-{worker_id}-{batch_id}.parquet"
+            with INGEST_STAGE_SECONDS.time(stage="parquet_encode"):
+                data = encode_parquet(part)
+            with INGEST_STAGE_SECONDS.time(stage="minio_upload"):
+                self.store.put(key, data)
+
+        logger.info(f"ARCHIVE: Flushed {len(records)} records to MinIO/{self.bucket_name} (worker {worker_id}, batch {batch_id})")
+
+    def _spill_overflow(self):
+        while self._overflow:
+            self._spill(self._overflow.popleft(), str(uuid.uuid4()), self.worker_id)
+
+    def _spill(self, records: List[Dict[str, Any]], batch_id: str, worker_id: str):
+        """
+        Parks a batch under ARCHIVE_SPILL_PATH as <worker_id>--<batch_id>.arrow.
+        The ids are kept so the eventual upload lands on the same object key.
+        """
+        import polars as pl
+        path = os.path.join(self.spill_path, f"{worker_id}--{batch_id}.arrow")
+        try:
+            os.makedirs(self.spill_path, exist_ok=True)
+            # Write-then-rename: a replay never sees a half-written file
+            pl.DataFrame(records).write_ipc(path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self.spilled_batches += 1
+            self._spill_files += 1
+        except Exception as e:
+            self.dropped_batches += 1
+            logger.error(f"ARCHIVE ERROR: Could not spill batch {batch_id} to {self.spill_path}, dropped {len(records)} records: {e}")
+
+    def _spilled_paths(self) -> List[str]:
+        """Spilled batches, oldest first."""
+        try:
+            names = os.listdir(self.spill_path)
+        except OSError:
+            return []
+        spilled = []
+        for name in names:
+            if not name.endswith(".arrow"):
+                continue
+            path = os.path.join(self.spill_path, name)
+            try:
+                spilled.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue # Replayed (and removed) by another worker meanwhile
+        return [path for _, path in sorted(spilled)]
+
+    def _replay_spilled(self) -> int:
+        """
+        Uploads spilled batches, stopping at the first failure (the store is
+        still down). Any worker may replay any file: keys are idempotent.
+        """
+        replayed = 0
+        for path in self._spilled_paths():
+            worker_id, batch_id = os.path.basename(path)[:-len(".arrow")].rsplit("--", 1)
+            try:
+                import polars as pl
+                records = pl.read_ipc(path).to_dicts()
+                self._archive(records, batch_id, worker_id)
+            except FileNotFoundError:
+                self._spill_files = max(self._spill_files - 1, 0)
+                continue # Replayed by another worker
+            except Exception as e:
+                logger.warning(f"ARCHIVE: Replay of spilled batch {batch_id} failed, retrying in {settings.ARCHIVE_SPILL_RETRY_S:.0f}s: {e}")
+                self._known_buckets.discard(self.bucket_name)
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._spill_files = max(self._spill_files - 1, 0)
+            self.uploaded_batches += 1
+            replayed += 1
+
+        if replayed:
+            logger.info(f"ARCHIVE: Replayed {replayed} spilled batches")
+        return replayed
+
+    def _ensure_bucket(self):
+        if self.bucket_name in self._known_buckets:
+            return
+        self.store.ensure_bucket()
+        self._known_buckets.add(self.bucket_name)
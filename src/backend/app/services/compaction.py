@@ -0,0 +1,83 @@
+"""
+Cold archive compaction job.
+
+Merges the many small per-flush Parquet files inside each
+device_id=/date=/hour= partition into one large, time-sorted,
+zstd-compressed file. Run periodically, e.g. `make compact`.
+"""
+import argparse
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import polars as pl
+from app.core.config import settings
+from app.services.archive import encode_parquet
+from app.services.object_store import ObjectInfo, create_object_store
+
+logger = logging.getLogger(__name__)
+
+def find_candidates(objects: List[ObjectInfo]) -> Dict[str, List[ObjectInfo]]:
+    """Groups small Parquet files by partition, keeping partitions worth compacting."""
+    # The current hour is still receiving flushes; leave it alone
+    now = datetime.now(timezone.utc)
+    open_hour = f"date={now:%Y-%m-%d}/hour={now:%H}"
+
+    partitions = defaultdict(list)
+    for obj in objects:
+        prefix, _, name = obj.key.rpartition("/")
+        if not name.endswith(".parquet") or prefix.endswith(open_hour):
+            continue
+        if obj.size < settings.ARCHIVE_COMPACT_SMALL_FILE_BYTES:
+            partitions[prefix].append(obj)
+
+    return {
+        prefix: files for prefix, files in partitions.items()
+        if len(files) >= settings.ARCHIVE_COMPACT_MIN_FILES
+    }
+
+def compact_partition(store, prefix: str, files: List[ObjectInfo]) -> int:
+    """
+    Replaces the given files with one merged file. The merged object is
+    published with a single atomic PUT before the sources are deleted in one
+    batch, so data is never missing from the partition (a scan racing the
+    delete may briefly see rows twice). Returns the number of rows written.
+    """
+    frames = [pl.read_parquet(store.get(f.key)) for f in files]
+    # Diagonal: files written before id/anomaly_score were archived get nulls there
+    merged = pl.concat(frames, how="diagonal_relaxed").sort("timestamp")
+
+    key = f"{prefix}/compacted-{uuid.uuid4()}.parquet"
+    store.put(key, encode_parquet(merged, compression="zstd"))
+    store.remove([f.key for f in files])
+
+    logger.info(f"COMPACTION: {prefix} - merged {len(files)} files ({merged.height} rows) into {key}")
+    return merged.height
+
+def compact_archive(store, prefix: str = "", dry_run: bool = False) -> Dict[str, int]:
+    """Compacts every eligible partition under `prefix`. Returns files merged per partition."""
+    candidates = find_candidates(store.list(prefix))
+    summary = {}
+    for partition, files in sorted(candidates.items()):
+        if not dry_run:
+            compact_partition(store, partition, files)
+        summary[partition] = len(files)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact small Parquet files in the cold archive.")
+    parser.add_argument("--prefix", default="", help="Only compact under this key prefix (e.g. device_id=WEARABLE-001)")
+    parser.add_argument("--dry-run", action="store_true", help="List partitions that would be compacted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = create_object_store(settings.MINIO_BUCKET_RAW)
+    summary = compact_archive(store, prefix=args.prefix, dry_run=args.dry_run)
+
+    verb = "Would compact" if args.dry_run else "Compacted"
+    print(f"✅ {verb} {sum(summary.values())} files across {len(summary)} partitions.")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,31 @@
+from typing import Dict, List
+from app.services.device_cache import device_cache
 from app.services.storage import storage
 
 async def get_device_context(device_id: str) -> str:
     """
     Fetches the last 10 telemetry records and any anomalies for a specific device.
+    Served from the in-process ring buffer when warm; Postgres otherwise.
     """
-    if not storage.pool:
+    ring = device_cache.get(device_id)
+    if ring is not None:
+        return format_device_context(device_id, ring.recent_vitals(), ring.recent_alerts())
+
+    if not storage.read_pool:
         return "System Error: Database not connected."
 
-    async with storage.pool.acquire() as conn:
+    # Cache miss / cold start: record concurrent ingest while we backfill
+    device_cache.begin_seed(device_id)
+
+    async with storage.read_connection() as conn:
         # 1. Fetch recent telemetry (Vitals)
         rows = await conn.fetch('''
             SELECT timestamp, heart_rate, spo2, battery_level 
             FROM device_telemetry 
             WHERE device_id = $1 
             ORDER BY timestamp DESC 
-            LIMIT 10
-        ''', device_id)
+            LIMIT $2
+        ''', device_id, device_cache.n_vitals)
         
         # 2. Fetch recent anomalies (Risk)
         alerts = await conn.fetch('''
@@ -23,13 +33,17 @@ async def get_device_context(device_id: str) -> str:
             FROM anomalies 
             WHERE device_id = $1 
             ORDER BY detected_at DESC 
-            LIMIT 5
-        ''', device_id)
+            LIMIT $2
+        ''', device_id, device_cache.n_alerts)
+
+    device_cache.seed(device_id, rows, alerts)
+    return format_device_context(device_id, rows, alerts)
 
+def format_device_context(device_id: str, rows: List[Dict], alerts: List[Dict]) -> str:
+    """Formats vitals and alerts (newest first) as a clean string for the LLM."""
     if not rows:
         return f"No recent data found for {device_id}."
 
-    # Format as a clean string for the LLM
     context = f"--- TELEMETRY LOG FOR {device_id} ---\n"
     for r in rows:
         context += f"Time: {r['timestamp']}, HR: {r['heart_rate']} bpm, SPO2: {r['spo2']}%\n"
@@ -38,4 +52,4 @@ async def get_device_context(device_id: str) -> str:
     for a in alerts:
         context += f"Time: {a['detected_at']}, Risk: {a['risk_level']}, Score: {a['anomaly_score']:.4f}\n"
         
-    return context
\ No newline at end of file
+    return context
@@ -1,65 +1,192 @@
+import time
 import numpy as np
-from sklearn.ensemble import IsolationForest
-import joblib
-import os
+from app.core.config import settings
+from app.services.features import build_feature_matrix, cold_features, feature_names
+from app.services.forest import CompiledForest
+from app.services.model_registry import ModelRegistry, config_hash
+
+# Everything that determines the baseline model; changing any of it
+# (or settings.MODEL_VERSION) produces a new artifact.
+BASELINE_CONFIG = {
+    "estimator": "IsolationForest",
+    "params": {"contamination": 0.05, "random_state": 42},
+    "training_data": "synthetic-normal-sequences",
+    "n_devices": 200,
+    "max_sequence_length": 120,
+    "seed": 42,
+    "feature_windows": sorted(settings.FEATURE_WINDOWS),
+    "features": feature_names(settings.FEATURE_WINDOWS),
+}
+
+def feature_config_hash(config: dict) -> str:
+    """Fingerprint of the feature layout a model was trained on (windows + columns)."""
+    return config_hash({"feature_windows": config.get("feature_windows"), "features": config.get("features")})
+
+def synthetic_sequences(n_devices: int, max_length: int, seed: int):
+    """
+    Normal patients as short random walks around a personal baseline.
+    Sequence lengths vary so the warm-up phase of every window (a device's
+    first readings) is well represented. Returns (device_ids, readings).
+    """
+    # Heart Rate: ~70-90, SPO2: ~97-99, Battery: ~50-100, slowly draining
+    rng = np.random.RandomState(seed)
+    device_ids, readings = [], []
+    for d in range(n_devices):
+        n = rng.randint(1, max_length + 1)
+        hr = rng.normal(80, 5) + np.cumsum(rng.normal(0, 0.6, n)) + rng.normal(0, 2, n)
+        spo2 = np.minimum(rng.normal(98, 0.6) + rng.normal(0, 0.5, n), 100)
+        battery = rng.uniform(50, 100) - np.cumsum(rng.uniform(0, 0.1, n))
+        device_ids += [f"synthetic-{d}"] * n
+        readings.append(np.c_[hr, spo2, battery])
+    return device_ids, np.vstack(readings)
+
+def vitals_score(hr, spo2) -> np.ndarray:
+    """
+    NEWS2 sub-scores for heart rate and SpO2 (scale 1), summed. A single
+    red value (HR <= 40 or >= 131, SpO2 <= 91) already scores 3.
+    """
+    hr, spo2 = np.asarray(hr, dtype=np.float64), np.asarray(spo2, dtype=np.float64)
+    hr_score = np.select([hr <= 40, hr <= 50, hr <= 90, hr <= 110, hr <= 130], [3, 1, 0, 1, 2], 3)
+    spo2_score = np.select([spo2 <= 91, spo2 <= 93, spo2 <= 95], [3, 2, 1], 0)
+    return hr_score + spo2_score
+
+def risk_levels(scores, hr, spo2) -> np.ndarray:
+    """Maps model scores to LOW/MEDIUM/HIGH, then raises acute vitals to HIGH."""
+    scores = np.asarray(scores, dtype=np.float64)
+    levels = np.where(scores < settings.RISK_HIGH_SCORE, "HIGH", np.where(scores < settings.RISK_MEDIUM_SCORE, "MEDIUM", "LOW"))
+    return np.where(vitals_score(hr, spo2) >= settings.RISK_VITALS_HIGH_SCORE, "HIGH", levels).astype(object)
+
+def fit_forest(X_train: np.ndarray, params: dict):
+    """Fits an IsolationForest and compiles it for inference. Returns (model, engine)."""
+    from sklearn.ensemble import IsolationForest # Heavy import, only needed to train
+
+    model = IsolationForest(**params)
+    model.fit(X_train)
+    return model, CompiledForest.from_isolation_forest(model)
 
 class AnomalyDetector:
     def __init__(self):
         self.model = None
+        # Flattened copy of the fitted forest used for inference
+        self.engine = None
         self.is_ready = False
+        self.model_version = None
+
+    def load_or_train(self, registry: ModelRegistry = None):
+        """
+        Startup entry point: loads the persisted artifact matching
+        settings.MODEL_VERSION and BASELINE_CONFIG (memory-mapped, no sklearn
+        import), and only trains + saves one when none exists yet.
+        """
+        registry = registry or ModelRegistry(settings.MODEL_DIR)
+        artifact_id = registry.artifact_id(settings.MODEL_VERSION, config_hash(BASELINE_CONFIG))
+
+        # Prefer the last model promoted by background retraining, if it belongs to
+        # this version and was trained on the current feature layout (FEATURE_WINDOWS)
+        active = registry.active()
+        if active and active.startswith(registry.artifact_id(settings.MODEL_VERSION, "")) and registry.exists(active):
+            trained_on = registry.metadata(active).get("config", {})
+            if feature_config_hash(trained_on) == feature_config_hash(BASELINE_CONFIG):
+                artifact_id = active
+            else:
+                print(f"⚠️ Ignoring active model {active}: trained on other feature windows, using the baseline.")
+
+        if registry.exists(artifact_id):
+            start = time.perf_counter()
+            self.engine = registry.load(artifact_id)
+            self.model_version = artifact_id
+            self.is_ready = True
+            print(f"✅ AI Model loaded from {artifact_id} in {(time.perf_counter() - start) * 1000:.1f} ms.")
+            return
+
+        self.train_baseline()
+        registry.save(artifact_id, self.engine, self.model, metadata={"config": BASELINE_CONFIG})
+        self.model_version = artifact_id
 
     def train_baseline(self):
         """
         Trains a simple Isolation Forest on startup using synthetic 'normal' data.
         """
-        # Generate synthetic 'normal' training data
-        # Heart Rate: ~70-90, SPO2: ~97-99, Battery: ~50-100
-        rng = np.random.RandomState(42)
-        X_train = np.c_[
-            rng.normal(80, 5, 500),   # HR
-            rng.normal(98, 1, 500),   # SPO2
-            rng.uniform(50, 100, 500) # Battery
-        ]
-        
-        self.model = IsolationForest(contamination=0.05, random_state=42)
-        self.model.fit(X_train)
+        # Generate synthetic 'normal' sequences and replay them through the feature engine
+        device_ids, readings = synthetic_sequences(
+            BASELINE_CONFIG["n_devices"],
+            BASELINE_CONFIG["max_sequence_length"],
+            BASELINE_CONFIG["seed"]
+        )
+        X_train = build_feature_matrix(device_ids, readings, BASELINE_CONFIG["feature_windows"])
+
+        self.model, self.engine = fit_forest(X_train, BASELINE_CONFIG["params"])
         self.is_ready = True
         print("✅ AI Model (Isolation Forest) trained and ready.")
 
+    def swap(self, engine: CompiledForest, model_version: str):
+        """
+        Atomically replaces the inference engine. predict() reads self.engine
+        once per call, so in-flight predictions finish on the old model and
+        later ones see the new one; nothing is paused.
+        """
+        self.engine = engine
+        self.model_version = model_version
+        self.model = None # The sklearn estimator lives in the registry artifact
+        self.is_ready = True
+
     def predict(self, hr: float, spo2: float, battery: float) -> dict:
         """
-        Analyzes telemetry and returns a risk assessment.
+        Stateless assessment of a single reading (no device history: every
+        rolling window holds just this value). Ingestion uses predict_features().
+        """
+        return self.predict_features(cold_features(np.array([hr, spo2, battery]), settings.FEATURE_WINDOWS)[0])
+
+    def predict_features(self, features: np.ndarray) -> dict:
+        """
+        Analyzes one feature vector (see app.services.features) and returns a risk assessment.
         ALWAYS returns 'risk_level' and 'anomaly_score'.
         """
+        engine = self.engine # Single read: stays consistent across a concurrent swap()
+
         # 1. Fallback: If model is not trained (e.g., during Unit Tests)
-        if not self.model or not self.is_ready:
+        if not engine or not self.is_ready:
             return {
                 "anomaly_score": 0.0,
                 "risk_level": "LOW", # <--- CRITICAL: This key must exist for tests to pass
                 "is_anomaly": False
             }
 
-        # 2. Real Prediction
-        features = np.array([[hr, spo2, battery]])
-        
+        # 2. Real Prediction (single tree traversal, no sklearn validation overhead)
         # decision_function: lower is more anomalous (negative = outlier)
-        score = self.model.decision_function(features)[0]
-        
-        # predict: -1 = anomaly, 1 = normal
-        label = self.model.predict(features)[0]
-
-        # 3. Determine Risk Level
-        # We map the raw score to a human-readable risk category
-        risk = "LOW"
-        if score < -0.15: 
-            risk = "HIGH"
-        elif score < -0.05: 
-            risk = "MEDIUM"
+        score = engine.decision_function_one(features)
+
+        return {
+            "anomaly_score": score,
+            "risk_level": risk_levels(score, features[0], features[1]).item(),      # <--- This is the key ingestion.py looks for
+            "is_anomaly": score < 0 # Same rule as IsolationForest.predict() == -1
+        }
+
+    def predict_batch(self, features: np.ndarray) -> dict:
+        """
+        Vectorized variant of predict_features() for an (n, n_features) matrix.
+        Scores the whole batch with a single decision_function call.
+        """
+        n = features.shape[0]
+        engine = self.engine # Single read: stays consistent across a concurrent swap()
+
+        # 1. Fallback: If model is not trained (e.g., during Unit Tests)
+        if not engine or not self.is_ready or n == 0:
+            return {
+                "anomaly_score": np.zeros(n),
+                "risk_level": np.full(n, "LOW", dtype=object),
+                "is_anomaly": np.zeros(n, dtype=bool)
+            }
+
+        # 2. Real Prediction
+        # IsolationForest.predict() is just `decision_function < 0`, so we
+        # derive the label from the same scores instead of traversing the trees twice.
+        scores = engine.decision_function(features)
 
         return {
-            "anomaly_score": float(score),
-            "risk_level": risk,      # <--- This is the key ingestion.py looks for
-            "is_anomaly": bool(label == -1)
+            "anomaly_score": scores,
+            "risk_level": risk_levels(scores, features[:, 0], features[:, 1]),
+            "is_anomaly": scores < 0
         }
 
 # Singleton Instance
@@ -0,0 +1,142 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from app.core.config import settings
+
+RISK_LEVELS = ["LOW", "MEDIUM", "HIGH"]
+
+def to_epoch(ts: datetime) -> float:
+    # Naive timestamps are stored by Postgres (TIMESTAMPTZ) as UTC
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+def from_epoch(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+class DeviceRing:
+    """
+    Fixed-size, array-backed history for one device: the last N vitals
+    (time, hr, spo2, battery) and the last M alerts (time, score, risk).
+    """
+    __slots__ = ("vitals", "vital_count", "alerts", "alert_count", "seeded_at")
+
+    def __init__(self, n_vitals: int, n_alerts: int):
+        self.vitals = np.zeros((n_vitals, 4), dtype=np.float64)
+        self.vital_count = 0
+        self.alerts = np.zeros((n_alerts, 3), dtype=np.float64)
+        self.alert_count = 0
+        self.seeded_at: Optional[float] = None # None until backfilled from Postgres
+
+    def add_vital(self, ts: float, hr: float, spo2: float, battery: float):
+        slot = self.vital_count % len(self.vitals)
+        self.vitals[slot] = (ts, hr, spo2, battery)
+        self.vital_count += 1
+
+    def add_alert(self, ts: float, score: float, risk: str):
+        slot = self.alert_count % len(self.alerts)
+        self.alerts[slot] = (ts, score, RISK_LEVELS.index(risk))
+        self.alert_count += 1
+
+    def recent_vitals(self) -> List[Dict]:
+        """Newest first, matching the ORDER BY timestamp DESC query it replaces."""
+        filled = self.vitals[:min(self.vital_count, len(self.vitals))]
+        rows = filled[np.argsort(-filled[:, 0], kind="stable")]
+        return [
+            {"timestamp": from_epoch(ts), "heart_rate": int(hr), "spo2": spo2, "battery_level": battery}
+            for ts, hr, spo2, battery in rows.tolist()
+        ]
+
+    def recent_alerts(self) -> List[Dict]:
+        filled = self.alerts[:min(self.alert_count, len(self.alerts))]
+        rows = filled[np.argsort(-filled[:, 0], kind="stable")]
+        return [
+            {"detected_at": from_epoch(ts), "anomaly_score": score, "risk_level": RISK_LEVELS[int(risk)]}
+            for ts, score, risk in rows.tolist()
+        ]
+
+class DeviceContextCache:
+    """
+    In-process LRU of DeviceRings used by the assistant's context lookup.
+    Rings are created on the first lookup for a device, backfilled once from
+    Postgres, and from then on kept current by the ingest path, so repeat
+    lookups need no database round trip. Readings ingested while the backfill
+    query is in flight are recorded and merged into the result.
+    """
+    def __init__(self, max_devices: int, n_vitals: int, n_alerts: int, ttl_s: float):
+        self.max_devices = max_devices
+        self.n_vitals = n_vitals
+        self.n_alerts = n_alerts
+        self.ttl_s = ttl_s
+        self._rings: "OrderedDict[str, DeviceRing]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def get(self, device_id: str) -> Optional[DeviceRing]:
+        """Returns the device's ring if it is backfilled and fresh, else None."""
+        ring = self._rings.get(device_id)
+        if ring is None or ring.seeded_at is None:
+            return None
+        if self.ttl_s and time.monotonic() - ring.seeded_at > self.ttl_s:
+            # Rows may have been written outside this process (e.g. backfills)
+            del self._rings[device_id]
+            return None
+        self._rings.move_to_end(device_id)
+        return ring
+
+    def begin_seed(self, device_id: str):
+        """Starts recording a device's ingest ahead of its Postgres backfill."""
+        if device_id not in self._rings:
+            self._insert(device_id, DeviceRing(self.n_vitals, self.n_alerts))
+
+    def seed(self, device_id: str, rows: List[Dict], alerts: List[Dict]):
+        """Merges Postgres history with anything recorded since begin_seed()."""
+        pending = self._rings.get(device_id) or DeviceRing(self.n_vitals, self.n_alerts)
+        ring = DeviceRing(self.n_vitals, self.n_alerts)
+
+        vitals = {
+            (to_epoch(r["timestamp"]), r["heart_rate"], r["spo2"], r["battery_level"]) for r in rows
+        } | {
+            (r["timestamp"].timestamp(), r["heart_rate"], r["spo2"], r["battery_level"]) for r in pending.recent_vitals()
+        }
+        for vital in sorted(vitals)[-self.n_vitals:]:
+            ring.add_vital(*vital)
+
+        merged_alerts = {
+            (to_epoch(a["detected_at"]), a["anomaly_score"], a["risk_level"]) for a in alerts
+        } | {
+            (a["detected_at"].timestamp(), a["anomaly_score"], a["risk_level"]) for a in pending.recent_alerts()
+        }
+        for alert in sorted(merged_alerts)[-self.n_alerts:]:
+            ring.add_alert(*alert)
+
+        ring.seeded_at = time.monotonic()
+        self._insert(device_id, ring)
+
+    def record(self, device_id: str, timestamp: datetime, hr: float, spo2: float, battery: float,
+               risk: str, score: float, detected_at: Optional[datetime] = None):
+        """Ingest hook: O(1) append for devices already tracked, no-op otherwise."""
+        ring = self._rings.get(device_id)
+        if ring is None:
+            return
+        ring.add_vital(to_epoch(timestamp), hr, spo2, battery)
+        if risk == "HIGH":
+            ring.add_alert(to_epoch(detected_at or datetime.now(timezone.utc)), score, risk)
+
+    def _insert(self, device_id: str, ring: DeviceRing):
+        self._rings[device_id] = ring
+        self._rings.move_to_end(device_id)
+        while len(self._rings) > self.max_devices:
+            self._rings.popitem(last=False) # Evict least recently used device
+
+# Singleton
+device_cache = DeviceContextCache(
+    max_devices=settings.CONTEXT_CACHE_MAX_DEVICES,
+    n_vitals=settings.CONTEXT_CACHE_VITALS,
+    n_alerts=settings.CONTEXT_CACHE_ALERTS,
+    ttl_s=settings.CONTEXT_CACHE_TTL_S
+)
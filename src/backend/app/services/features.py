@@ -0,0 +1,252 @@
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from app.core.config import settings
+
+RAW_FEATURES = ["heart_rate", "spo2", "battery_level"]
+# Vitals whose trends we track (battery drains steadily and is not clinical)
+ROLLING_SIGNALS = ["heart_rate", "spo2"]
+ROLLING_STATS = ["mean", "std", "slope", "min", "max"]
+
+# Exact sums are recomputed from the ring every this many windows to cancel float drift
+RESYNC_EVERY_WINDOWS = 16
+
+def feature_names(windows: Sequence[int]) -> List[str]:
+    """Column order of every feature vector produced by this module."""
+    return RAW_FEATURES + [
+        f"{signal}_{stat}_{window}"
+        for signal in ROLLING_SIGNALS
+        for window in sorted(windows)
+        for stat in ROLLING_STATS
+    ]
+
+def cold_features(readings: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    """
+    Feature rows for devices with no history: every window holds just the
+    current reading (mean = min = max = value, std = slope = 0). Used for
+    stateless scoring and validation canaries.
+    """
+    readings = np.asarray(readings, dtype=np.float64).reshape(-1, len(RAW_FEATURES))
+    signals = readings[:, :len(ROLLING_SIGNALS)]
+    zeros = np.zeros_like(signals)
+    # (n, signal, stat) -> repeated per window -> (n, signal, window, stat)
+    per_signal = np.stack([signals, zeros, zeros, signals, signals], axis=-1)
+    rolling = np.repeat(per_signal[:, :, None, :], len(windows), axis=2)
+    return np.hstack([readings, rolling.reshape(len(readings), -1)])
+
+class RollingFeatureStore:
+    """
+    Per-device rolling statistics over the last N readings, for each window
+    in settings.FEATURE_WINDOWS.
+
+    State is slot-indexed NumPy arrays (one row per tracked device) rather
+    than per-device objects: a ring of the last max(windows) values plus
+    running sum, sum of squares and index-weighted sum per window. Each
+    reading updates them in O(1), giving mean, std and least-squares slope
+    (per reading) without touching history. Min/max are carried forward
+    and only rescanned when the value leaving the window was the extreme.
+    Devices idle longer than FEATURE_IDLE_TTL_S are evicted, and the least
+    recently seen device makes room when all slots are taken.
+    """
+    def __init__(self, windows: Optional[Sequence[int]] = None, max_devices: Optional[int] = None, idle_ttl_s: Optional[float] = None):
+        self.windows = np.array(sorted(windows or settings.FEATURE_WINDOWS), dtype=np.int64)
+        self.max_window = int(self.windows.max())
+        self.max_devices = max_devices or settings.FEATURE_MAX_DEVICES
+        self.idle_ttl_s = idle_ttl_s if idle_ttl_s is not None else settings.FEATURE_IDLE_TTL_S
+        self.names = feature_names(self.windows.tolist())
+
+        # Per slot: ring of recent values, and for every (signal, window) pair
+        # the running sum, sum of squares, sum(i * y) (i = 0 for the oldest
+        # value in the window), min and max
+        self.ring = np.zeros((self.max_devices, len(ROLLING_SIGNALS), self.max_window))
+        self.state = np.zeros((self.max_devices, 5, len(ROLLING_SIGNALS) * len(self.windows)))
+        self.count = np.zeros(self.max_devices, dtype=np.int64)
+        self.last_seen = np.full(self.max_devices, np.inf) # inf marks a free slot
+
+        self.slots: Dict[str, int] = {}
+        self.owner: List[Optional[str]] = [None] * self.max_devices
+        self.free = list(range(self.max_devices - 1, -1, -1))
+        self.evicted = 0
+        self._updates = 0
+        self._window_list = [int(w) for w in self.windows]
+
+        # Closed-form index sums for a window holding n values (i = 0..n-1)
+        n = np.arange(self.max_window + 1, dtype=np.float64)
+        self._sum_i = (n * (n - 1) / 2).tolist()
+        sum_ii = (n - 1) * n * (2 * n - 1) / 6
+        self._slope_denominator = (n * sum_ii - (n * (n - 1) / 2) ** 2).tolist()
+
+    @property
+    def n_features(self) -> int:
+        return len(self.names)
+
+    def update(self, device_id: str, reading: Sequence[float], now: Optional[float] = None) -> np.ndarray:
+        """Adds one (hr, spo2, battery) reading and returns the device's feature vector."""
+        reading = [float(v) for v in reading]
+        slot = self._slot(device_id, time.monotonic() if now is None else now)
+        return np.array(reading + self._push(slot, reading[:len(ROLLING_SIGNALS)]))
+
+    def update_batch(self, device_ids: Sequence[str], readings: np.ndarray, now: Optional[float] = None) -> np.ndarray:
+        """Applies readings in order (a device may appear several times). Returns (n, n_features)."""
+        readings = np.asarray(readings, dtype=np.float64).reshape(-1, len(RAW_FEATURES))
+        now = time.monotonic() if now is None else now
+        out = np.empty((len(readings), self.n_features))
+        for i, (device_id, reading) in enumerate(zip(device_ids, readings)):
+            out[i] = self.update(device_id, reading, now)
+        return out
+
+    def checkpoint(self, device_ids: Sequence[str]) -> Dict[str, list]:
+        """
+        Saves these devices' state before their readings are applied, so
+        restore() can roll the readings back if ingest then rejects them.
+        """
+        saved: Dict[str, list] = {}
+        for device_id in device_ids:
+            if device_id in saved:
+                saved[device_id][0] += 1
+                continue
+            slot = self.slots.get(device_id)
+            snapshot = None if slot is None else (
+                int(self.count[slot]), self.ring[slot].copy(), self.state[slot].copy(), float(self.last_seen[slot])
+            )
+            saved[device_id] = [1, snapshot]
+        return saved
+
+    def restore(self, checkpoint: Dict[str, list]):
+        """
+        Undoes the readings applied since checkpoint(). A device that was
+        evicted, or has taken further readings since, is left as it is.
+        """
+        for device_id, (n, snapshot) in checkpoint.items():
+            slot = self.slots.get(device_id)
+            before = 0 if snapshot is None else snapshot[0]
+            if slot is None or self.count[slot] != before + n:
+                continue
+            if snapshot is None:
+                self._release(slot)
+                self.evicted -= 1 # A new device rolled back, not evicted
+            else:
+                self.count[slot], self.ring[slot], self.state[slot], self.last_seen[slot] = snapshot
+
+    def _slot(self, device_id: str, now: float) -> int:
+        slot = self.slots.get(device_id)
+        if slot is None:
+            self._updates += 1
+            if self._updates % 1024 == 0:
+                self.evict_idle(now)
+            if not self.free:
+                # Full: make room by dropping the least recently seen device
+                self._release(int(np.argmin(self.last_seen)))
+            slot = self.free.pop()
+            self.slots[device_id] = slot
+            self.owner[slot] = device_id
+        self.last_seen[slot] = now
+        return slot
+
+    def _release(self, slot: int):
+        del self.slots[self.owner[slot]]
+        self.owner[slot] = None
+        self.count[slot] = 0
+        self.state[slot] = 0.0
+        self.last_seen[slot] = np.inf
+        self.free.append(slot)
+        self.evicted += 1
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drops devices not seen for idle_ttl_s. Returns how many were evicted."""
+        now = time.monotonic() if now is None else now
+        idle = np.nonzero(self.last_seen < now - self.idle_ttl_s)[0]
+        for slot in idle:
+            self._release(int(slot))
+        return len(idle)
+
+    def _push(self, slot: int, x: List[float]) -> List[float]:
+        """
+        Applies one reading to the slot's running sums and returns the rolling
+        features. The per-(signal, window) math runs on Python floats: with a
+        handful of pairs that is several times cheaper than tiny NumPy ops.
+        """
+        c = int(self.count[slot])
+        W = self.max_window
+        ring = self.ring[slot]
+        total, sumsq, sum_iy, lo, hi = self.state[slot].tolist()
+        # Value leaving each window (only meaningful once the window is full)
+        leaving = ring[:, (c - self.windows) % W].tolist() if c >= self._window_list[0] else None
+
+        features = []
+        j = 0
+        for s, value in enumerate(x):
+            for k, w in enumerate(self._window_list):
+                if c >= w:
+                    # 1. Slide: drop the oldest value, shift remaining indices down by one,
+                    # append the new value at index w - 1
+                    old = leaving[s][k]
+                    t = total[j] - old
+                    iy = sum_iy[j] - t + (w - 1) * value
+                    sq = sumsq[j] - old * old + value * value
+                    t += value
+                    n = w
+                    # 3. Carry min/max forward; rescan only if the extreme just left
+                    if old <= lo[j] or old >= hi[j]:
+                        ring[s, c % W] = value
+                        window = ring[s, (np.arange(c + 1 - w, c + 1)) % W]
+                        lo[j], hi[j] = float(window.min()), float(window.max())
+                    else:
+                        lo[j] = min(lo[j], value)
+                        hi[j] = max(hi[j], value)
+                else:
+                    # 2. Growing window: append at index c
+                    t = total[j] + value
+                    iy = sum_iy[j] + c * value
+                    sq = sumsq[j] + value * value
+                    n = c + 1
+                    lo[j] = value if c == 0 else min(lo[j], value)
+                    hi[j] = value if c == 0 else max(hi[j], value)
+                total[j], sumsq[j], sum_iy[j] = t, sq, iy
+
+                mean = t / n
+                std = math.sqrt(max(sq / n - mean * mean, 0.0))
+                denominator = self._slope_denominator[n]
+                slope = (n * iy - self._sum_i[n] * t) / denominator if denominator > 0 else 0.0
+                features += [mean, std, slope, lo[j], hi[j]]
+                j += 1
+
+        ring[:, c % W] = x
+        self.state[slot] = [total, sumsq, sum_iy, lo, hi]
+        self.count[slot] = c + 1
+        if (c + 1) % (W * RESYNC_EVERY_WINDOWS) == 0:
+            self._resync(slot)
+        return features
+
+    def _resync(self, slot: int):
+        """Recomputes the running sums exactly from the ring to cancel float drift."""
+        c = int(self.count[slot])
+        j = 0
+        for s in range(len(ROLLING_SIGNALS)):
+            for w in self._window_list:
+                n = min(c, w)
+                values = self.ring[slot, s, np.arange(c - n, c) % self.max_window]
+                self.state[slot, 0, j] = values.sum()
+                self.state[slot, 1, j] = values @ values
+                self.state[slot, 2, j] = values @ np.arange(n, dtype=np.float64)
+                j += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "devices": len(self.slots),
+            "capacity": self.max_devices,
+            "evicted": self.evicted
+        }
+
+def build_feature_matrix(device_ids: Sequence[str], readings: np.ndarray, windows: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Replays chronologically ordered readings through a fresh store, giving
+    the exact feature rows live ingestion would have produced (training).
+    """
+    store = RollingFeatureStore(windows, max_devices=max(len(set(device_ids)), 1), idle_ttl_s=math.inf)
+    return store.update_batch(device_ids, readings, now=0.0)
+
+# Singleton
+feature_store = RollingFeatureStore()
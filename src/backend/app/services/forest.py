@@ -0,0 +1,116 @@
+import numpy as np
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """
+    c(n): average path length of an unsuccessful BST search over n samples
+    (same definition as sklearn's _average_path_length).
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    big = n_samples > 2
+    result[big] = 2.0 * (np.log(n_samples[big] - 1.0) + np.euler_gamma) - 2.0 * (n_samples[big] - 1.0) / n_samples[big]
+    return result
+
+class CompiledForest:
+    """
+    A fitted IsolationForest flattened into contiguous NumPy arrays.
+
+    All trees' nodes are concatenated; leaves point to themselves, so every
+    sample can be advanced through every tree in lock-step for a fixed number
+    of steps (the forest's max depth) with pure array indexing. Each leaf
+    stores its precomputed path length (depth + c(n_node_samples)), so a
+    score is one gather and a sum. This replaces sklearn's per-call input
+    validation and its separate decision_function/predict traversals.
+    """
+    def __init__(self, feature, threshold, left, right, leaf_path_length, roots, max_depth, denominator, offset):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_path_length = leaf_path_length
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.denominator = float(denominator)
+        self.offset = float(offset)
+
+    @classmethod
+    def from_isolation_forest(cls, model) -> "CompiledForest":
+        n_features = model.n_features_in_
+        subsample_features = model._max_features != n_features
+
+        features, thresholds, lefts, rights, leaf_lengths, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for tree, tree_features in zip(model.estimators_, model.estimators_features_):
+            t = tree.tree_
+            n_nodes = t.node_count
+            node_ids = np.arange(n_nodes) + offset
+            is_leaf = t.children_left == -1
+
+            # Depth of every node (parents always precede children in sklearn trees)
+            depth = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[t.children_left[node]] = depth[node] + 1
+                    depth[t.children_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            feature = np.where(is_leaf, 0, t.feature).astype(np.int64)
+            if subsample_features:
+                # Trees were fit on a column subset; map back to input columns
+                feature = np.asarray(tree_features, dtype=np.int64)[feature]
+
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, t.threshold))
+            lefts.append(np.where(is_leaf, node_ids, t.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, t.children_right + offset))
+            leaf_lengths.append(np.where(is_leaf, depth + average_path_length(t.n_node_samples), 0.0))
+            roots.append(offset)
+            offset += n_nodes
+
+        n_trees = len(model.estimators_)
+        denominator = n_trees * average_path_length(np.array([model.max_samples_]))[0]
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int64),
+            right=np.concatenate(rights).astype(np.int64),
+            leaf_path_length=np.concatenate(leaf_lengths).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int64),
+            max_depth=max_depth,
+            denominator=denominator,
+            offset=model.offset_
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _score_from_path_lengths(self, total):
+        # score_samples = -2^(-E[h(x)] / c(max_samples)); decision = score - offset
+        if self.denominator == 0:
+            return -1.0 - self.offset
+        return -np.exp2(-total / self.denominator) - self.offset
+
+    def decision_function_one(self, x: np.ndarray) -> float:
+        """Single-sample fast path: advances one node per tree, max_depth times."""
+        # sklearn evaluates trees on float32 inputs; do the same for identical splits
+        x = np.asarray(x, dtype=np.float32).astype(np.float64)
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            nodes = np.where(x[self.feature[nodes]] <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+        return float(self._score_from_path_lengths(self.leaf_path_length[nodes].sum()))
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Vectorized path: an (n_samples, n_trees) node matrix advanced in lock-step."""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.shape[0] == 0:
+            return np.zeros(0)
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            values = np.take_along_axis(X, self.feature[nodes], axis=1)
+            nodes = np.where(values <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+        return self._score_from_path_lengths(self.leaf_path_length[nodes].sum(axis=1))
@@ -0,0 +1,112 @@
+import io
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.archive import date_prefix
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# Columns a client may request; device_id comes from the partition path
+ARCHIVE_COLUMNS = ["device_id", "timestamp", "heart_rate", "spo2", "risk_level", "patient_id_hash"]
+DEFAULT_COLUMNS = ["device_id", "timestamp", "heart_rate", "spo2", "risk_level"]
+
+# Continuation marker + zero length, closing an Arrow IPC stream
+IPC_END_OF_STREAM = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+def as_utc(ts: datetime) -> datetime:
+    """Archive timestamps are UTC; naive query bounds are interpreted as UTC."""
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def history_schema(columns: List[str]) -> Dict[str, "pl.DataType"]:
+    """Result schema for the requested columns, so empty and chunked results agree."""
+    import polars as pl
+    dtypes = {
+        "device_id": pl.String,
+        "timestamp": pl.Datetime("us", "UTC"),
+        "heart_rate": pl.Int64,
+        "spo2": pl.Float64,
+        "risk_level": pl.String,
+        "patient_id_hash": pl.String
+    }
+    return {name: dtypes[name] for name in columns}
+
+def list_partition_files(store, device_id: str, start: datetime, end: datetime) -> List[List[str]]:
+    """
+    Partition pruning: only lists the device's date prefixes inside the range
+    and keeps the hour partitions that overlap [start, end]. Returns the
+    files grouped per hour partition, oldest hour first.
+    """
+    start, end = as_utc(start), as_utc(end)
+    hours = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        prefix = date_prefix(device_id, day)
+        by_hour: Dict[int, List[str]] = {}
+        for obj in store.list(prefix):
+            hour_part = obj.key[len(prefix):].split("/", 1)[0] # "hour=HH"
+            hour = int(hour_part.split("=")[1])
+            hour_start = day + timedelta(hours=hour)
+            if hour_start <= end and hour_start + timedelta(hours=1) > start:
+                by_hour.setdefault(hour, []).append(store.uri(obj.key))
+        hours.extend(by_hour[hour] for hour in sorted(by_hour))
+        day += timedelta(days=1)
+    return hours
+
+def read_history(store, partitions: List[List[str]], start: datetime, end: datetime,
+                 columns: List[str], limit: Optional[int] = None) -> Iterator["pl.DataFrame"]:
+    """
+    Reads the range one hour partition at a time. A partition only holds its
+    own hour, so sorting each one yields the whole range in timestamp order
+    while memory stays bounded by a single hour of one device. The time
+    filter and column projection are pushed down into the Parquet reader.
+    """
+    import polars as pl
+    start, end = as_utc(start), as_utc(end)
+    schema = history_schema(columns)
+    remaining = limit
+    for sources in partitions:
+        if remaining is not None and remaining <= 0:
+            return
+        lf = (
+            pl.scan_parquet(
+                sources,
+                hive_partitioning=True,
+                hive_schema={"device_id": pl.String, "date": pl.String, "hour": pl.Int32},
+                storage_options=store.storage_options
+            )
+            .filter(pl.col("timestamp").is_between(start, end))
+            .select(columns)
+            .sort("timestamp")
+        )
+        if remaining is not None:
+            lf = lf.limit(remaining)
+        df = lf.collect().cast(schema)
+        if df.height:
+            if remaining is not None:
+                remaining -= df.height
+            yield df
+
+def ipc_stream(frames: Iterable["pl.DataFrame"], schema: Dict[str, "pl.DataType"]) -> Iterator[bytes]:
+    """
+    Encodes frames as a single Arrow IPC stream, incrementally: the schema
+    message first, then each frame's record batches, then end-of-stream.
+    Polars only writes complete streams, so every frame's stream is split
+    into its schema message (skipped) and batches. An empty result is still
+    a valid stream carrying the schema.
+    """
+    import polars as pl
+
+    def encode(df: "pl.DataFrame") -> Tuple[bytes, bytes]:
+        buffer = io.BytesIO()
+        df.write_ipc_stream(buffer)
+        data = buffer.getvalue()
+        # Message framing: 0xFFFFFFFF, int32 metadata length, metadata (the schema has no body)
+        schema_end = 8 + struct.unpack_from("<i", data, 4)[0]
+        return data[:schema_end], data[schema_end:-len(IPC_END_OF_STREAM)]
+
+    yield encode(pl.DataFrame(schema=schema))[0]
+    for df in frames:
+        yield encode(df)[1]
+    yield IPC_END_OF_STREAM
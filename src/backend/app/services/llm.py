@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+from app.core.config import settings
+
+class FakeLLM:
+    """
+    Offline stand-in for AsyncOpenAI (settings.LLM_BACKEND = "fake").
+    Implements the subset of `client.chat.completions.create` used by the
+    assistant, emitting a canned reply word by word with a fixed delay so
+    streaming latency (time-to-first-token) can be exercised without a key.
+    """
+    def __init__(self, first_token_delay_ms: float, token_delay_ms: float):
+        self.first_token_delay = first_token_delay_ms / 1000
+        self.token_delay = token_delay_ms / 1000
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @staticmethod
+    def reply_for(messages) -> str:
+        user_query = messages[-1]["content"]
+        has_context = "CURRENT PATIENT DATA" in messages[0]["content"]
+        source = "the attached telemetry" if has_context else "general medical knowledge"
+        return f"[offline assistant] Based on {source}: no acute findings for '{user_query}'. Clinical verification required."
+
+    async def _create(self, model: str, messages, stream: bool = False, **kwargs):
+        reply = self.reply_for(messages)
+        if not stream:
+            await asyncio.sleep(self.first_token_delay)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+        return FakeStream(reply, self.first_token_delay, self.token_delay)
+
+class FakeStream:
+    """Async iterator of OpenAI-shaped stream chunks."""
+    def __init__(self, reply: str, first_token_delay: float, token_delay: float):
+        self.tokens = [word + " " for word in reply.split(" ")]
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.first_token_delay)
+        for i, token in enumerate(self.tokens):
+            if self.closed:
+                return
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        self.closed = True
+
+class LazyOpenAI:
+    """
+    AsyncOpenAI created on first use. Importing the SDK alone costs ~0.5 s
+    (its generated type modules), which workers that never chat should not pay.
+    """
+    def __init__(self, api_key: str):
+        self._api_key = api_key
+        self._client = None
+
+    def __getattr__(self, name):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return getattr(self._client, name)
+
+def create_llm_client():
+    """Returns the chat completion client selected by settings.LLM_BACKEND (None if unconfigured)."""
+    if settings.LLM_BACKEND == "fake":
+        return FakeLLM(settings.LLM_FAKE_FIRST_TOKEN_MS, settings.LLM_FAKE_TOKEN_MS)
+
+    # Settings only enforce the key for the full profile
+    if not settings.OPENAI_API_KEY:
+        return None
+    return LazyOpenAI(api_key=settings.OPENAI_API_KEY)
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+from app.services.forest import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+# CompiledForest arrays persisted as individual .npy files (memory-mappable)
+ENGINE_ARRAYS = ["feature", "threshold", "left", "right", "leaf_path_length", "roots"]
+ENGINE_SCALARS = ["max_depth", "denominator", "offset"]
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable fingerprint of everything that determines a trained model."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+class ModelRegistry:
+    """
+    On-disk store of fitted anomaly models.
+
+    Each artifact is a directory `<name>-<version>-<hash>/` holding the
+    compiled inference arrays as .npy files, the sklearn estimator
+    (joblib, for inspection/retraining) and meta.json. Arrays are loaded
+    with mmap_mode="r", so every worker process maps the same pages from the
+    OS page cache instead of holding a private copy.
+    """
+    def __init__(self, root: str, name: str = "isolation-forest"):
+        self.root = Path(root)
+        self.name = name
+
+    def artifact_id(self, version: str, digest: str) -> str:
+        return f"{self.name}-{version}-{digest}"
+
+    def path(self, artifact_id: str) -> Path:
+        return self.root / artifact_id
+
+    def exists(self, artifact_id: str) -> bool:
+        return (self.path(artifact_id) / "meta.json").exists()
+
+    def save(self, artifact_id: str, engine: CompiledForest, model=None, metadata: Optional[Dict[str, Any]] = None) -> Path:
+        """Writes an artifact atomically (staging dir + rename). Existing artifacts win."""
+        target = self.path(artifact_id)
+        staging = self.root / f".staging-{artifact_id}-{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+
+        try:
+            for name in ENGINE_ARRAYS:
+                np.save(staging / f"{name}.npy", np.ascontiguousarray(getattr(engine, name)))
+            if model is not None:
+                import joblib
+                joblib.dump(model, staging / "model.joblib")
+
+            meta = {
+                "artifact_id": artifact_id,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "engine": {name: getattr(engine, name) for name in ENGINE_SCALARS},
+                **(metadata or {})
+            }
+            (staging / "meta.json").write_text(json.dumps(meta, indent=2, default=str))
+
+            os.rename(staging, target)
+            logger.info(f"MODEL: Saved artifact {artifact_id}")
+        except OSError:
+            # Another worker published the same artifact first; keep theirs
+            if not self.exists(artifact_id):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return target
+
+    def load(self, artifact_id: str) -> CompiledForest:
+        """Loads the compiled engine memory-mapped (read-only)."""
+        path = self.path(artifact_id)
+        meta = self.metadata(artifact_id)
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r").view(np.ndarray)
+            for name in ENGINE_ARRAYS
+        }
+        return CompiledForest(**arrays, **meta["engine"])
+
+    def load_model(self, artifact_id: str):
+        """Loads the full sklearn estimator (only needed for retraining/inspection)."""
+        import joblib
+        return joblib.load(self.path(artifact_id) / "model.joblib")
+
+    def activate(self, artifact_id: str):
+        """Points ACTIVE at an artifact so the next process start loads it."""
+        tmp = self.root / f".ACTIVE.{uuid.uuid4().hex}.tmp"
+        tmp.write_text(artifact_id)
+        os.replace(tmp, self.root / "ACTIVE")
+        logger.info(f"MODEL: Activated artifact {artifact_id}")
+
+    def active(self) -> Optional[str]:
+        try:
+            return (self.root / "ACTIVE").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def metadata(self, artifact_id: str) -> Dict[str, Any]:
+        return json.loads((self.path(artifact_id) / "meta.json").read_text())
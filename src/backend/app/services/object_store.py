@@ -0,0 +1,125 @@
+import io
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+@dataclass
+class ObjectInfo:
+    key: str
+    size: int
+
+class MinioObjectStore:
+    """Thin wrapper over a single MinIO bucket (the production archive)."""
+    def __init__(self, client, bucket_name: str):
+        self.client = client
+        self.bucket_name = bucket_name
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket_name}/{key}"
+
+    @property
+    def storage_options(self) -> Optional[Dict[str, str]]:
+        """Credentials for readers (Polars) that access objects directly by URI."""
+        return {
+            "aws_endpoint_url": "http://" + settings.MINIO_ENDPOINT.replace("http://", ""),
+            "aws_access_key_id": settings.MINIO_ROOT_USER,
+            "aws_secret_access_key": settings.MINIO_ROOT_PASSWORD,
+            "aws_region": "us-east-1",
+            "aws_allow_http": "true"
+        }
+
+    def ensure_bucket(self):
+        if not self.client.bucket_exists(self.bucket_name):
+            self.client.make_bucket(self.bucket_name)
+
+    def put(self, key: str, data: bytes):
+        # A single PUT is atomic: readers see either no object or the whole file
+        self.client.put_object(
+            self.bucket_name,
+            key,
+            io.BytesIO(data),
+            length=len(data),
+            content_type="application/octet-stream"
+        )
+
+    def get(self, key: str) -> bytes:
+        response = self.client.get_object(self.bucket_name, key)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def list(self, prefix: str = "") -> List[ObjectInfo]:
+        return [
+            ObjectInfo(key=obj.object_name, size=obj.size)
+            for obj in self.client.list_objects(self.bucket_name, prefix=prefix or None, recursive=True)
+        ]
+
+    def remove(self, keys: List[str]):
+        from minio.deleteobjects import DeleteObject
+        errors = list(self.client.remove_objects(self.bucket_name, [DeleteObject(k) for k in keys]))
+        if errors:
+            raise IOError(f"Failed to delete {len(errors)} objects: {errors[0]}")
+
+class LocalObjectStore:
+    """
+    Filesystem stand-in for MinIO (local development and tests).
+    Objects live at <root>/<bucket>/<key>.
+    """
+    def __init__(self, root: str, bucket_name: str):
+        self.bucket_name = bucket_name
+        self.path = Path(root) / bucket_name
+        self.storage_options = None
+
+    def uri(self, key: str) -> str:
+        return str(self.path / key)
+
+    def ensure_bucket(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def put(self, key: str, data: bytes):
+        target = self.path / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so readers never observe a partial file
+        tmp = target.parent / f".{target.name}.{uuid.uuid4().hex}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+
+    def get(self, key: str) -> bytes:
+        return (self.path / key).read_bytes()
+
+    def list(self, prefix: str = "") -> List[ObjectInfo]:
+        if not self.path.exists():
+            return []
+        objects = []
+        for file in self.path.rglob("*"):
+            if not file.is_file() or file.name.startswith("."):
+                continue
+            key = file.relative_to(self.path).as_posix()
+            if key.startswith(prefix):
+                objects.append(ObjectInfo(key=key, size=file.stat().st_size))
+        return sorted(objects, key=lambda o: o.key)
+
+    def remove(self, keys: List[str]):
+        for key in keys:
+            (self.path / key).unlink(missing_ok=True)
+
+def create_object_store(bucket_name: str, minio_client=None):
+    """Builds the archive store selected by settings.ARCHIVE_BACKEND."""
+    if settings.ARCHIVE_BACKEND == "local":
+        return LocalObjectStore(settings.ARCHIVE_LOCAL_PATH, bucket_name)
+
+    if minio_client is None:
+        from minio import Minio
+        minio_client = Minio(
+            settings.MINIO_ENDPOINT.replace("http://", ""), # Strip protocol if present
+            access_key=settings.MINIO_ROOT_USER,
+            secret_key=settings.MINIO_ROOT_PASSWORD,
+            secure=False # Dev mode (No SSL)
+        )
+    return MinioObjectStore(minio_client, bucket_name)
@@ -2,14 +2,19 @@
 src/backend/app/services/report.py
 """
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_JUSTIFY
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Optional
 from xml.sax.saxutils import escape
+from app.core.config import settings
+from app.services.response_cache import ResponseCache
+import asyncio
+import hashlib
 import io
+import multiprocessing
+
+# ReportLab (~90 ms, several MB) is imported inside the rendering functions:
+# they run in the renderer's worker processes, so API workers never load it.
 
 # --- Page Decorations ---
 
@@ -24,6 +29,7 @@ def on_every_page(canvas, doc):
 
 def add_header(canvas, doc):
     """Draws the company logo and contact info on every page."""
+    from reportlab.lib import colors
     canvas.saveState()
     
     # 1. Simple Logo Placeholder (Blue Cross)
@@ -43,12 +49,13 @@ def add_header(canvas, doc):
     canvas.setFont('Helvetica', 8)
     canvas.setFillColor(colors.grey)
     canvas.drawString(logo_x + 30, logo_y, "Clinical Monitoring Solutions | Confidential")
-    canvas.drawString(logo_x + 30, logo_y - 10, f"Report ID: {datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    canvas.drawString(logo_x + 30, logo_y - 10, f"Report ID: {doc.report_id}")
 
     canvas.restoreState()
 
 def add_footer(canvas, doc):
     """Draws the disclaimer and page number on every page."""
+    from reportlab.lib import colors
     canvas.saveState()
     
     # Horizontal Rule
@@ -68,9 +75,72 @@ def add_footer(canvas, doc):
     
     canvas.restoreState()
 
+# --- Styles (built once per process) ---
+
+_STYLES = None
+
+def get_styles() -> dict:
+    """
+    Returns the report's ParagraphStyles. getSampleStyleSheet() and the
+    derived styles are immutable for our purposes, so they are compiled once
+    per process instead of on every report.
+    """
+    global _STYLES
+    if _STYLES is not None:
+        return _STYLES
+
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_JUSTIFY
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    _STYLES = {
+        "title": ParagraphStyle(
+            'ReportTitle',
+            parent=styles['Heading1'],
+            fontName='Helvetica-Bold',
+            fontSize=18,
+            leading=22,
+            textColor=colors.black,
+            spaceAfter=12
+        ),
+        "metadata_label": ParagraphStyle('MetaLabel', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=10),
+        "metadata_value": ParagraphStyle('MetaValue', parent=styles['Normal'], fontName='Helvetica', fontSize=10),
+        # Use a serif font for the body for a formal look, with justified alignment
+        "body": ParagraphStyle(
+            'BodyText',
+            parent=styles['Normal'],
+            fontName='Times-Roman',
+            fontSize=11,
+            leading=15,
+            alignment=TA_JUSTIFY,
+            spaceBefore=6,
+            spaceAfter=6
+        ),
+    }
+    return _STYLES
+
 # --- Main Generator Function ---
 
 def generate_medical_pdf(device_id: str, content: str) -> io.BytesIO:
+    """Synchronous, in-process rendering (scripts/tests). The API uses report_renderer."""
+    return io.BytesIO(render_medical_pdf(device_id, content, datetime.now(timezone.utc).date()))
+
+def report_id(device_id: str, content: str, generated_on: date) -> str:
+    """Generation date plus a content fingerprint: the same report gets the same id all day."""
+    digest = hashlib.sha256(f"{device_id}\0{content}".encode()).hexdigest()[:8]
+    return f"{generated_on:%Y%m%d}-{digest}"
+
+def render_medical_pdf(device_id: str, content: str, generated_on: date) -> bytes:
+    """
+    Renders the report and returns the PDF bytes (CPU-bound; run in a worker).
+    Only the generation date (UTC) is printed, so the bytes are identical for
+    every render of the same content that day and can be cached.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+
     buffer = io.BytesIO()
     
     # Define Document structure with professional margins
@@ -80,34 +150,15 @@ def generate_medical_pdf(device_id: str, content: str) -> io.BytesIO:
         rightMargin=50, leftMargin=50,
         topMargin=90, bottomMargin=60
     )
+    # Read by the page header
+    doc.report_id = report_id(device_id, content, generated_on)
 
-    # Define Styles
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'ReportTitle',
-        parent=styles['Heading1'],
-        fontName='Helvetica-Bold',
-        fontSize=18,
-        leading=22,
-        textColor=colors.black,
-        spaceAfter=12
-    )
-    
-    metadata_label = ParagraphStyle('MetaLabel', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=10)
-    metadata_value = ParagraphStyle('MetaValue', parent=styles['Normal'], fontName='Helvetica', fontSize=10)
-    
-    # Use a serif font for the body for a formal look, with justified alignment
-    body_style = ParagraphStyle(
-        'BodyText',
-        parent=styles['Normal'],
-        fontName='Times-Roman',
-        fontSize=11,
-        leading=15,
-        alignment=TA_JUSTIFY,
-        spaceBefore=6,
-        spaceAfter=6
-    )
+    # Precompiled Styles
+    styles = get_styles()
+    title_style = styles["title"]
+    metadata_label = styles["metadata_label"]
+    metadata_value = styles["metadata_value"]
+    body_style = styles["body"]
 
     # Build the "Story" (Content elements)
     story = []
@@ -120,7 +171,7 @@ def generate_medical_pdf(device_id: str, content: str) -> io.BytesIO:
     # 2. Metadata Table (Clean alignment)
     data = [
         [Paragraph("Subject Device:", metadata_label), Paragraph(device_id, metadata_value)],
-        [Paragraph("Date Generated:", metadata_label), Paragraph(datetime.now().strftime('%B %d, %Y, %H:%M:%S'), metadata_value)],
+        [Paragraph("Date Generated:", metadata_label), Paragraph(generated_on.strftime('%B %d, %Y (UTC)'), metadata_value)],
         [Paragraph("Requested By:", metadata_label), Paragraph("Clinical Dashboard User", metadata_value)],
     ]
     t = Table(data, colWidths=[100, 400])
@@ -150,5 +201,67 @@ def generate_medical_pdf(device_id: str, content: str) -> io.BytesIO:
         onLaterPages=on_every_page
     )
     
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer.getvalue()
+
+# --- Worker Pool ---
+
+class ReportBusyError(Exception):
+    """Raised when the renderer is saturated and a request waited too long for a slot."""
+
+def _warm_worker():
+    # Process pool initializer: compile styles before the first job arrives
+    get_styles()
+
+class ReportRenderer:
+    """
+    Runs ReportLab in a process pool so layout never blocks the event loop.
+    Concurrency is capped by a semaphore: excess requests wait up to
+    REPORT_QUEUE_TIMEOUT_S for a slot, then fail with ReportBusyError.
+    Finished PDFs are cached by content hash and generation date (the only
+    time printed), so identical reports share one render all day and a
+    cached report never carries a stale date or Report ID.
+    """
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.cache = ResponseCache(
+            max_entries=settings.REPORT_CACHE_MAX_ENTRIES,
+            ttl_s=settings.REPORT_CACHE_TTL_S
+        )
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.REPORT_WORKERS,
+                initializer=_warm_worker,
+                # Not fork: the API process runs the logging and archiver threads,
+                # whose locks a forked child could inherit mid-acquire
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._pool
+
+    async def render(self, device_id: str, content: str, generated_on: Optional[date] = None) -> bytes:
+        generated_on = generated_on or datetime.now(timezone.utc).date()
+        key = hashlib.sha256(f"{device_id}\0{content}\0{generated_on.isoformat()}".encode()).hexdigest()
+        return await self.cache.get_or_compute(key, lambda: self._render(device_id, content, generated_on))
+
+    async def _render(self, device_id: str, content: str, generated_on: date) -> bytes:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.REPORT_MAX_CONCURRENCY)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), settings.REPORT_QUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            raise ReportBusyError("Report renderer is busy")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor(), render_medical_pdf, device_id, content, generated_on)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+# Singleton
+report_renderer = ReportRenderer()
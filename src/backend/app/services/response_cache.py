@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+def normalize_question(question: str) -> str:
+    """Case and whitespace insensitive form of a chat question."""
+    return re.sub(r"\s+", " ", question).strip().lower()
+
+def make_cache_key(question: str, context: str) -> str:
+    """Normalized question + fingerprint of the device context it was answered with."""
+    fingerprint = hashlib.sha256(context.encode()).hexdigest()
+    return hashlib.sha256(f"{normalize_question(question)}\0{fingerprint}".encode()).hexdigest()
+
+class SharedStream:
+    """
+    One in-flight streamed reply. Tokens are kept so a subscriber that joins
+    late replays them before following live ones.
+    """
+    def __init__(self, key: str):
+        self.key = key
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def append(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterator[str]:
+        sent = 0
+        while True:
+            # Captured before draining, so a token appended meanwhile wakes us
+            changed = self._changed
+            while sent < len(self.tokens):
+                yield self.tokens[sent]
+                sent += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+class ResponseCache:
+    """
+    TTL + size bounded (LRU) cache with single-flight coalescing.
+    Concurrent misses for the same key share one upstream call; the call
+    runs as its own task so a cancelled caller does not fail the others.
+    Streamed calls (stream_or_compute) are shared token by token, and are
+    only cancelled upstream once every subscriber has gone.
+    """
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Union[asyncio.Task, SharedStream]] = {}
+        # Counters (exposed via /chat/cache-stats)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._compute_and_store(key, compute))
+            self._inflight[key] = task
+
+        if isinstance(task, SharedStream):
+            return "".join([token async for token in self._subscribe(task)])
+        return await asyncio.shield(task)
+
+    async def stream_or_compute(self, key: str, produce: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Streaming get_or_compute: a cached value comes back as one token;
+        concurrent misses follow the same upstream token stream. Close the
+        iterator (e.g. with contextlib.aclosing) when the caller goes away.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            yield value
+            return
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            inflight = SharedStream(key)
+            inflight.task = asyncio.create_task(self._produce_and_store(inflight, produce))
+            self._inflight[key] = inflight
+
+        if isinstance(inflight, asyncio.Task):
+            yield await asyncio.shield(inflight)
+            return
+        async for token in self._subscribe(inflight):
+            yield token
+
+    async def _subscribe(self, shared: SharedStream) -> AsyncIterator[str]:
+        shared.subscribers += 1
+        try:
+            async with aclosing(shared.follow()) as tokens:
+                async for token in tokens:
+                    yield token
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.done:
+                # Nobody is listening any more: stop generation upstream
+                if self._inflight.get(shared.key) is shared:
+                    del self._inflight[shared.key]
+                shared.task.cancel()
+
+    async def _produce_and_store(self, shared: SharedStream, produce: Callable[[], AsyncIterator[str]]):
+        try:
+            async with aclosing(produce()) as tokens:
+                async for token in tokens:
+                    shared.append(token)
+            # Only complete replies are cached
+            self.put(shared.key, "".join(shared.tokens))
+            shared.finish()
+        except asyncio.CancelledError:
+            shared.finish(ConnectionError("Upstream completion cancelled"))
+            raise
+        except Exception as e:
+            # Surfaced to the subscribers, not left on the task
+            shared.finish(e)
+        finally:
+            if self._inflight.get(shared.key) is shared:
+                del self._inflight[shared.key]
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute()
+            self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,259 @@
+"""
+Hot storage partition maintenance and tiered retention.
+
+device_telemetry and anomalies are range-partitioned by day (UTC, see
+infra/postgres/init.sql). This job keeps PARTITION_PREMAKE_DAYS of empty
+partitions ahead of the clock and retires old days with DETACH + DROP
+instead of a DELETE, so hot-table size and insert latency stay flat.
+A telemetry or anomaly day is only dropped once every one of its row ids
+is found in the archive's date= partitions (the archive carries each
+reading's id, risk level and score). Runs inside the API
+(settings.PARTITION_MAINTENANCE_ENABLED) or on demand, e.g. `make retention`.
+"""
+import argparse
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.archive import date_prefix
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_TABLE = "device_telemetry"
+ANOMALY_TABLE = "anomalies"
+ROLLUP_MINUTE_TABLE = "telemetry_rollup_1m"
+# Serializes maintenance between the API and the CLI (arbitrary constant)
+ADVISORY_LOCK_KEY = 0x62696F5F726574
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+def partition_day(table: str, name: str) -> Optional[date]:
+    """Day covered by a daily partition, or None for the default/foreign partitions."""
+    match = re.fullmatch(rf"{table}_p(\d{{8}})", name)
+    return datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+class ArchivedRows(NamedTuple):
+    ids: Set[str]
+    # Rows archived before ids were recorded: they can only be counted
+    legacy: int
+    legacy_high: int
+
+def archived_rows(store, device_id: str, days: List[date]) -> ArchivedRows:
+    """
+    Reading ids of one device in the archive for the given UTC days. Only
+    the device's date= prefixes are listed and only the id and risk_level
+    columns are read. A row archived twice (e.g. a replayed spill) counts once.
+    """
+    import polars as pl
+    ids: Set[str] = set()
+    legacy = legacy_high = 0
+    for day in days:
+        for obj in store.list(date_prefix(device_id, day)):
+            lf = pl.scan_parquet(store.uri(obj.key), storage_options=store.storage_options)
+            id_column = pl.col("id") if "id" in lf.collect_schema().names() else pl.lit(None, pl.String).alias("id")
+            df = lf.select(id_column, "risk_level").collect()
+            ids.update(df["id"].drop_nulls().to_list())
+            untracked = df.filter(pl.col("id").is_null())
+            legacy += untracked.height
+            legacy_high += untracked.filter(pl.col("risk_level") == "HIGH").height
+    return ArchivedRows(ids, legacy, legacy_high)
+
+def unconfirmed(ids: List[Optional[str]], archived: Set[str], legacy: int) -> int:
+    """
+    How many of the hot rows' ids are missing from the archive, beyond what
+    id-less legacy archive rows could account for.
+    """
+    missing = sum(1 for row_id in ids if row_id not in archived)
+    return max(missing - legacy, 0)
+
+class PartitionMaintainer:
+    """
+    Creates upcoming daily partitions and drops expired ones.
+
+    Telemetry partitions older than HOT_RETENTION_DAYS and anomaly
+    partitions older than ANOMALY_RETENTION_DAYS are verified against the
+    cold archive first; a day with missing rows (e.g. a lost archive batch)
+    is kept and reported rather than lost. Minute-rollup partitions expire
+    by age (ROLLUP_MINUTE_RETENTION_DAYS).
+
+    The lock, catalog queries and archive verification run on a dedicated
+    connection outside the pools; only the short CREATE and DETACH/DROP
+    statements borrow a write-pool connection (bounded acquire).
+    """
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.created = 0
+        self.dropped = 0
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        if settings.PARTITION_MAINTENANCE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="partition-maintainer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # First pass right away: upcoming partitions must exist before midnight
+        while True:
+            from app.services.storage import storage
+            if storage.pool is not None:
+                try:
+                    await self.run_once(storage, storage.archive_store)
+                except Exception as e:
+                    logger.error(f"RETENTION: Partition maintenance failed: {e}")
+            await asyncio.sleep(settings.PARTITION_MAINTENANCE_INTERVAL_S)
+
+    async def run_once(self, db, store, today: Optional[date] = None, dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        One maintenance pass against db (the StorageService). Returns
+        {"created", "dropped", "retained"}, or None when another process
+        holds the maintenance lock.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        report = {"created": 0, "dropped": [], "retained": {}}
+
+        async with db.maintenance_connection() as conn:
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", ADVISORY_LOCK_KEY):
+                logger.info("RETENTION: Another process is maintaining partitions, skipping")
+                return None
+            try:
+                # 1. Pre-create upcoming partitions (today included)
+                if not dry_run:
+                    async with db.write_connection() as write_conn:
+                        for table in (TELEMETRY_TABLE, ANOMALY_TABLE, ROLLUP_MINUTE_TABLE):
+                            report["created"] += await write_conn.fetchval(
+                                "SELECT create_daily_partitions($1, $2, $3)",
+                                table, today, settings.PARTITION_PREMAKE_DAYS + 1
+                            )
+
+                # 2. Telemetry: drop expired days whose rows are all archived
+                cutoff = today - timedelta(days=settings.HOT_RETENTION_DAYS)
+                for name, day in await self._partitions(conn, TELEMETRY_TABLE):
+                    if day < cutoff:
+                        missing = await self._unarchived_devices(conn, store, name, "id", [day])
+                        await self._drop_if_archived(db, TELEMETRY_TABLE, name, missing, report, dry_run)
+
+                # 3. Anomalies: drop expired days whose readings (with score and
+                # risk level) are all archived. A reading may be stamped the
+                # day before or after its detection (midnight, clock skew)
+                cutoff = today - timedelta(days=settings.ANOMALY_RETENTION_DAYS)
+                for name, day in await self._partitions(conn, ANOMALY_TABLE):
+                    if day < cutoff:
+                        days = [day - timedelta(days=1), day, day + timedelta(days=1)]
+                        missing = await self._unarchived_devices(conn, store, name, "telemetry_id", days, high_only=True)
+                        await self._drop_if_archived(db, ANOMALY_TABLE, name, missing, report, dry_run)
+
+                # 4. Minute rollups: age only
+                cutoff = today - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+                for name, day in await self._partitions(conn, ROLLUP_MINUTE_TABLE):
+                    if day < cutoff:
+                        await self._drop(db, ROLLUP_MINUTE_TABLE, name, dry_run)
+                        report["dropped"].append(name)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_KEY)
+
+        if not dry_run:
+            self.runs += 1
+            self.created += report["created"]
+            self.dropped += len(report["dropped"])
+            self.last_report = report
+        if report["created"] or report["dropped"]:
+            logger.info(f"RETENTION: Created {report['created']} partitions, dropped {len(report['dropped'])}")
+        return report
+
+    async def _partitions(self, conn, table: str) -> List[Tuple[str, date]]:
+        """Daily partitions of a table, oldest first."""
+        rows = await conn.fetch("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = $1::regclass
+        """, table)
+        days = ((r["relname"], partition_day(table, r["relname"])) for r in rows)
+        return sorted((name, day) for name, day in days if day is not None)
+
+    async def _unarchived_devices(self, conn, store, name: str, id_column: str, days: List[date], high_only: bool = False) -> List[str]:
+        """
+        Devices with rows in a partition whose reading id (id_column) is not
+        in the archive for the given days. One device's ids are held at a time.
+        """
+        missing = []
+        devices = [r["device_id"] for r in await conn.fetch(f'SELECT DISTINCT device_id FROM "{name}"')]
+        for device_id in devices:
+            ids = [r["id"] for r in await conn.fetch(
+                f'SELECT {id_column}::text AS id FROM "{name}" WHERE device_id = $1', device_id
+            )]
+            archived = await asyncio.to_thread(archived_rows, store, device_id, days)
+            # Legacy (id-less) archive rows can only vouch for rows of their risk level
+            legacy = archived.legacy_high if high_only else archived.legacy
+            if unconfirmed(ids, archived.ids, legacy):
+                missing.append(device_id)
+        return sorted(missing)
+
+    async def _drop_if_archived(self, db, table: str, name: str, missing: List[str], report: Dict[str, Any], dry_run: bool):
+        """Drops a verified partition, or keeps and reports one with unarchived rows."""
+        if missing:
+            report["retained"][name] = missing
+            logger.warning(f"RETENTION: Keeping {name}, archive incomplete for {len(missing)} device(s): {', '.join(missing[:5])}")
+            return
+        await self._drop(db, table, name, dry_run)
+        report["dropped"].append(name)
+
+    async def _drop(self, db, table: str, name: str, dry_run: bool):
+        if dry_run:
+            logger.info(f"RETENTION: Would drop {name}")
+            return
+        # DETACH briefly locks the parent; give up rather than stall ingest behind it
+        async with db.write_connection() as conn, conn.transaction():
+            await conn.execute(f"SET LOCAL lock_timeout = '{int(settings.PARTITION_LOCK_TIMEOUT_S * 1000)}ms'")
+            await conn.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            await conn.execute(f'DROP TABLE "{name}"')
+        logger.info(f"RETENTION: Dropped {name}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.PARTITION_MAINTENANCE_ENABLED,
+            "runs": self.runs,
+            "created": self.created,
+            "dropped": self.dropped
+        }
+
+# Singleton
+partition_maintainer = PartitionMaintainer()
+
+async def _run_cli(dry_run: bool) -> Optional[Dict[str, Any]]:
+    from app.services.storage import storage
+    await storage.connect()
+    try:
+        return await partition_maintainer.run_once(storage, storage.archive_store, dry_run=dry_run)
+    finally:
+        await storage.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming hot-table partitions and drop archived ones.")
+    parser.add_argument("--dry-run", action="store_true", help="List partitions that would be dropped")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(_run_cli(args.dry_run))
+    if report is None:
+        print("⏳ Another process is maintaining partitions.")
+        return
+
+    verb = "Would drop" if args.dry_run else "Dropped"
+    print(f"✅ Created {report['created']} partitions. {verb} {len(report['dropped'])}, kept {len(report['retained'])} awaiting archive.")
+
+if __name__ == "__main__":
+    main()
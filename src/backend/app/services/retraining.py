@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from app.core.config import settings
+from app.services.detector import BASELINE_CONFIG, AnomalyDetector, detector, fit_forest
+from app.services.features import build_feature_matrix, cold_features
+from app.services.model_registry import ModelRegistry, config_hash
+
+logger = logging.getLogger(__name__)
+
+# Emergencies every candidate must score HIGH on its own (score < RISK_HIGH_SCORE)
+CANARY_READINGS = np.array([
+    [190.0, 80.0, 50.0],  # Severe tachycardia + hypoxia
+    [35.0, 82.0, 50.0],   # Severe bradycardia + hypoxia
+    [125.0, 75.0, 50.0],  # Desaturation with compensatory tachycardia
+])
+# Isolated desaturation must at least be MEDIUM. Forest scores saturate
+# outside the training range, so no candidate reliably scores it HIGH;
+# the vitals guard (detector.risk_levels) does.
+DESATURATION_CANARY_READINGS = np.array([
+    [80.0, 70.0, 50.0],   # Critical desaturation
+])
+CANARY_SUSTAINED_READINGS = 10
+
+def canary_features(canaries: np.ndarray, windows: Sequence[int]) -> np.ndarray:
+    """
+    Each canary as a device's first reading, then as the end of a
+    CANARY_SUSTAINED_READINGS ramp from normal vitals (non-zero trends).
+    """
+    n = CANARY_SUSTAINED_READINGS
+    ramps = np.vstack([np.linspace([80.0, 98.0, canary[2]], canary, n) for canary in canaries])
+    device_ids = [f"canary-{i}" for i in range(len(canaries)) for _ in range(n)]
+    sustained = build_feature_matrix(device_ids, ramps, windows)[n - 1::n]
+    return np.vstack([cold_features(canaries, windows), sustained])
+
+def validate_engine(engine, X_train: np.ndarray, contamination: float) -> Dict[str, Any]:
+    """Sanity checks a freshly fitted engine before it may serve traffic."""
+    windows = BASELINE_CONFIG["feature_windows"]
+    scores = engine.decision_function(X_train)
+    outlier_rate = float(np.mean(scores < 0))
+    canary_scores = engine.decision_function(canary_features(CANARY_READINGS, windows))
+    desaturation_scores = engine.decision_function(canary_features(DESATURATION_CANARY_READINGS, windows))
+
+    problems = []
+    if not np.all(np.isfinite(scores)):
+        problems.append("non-finite scores")
+    # The forest's threshold is set so ~contamination of the training data is an outlier
+    if outlier_rate > 2 * contamination + 0.02:
+        problems.append(f"outlier rate {outlier_rate:.3f} on training data")
+    # Not merely "anomalous": a candidate that demotes emergencies to MEDIUM never serves
+    if np.any(canary_scores >= settings.RISK_HIGH_SCORE):
+        problems.append("canary readings not flagged HIGH")
+    if np.any(desaturation_scores >= settings.RISK_MEDIUM_SCORE):
+        problems.append("desaturation canary not flagged")
+
+    return {
+        "accepted": not problems,
+        "problems": problems,
+        "outlier_rate": outlier_rate,
+        "canary_scores": canary_scores.tolist(),
+        "desaturation_scores": desaturation_scores.tolist()
+    }
+
+def train_candidate(registry_root: str, model_version: str, device_ids: List[str], readings: np.ndarray) -> Dict[str, Any]:
+    """
+    Worker-process entry point: replay chronologically ordered readings
+    through the feature engine, then fit, validate and (if accepted) persist
+    a candidate model. Only the report crosses back to the API process.
+    """
+    params = BASELINE_CONFIG["params"]
+    windows = BASELINE_CONFIG["feature_windows"]
+    digest = config_hash({
+        "params": params,
+        "features": BASELINE_CONFIG["features"],
+        "data": hashlib.sha256(np.ascontiguousarray(readings).tobytes() + "\0".join(device_ids).encode()).hexdigest()
+    })
+    registry = ModelRegistry(registry_root)
+    artifact_id = registry.artifact_id(model_version, digest)
+
+    start = time.perf_counter()
+    X_train = build_feature_matrix(device_ids, readings, windows)
+    model, engine = fit_forest(X_train, params)
+    report = validate_engine(engine, X_train, params["contamination"])
+    report.update(artifact_id=artifact_id, n_samples=len(X_train), fit_s=time.perf_counter() - start)
+
+    if report["accepted"]:
+        registry.save(artifact_id, engine, model, metadata={
+            "config": {**BASELINE_CONFIG, "training_data": "postgres-recent", "n_samples": len(X_train)},
+            "validation": report
+        })
+    return report
+
+class ModelRetrainer:
+    """
+    Periodically refits the anomaly model on recent telemetry.
+
+    Fitting runs in a single-worker process pool so ingest never competes
+    with sklearn for the GIL. Accepted candidates are loaded from the
+    registry (memory-mapped) and swapped into the detector with one
+    reference assignment; rejected ones leave the current model serving.
+    """
+    def __init__(self, target: AnomalyDetector, registry_root: Optional[str] = None):
+        self.detector = target
+        self.registry = ModelRegistry(registry_root or settings.MODEL_DIR)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.swaps = 0
+        self.rejected = 0
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=1,
+                # Not fork: same reason as the report pool (inherited thread locks)
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._pool
+
+    def start(self):
+        if settings.RETRAIN_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="model-retrainer")
+            logger.info(f"MODEL: Background retraining every {settings.RETRAIN_INTERVAL_S:.0f}s")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.RETRAIN_INTERVAL_S)
+            try:
+                await self.retrain_once()
+            except Exception as e:
+                logger.error(f"MODEL: Retraining failed: {e}")
+
+    async def retrain_once(self, device_ids: Optional[List[str]] = None, readings: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Runs one fit/validate/swap cycle on chronologically ordered readings
+        (fetched from Postgres when not given). Returns the validation
+        report, or None if skipped.
+        """
+        async with self._lock:
+            if readings is None:
+                from app.services.storage import storage
+                since = datetime.now(timezone.utc) - timedelta(hours=settings.RETRAIN_LOOKBACK_HOURS)
+                rows = await storage.get_training_sample(since, settings.RETRAIN_MAX_SAMPLES)
+                device_ids = [row[0] for row in rows]
+                readings = np.asarray([row[1:] for row in rows], dtype=np.float64).reshape(-1, 3)
+
+            if len(readings) < settings.RETRAIN_MIN_SAMPLES:
+                logger.info(f"MODEL: Skipping retrain, only {len(readings)} samples")
+                return None
+
+            self.runs += 1
+            loop = asyncio.get_running_loop()
+            report = await loop.run_in_executor(
+                self._executor(), train_candidate,
+                str(self.registry.root), settings.MODEL_VERSION, list(device_ids), readings
+            )
+            self.last_report = report
+
+            if not report["accepted"]:
+                self.rejected += 1
+                logger.warning(f"MODEL: Rejected candidate {report['artifact_id']}: {', '.join(report['problems'])}")
+                return report
+
+            # Map the artifact off the loop, then publish it with a single assignment
+            engine = await asyncio.to_thread(self.registry.load, report["artifact_id"])
+            previous = self.detector.model_version
+            self.detector.swap(engine, report["artifact_id"])
+            self.registry.activate(report["artifact_id"])
+            self.swaps += 1
+            logger.info(f"MODEL: Swapped {previous} -> {report['artifact_id']} ({report['n_samples']} samples)")
+            return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.RETRAIN_ENABLED,
+            "runs": self.runs,
+            "swaps": self.swaps,
+            "rejected": self.rejected
+        }
+
+# Singleton
+retrainer = ModelRetrainer(detector)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.device_cache import to_epoch
+
+logger = logging.getLogger(__name__)
+
+# Bucket widths (seconds), finest first
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+ROLLUP_TABLES = {name: f"telemetry_rollup_{name}" for name in RESOLUTIONS}
+ROLLUP_COLUMNS = ["device_id", "bucket", "n", "hr_sum", "hr_min", "hr_max", "spo2_sum", "spo2_min", "spo2_max"]
+
+# Partial aggregate per bucket: [n, hr_sum, hr_min, hr_max, spo2_sum, spo2_min, spo2_max]
+Partial = List[float]
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    """Start of the UTC bucket containing ts."""
+    epoch = int(to_epoch(ts)) // seconds * seconds
+    return datetime.fromtimestamp(epoch, timezone.utc)
+
+def merge_partial(target: Partial, other: Partial):
+    target[0] += other[0]
+    target[1] += other[1]
+    target[2] = min(target[2], other[2])
+    target[3] = max(target[3], other[3])
+    target[4] += other[4]
+    target[5] = min(target[5], other[5])
+    target[6] = max(target[6], other[6])
+
+def coarsen(partials: Dict[Tuple[str, int], Partial], seconds: int) -> Dict[Tuple[str, int], Partial]:
+    """Merges minute partials into wider buckets (all aggregates are mergeable)."""
+    out: Dict[Tuple[str, int], Partial] = {}
+    for (device_id, minute), partial in partials.items():
+        key = (device_id, minute // seconds * seconds)
+        current = out.get(key)
+        if current is None:
+            out[key] = list(partial)
+        else:
+            merge_partial(current, partial)
+    return out
+
+def choose_resolution(start: datetime, end: datetime, points: int, max_points: int, oldest_minute: Optional[datetime] = None) -> str:
+    """
+    Coarsest resolution that still yields at least `points` buckets over
+    [start, end], else the finest one that stays within `max_points`.
+    Minute buckets are skipped when the range reaches past their retention.
+    """
+    span = (end - start).total_seconds()
+    available = [
+        name for name, seconds in RESOLUTIONS.items()
+        if span / seconds <= max_points and not (name == "1m" and oldest_minute and start < oldest_minute)
+    ] or ["1d"]
+    for name in reversed(available):
+        if span / RESOLUTIONS[name] >= points:
+            return name
+    return available[0]
+
+class RollupAggregator:
+    """
+    Incrementally maintained per-device min/avg/max vitals for dashboards.
+
+    Ingest folds each reading into an in-memory minute partial (one dict
+    update). A background task drains the partials every
+    ROLLUP_FLUSH_INTERVAL_S, coarsens them to 1h/1d in memory and merges all
+    three levels into Postgres with one upsert per table (sum/count/min/max
+    combine, so workers can flush the same bucket independently). A failed
+    flush keeps its partials for the next attempt; a crash loses at most
+    one interval. Connections come from StorageService.write_connection
+    (bounded acquire, DatabaseBusyError on timeout).
+    """
+    def __init__(self):
+        self._pending: Dict[Tuple[str, int], Partial] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushed_buckets = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, device_id: str, timestamp: datetime, heart_rate: float, spo2: float):
+        heart_rate, spo2 = float(heart_rate), float(spo2)
+        key = (device_id, int(to_epoch(timestamp)) // 60 * 60)
+        partial = self._pending.get(key)
+        if partial is None:
+            self._pending[key] = [1, heart_rate, heart_rate, heart_rate, spo2, spo2, spo2]
+        else:
+            merge_partial(partial, [1, heart_rate, heart_rate, heart_rate, spo2, spo2, spo2])
+
+    def start(self, connect: Callable):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(connect), name="rollup-flusher")
+
+    async def stop(self, connect: Optional[Callable]):
+        """Stops the flusher and writes whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if connect is not None:
+            await self.flush(connect)
+
+    async def _run(self, connect: Callable):
+        while True:
+            await asyncio.sleep(settings.ROLLUP_FLUSH_INTERVAL_S)
+            try:
+                await self.flush(connect)
+            except Exception as e:
+                logger.error(f"ROLLUP: Flush failed, will retry: {e}")
+
+    async def flush(self, connect: Callable) -> int:
+        """
+        Merges pending partials into the rollup tables, on a connection from
+        connect(). Returns minute buckets written.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            async with connect() as conn:
+                async with conn.transaction():
+                    # Same table and key order in every worker, so concurrent upserts cannot deadlock
+                    for name, seconds in RESOLUTIONS.items():
+                        buckets = pending if seconds == 60 else coarsen(pending, seconds)
+                        await conn.execute(self._upsert_sql(ROLLUP_TABLES[name]), *self._columns(buckets))
+        except BaseException:
+            # Put the partials back (merged with anything recorded meanwhile)
+            for key, partial in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = partial
+                else:
+                    merge_partial(current, partial)
+            raise
+
+        self.flushed_buckets += len(pending)
+        return len(pending)
+
+    @staticmethod
+    def _columns(buckets: Dict[Tuple[str, int], Partial]) -> List[list]:
+        """Column arrays for unnest(), sorted by (device_id, bucket)."""
+        items = sorted(buckets.items())
+        return [
+            [device_id for (device_id, _), _ in items],
+            [datetime.fromtimestamp(bucket, timezone.utc) for (_, bucket), _ in items],
+            *([p[i] for _, p in items] for i in range(7))
+        ]
+
+    @staticmethod
+    def _upsert_sql(table: str) -> str:
+        return f"""
+            INSERT INTO {table} AS r ({", ".join(ROLLUP_COLUMNS)})
+            SELECT * FROM unnest(
+                $1::varchar[], $2::timestamptz[], $3::bigint[],
+                $4::float8[], $5::float8[], $6::float8[],
+                $7::float8[], $8::float8[], $9::float8[]
+            )
+            ON CONFLICT (device_id, bucket) DO UPDATE SET
+                n = r.n + EXCLUDED.n,
+                hr_sum = r.hr_sum + EXCLUDED.hr_sum,
+                hr_min = LEAST(r.hr_min, EXCLUDED.hr_min),
+                hr_max = GREATEST(r.hr_max, EXCLUDED.hr_max),
+                spo2_sum = r.spo2_sum + EXCLUDED.spo2_sum,
+                spo2_min = LEAST(r.spo2_min, EXCLUDED.spo2_min),
+                spo2_max = GREATEST(r.spo2_max, EXCLUDED.spo2_max)
+        """
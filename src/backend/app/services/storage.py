@@ -1,48 +1,223 @@
+import asyncio
 import hashlib
-import io
+import time
 import uuid
 import logging
-from datetime import datetime
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
 
 import asyncpg
-import polars as pl
-from minio import Minio
 from app.core.config import settings
+from app.core.metrics import INGEST_STAGE_SECONDS, metrics
 from app.domain.schemas import TelemetryPayload
+from app.services.alerts import alert_hub
+from app.services.archive import ColdArchiver
+from app.services.device_cache import device_cache
+from app.services.object_store import create_object_store
+from app.services.rollups import RESOLUTIONS, ROLLUP_TABLES, RollupAggregator, bucket_start
 
 logger = logging.getLogger(__name__)
 
+PG_ACQUIRE_SECONDS = metrics.histogram(
+    "biostream_pg_acquire_seconds",
+    "Time spent waiting for a pooled Postgres connection, by pool (write, read).",
+    labelnames=("pool",)
+)
+PG_ACQUIRE_TIMEOUTS = metrics.counter(
+    "biostream_pg_acquire_timeouts",
+    "Connection acquisitions that gave up waiting, by pool.",
+    labelnames=("pool",)
+)
+
+class DatabaseBusyError(Exception):
+    """No pooled connection became free within the pool's acquire timeout."""
+    def __init__(self, pool: str):
+        super().__init__(f"No {pool} connection available")
+        self.pool = pool
+
+# Column order used by the bulk (COPY) write paths
+TELEMETRY_COLUMNS = ["id", "device_id", "patient_id_hash", "timestamp", "heart_rate", "spo2", "battery_level"]
+ANOMALY_COLUMNS = ["id", "telemetry_id", "device_id", "anomaly_score", "risk_level"]
+
 class StorageService:
     def __init__(self):
+        # Ingest writes (and maintenance); reads go through read_pool
         self.pool = None
-        self.minio_client = None
+        self.read_pool = None
+        self.archive_store = None
         # Batch buffer for Cold Storage (Parquet)
+        # Flushed at BATCH_SIZE records or once the oldest has waited ARCHIVE_FLUSH_INTERVAL_S
         self.buffer: List[Dict[str, Any]] = []
-        self.BATCH_SIZE = 50 # Flush to MinIO every 50 records
+        self.BATCH_SIZE = settings.ARCHIVE_BATCH_SIZE
+        self._buffer_since: Optional[float] = None
+        self._archive_flusher: Optional[asyncio.Task] = None
+        # Parquet encoding + upload run off the event loop
+        self.archiver = ColdArchiver(settings.MINIO_BUCKET_RAW)
+        # Write-behind queue for Hot Storage (opt-in, see settings.STORAGE_WRITE_BEHIND)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Dashboard rollups, merged into Postgres in the background
+        self.rollups = RollupAggregator()
+
+    def _primary(self) -> Dict[str, Any]:
+        return {
+            "user": settings.POSTGRES_USER,
+            "password": settings.POSTGRES_PASSWORD,
+            "database": settings.POSTGRES_DB,
+            "host": settings.POSTGRES_HOST,
+            "port": settings.POSTGRES_PORT
+        }
 
     async def connect(self):
-        """Initialize DB Pool and MinIO Client."""
+        """Initialize DB Pools and MinIO Client."""
         logger.info("STORAGE: Connecting to Postgres...")
         self.pool = await asyncpg.create_pool(
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            database=settings.POSTGRES_DB,
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT
+            **self._primary(),
+            min_size=settings.PG_WRITE_POOL_MIN,
+            max_size=settings.PG_WRITE_POOL_MAX,
+            statement_cache_size=settings.PG_STATEMENT_CACHE_SIZE,
+            server_settings={"application_name": "biostream-write"}
         )
-        
-        logger.info("STORAGE: Connecting to MinIO...")
-        self.minio_client = Minio(
-            settings.MINIO_ENDPOINT.replace("http://", ""), # Strip protocol if present
-            access_key=settings.MINIO_ROOT_USER,
-            secret_key=settings.MINIO_ROOT_PASSWORD,
-            secure=False # Dev mode (No SSL)
+
+        # Primary (same credentials) unless a replica DSN is configured
+        target = {"dsn": settings.POSTGRES_READ_DSN} if settings.POSTGRES_READ_DSN else self._primary()
+        logger.info(f"STORAGE: Opening read pool ({'replica' if settings.POSTGRES_READ_DSN else 'primary'})...")
+        self.read_pool = await asyncpg.create_pool(
+            **target,
+            min_size=settings.PG_READ_POOL_MIN,
+            max_size=settings.PG_READ_POOL_MAX,
+            statement_cache_size=settings.PG_STATEMENT_CACHE_SIZE,
+            server_settings={
+                "application_name": "biostream-read",
+                "statement_timeout": str(settings.PG_READ_STATEMENT_TIMEOUT_MS)
+            }
         )
+        
+        logger.info(f"STORAGE: Connecting to archive ({settings.ARCHIVE_BACKEND})...")
+        self.archive_store = create_object_store(settings.MINIO_BUCKET_RAW)
+        self.archiver.start(self.archive_store)
+        self.start_archive_flusher()
+        self.rollups.start(self.write_connection)
+
+        if settings.STORAGE_WRITE_BEHIND:
+            self.start_write_behind()
 
     async def close(self):
+        # Drain queued hot writes before the pool goes away
+        await self.stop_write_behind()
+        # Then merge the last rollup partials while the pool is still open
+        await self.rollups.stop(self.write_connection if self.pool is not None else None)
+        if self.read_pool:
+            await self.read_pool.close()
         if self.pool:
             await self.pool.close()
+        # Hand over the partial buffer, then let queued Parquet uploads finish
+        # without blocking the loop
+        await self.drain_archive_buffer()
+        await asyncio.to_thread(self.archiver.stop)
+
+    def start_archive_flusher(self):
+        """Starts the task that flushes a partially filled archive buffer on age."""
+        if self._archive_flusher:
+            return
+        self._archive_flusher = asyncio.create_task(self._run_archive_flusher(), name="archive-flusher")
+
+    async def _run_archive_flusher(self):
+        interval = settings.ARCHIVE_FLUSH_INTERVAL_S
+        while True:
+            # Checking twice per interval bounds a reading's wait at 1.5x
+            await asyncio.sleep(interval / 2)
+            since = self._buffer_since
+            if since is not None and time.monotonic() - since >= interval:
+                self._flush_to_minio()
+
+    async def drain_archive_buffer(self):
+        """Stops the age-based flusher and queues whatever is still buffered, waiting for room."""
+        if self._archive_flusher:
+            self._archive_flusher.cancel()
+            try:
+                await self._archive_flusher
+            except asyncio.CancelledError:
+                pass
+            self._archive_flusher = None
+
+        batch = self._take_buffer()
+        if batch:
+            await asyncio.to_thread(self.archiver.submit, batch, True)
+            logger.info(f"STORAGE: Drained {len(batch)} buffered readings to the archiver.")
+
+    def start_write_behind(self):
+        """Starts the background task that coalesces queued readings into COPY batches."""
+        if self._writer_task:
+            return
+        self._write_queue = asyncio.Queue(maxsize=settings.WRITE_BEHIND_QUEUE_SIZE)
+        self._writer_task = asyncio.create_task(self._run_write_behind(self._write_queue))
+        logger.info(
+            f"STORAGE: Write-behind enabled (batch={settings.WRITE_BEHIND_MAX_BATCH}, "
+            f"delay={settings.WRITE_BEHIND_MAX_DELAY_MS}ms, durability={settings.WRITE_BEHIND_DURABILITY})"
+        )
+
+    async def stop_write_behind(self):
+        """Stops accepting queued writes and flushes everything already queued."""
+        if not self._writer_task:
+            return
+        queue, task = self._write_queue, self._writer_task
+        # New writes fall back to the direct path from here on
+        self._write_queue = None
+        self._writer_task = None
+
+        await queue.put(None) # Sentinel: flush and exit
+        await task
+
+        # Requests already blocked in put() enqueue behind the sentinel once
+        # room frees up; flush them too or their `done` futures never resolve
+        while True:
+            await asyncio.sleep(0)
+            leftover = []
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    leftover.append(item)
+            if not leftover:
+                break
+            await self._flush_write_batch(leftover)
+        logger.info("STORAGE: Write-behind queue drained.")
+
+    @asynccontextmanager
+    async def _acquire(self, pool, name: str, timeout: float):
+        """Pool acquire with a bounded wait; the wait is recorded per pool."""
+        start = time.perf_counter()
+        acquired = False
+        try:
+            async with pool.acquire(timeout=timeout) as conn:
+                acquired = True
+                PG_ACQUIRE_SECONDS.observe(time.perf_counter() - start, pool=name)
+                yield conn
+        except asyncio.TimeoutError:
+            if acquired:
+                raise
+            PG_ACQUIRE_TIMEOUTS.inc(pool=name)
+            raise DatabaseBusyError(name)
+
+    @asynccontextmanager
+    async def maintenance_connection(self):
+        """
+        A dedicated primary connection outside both pools, for long-running
+        background jobs (partition retention) that must never hold a
+        connection ingest or the dashboard needs.
+        """
+        conn = await asyncpg.connect(**self._primary(), server_settings={"application_name": "biostream-maintenance"})
+        try:
+            yield conn
+        finally:
+            await conn.close()
+
+    def write_connection(self):
+        return self._acquire(self.pool, "write", settings.PG_WRITE_ACQUIRE_TIMEOUT_S)
+
+    def read_connection(self):
+        return self._acquire(self.read_pool, "read", settings.PG_READ_ACQUIRE_TIMEOUT_S)
 
     def hash_pii(self, patient_id: str) -> str:
         """SHA-256 Hashing for HIPAA Compliance."""
@@ -56,86 +231,337 @@ class StorageService:
         2. Buffer for MinIO Parquet (Cold)
         """
         pii_hash = self.hash_pii(payload.patient_id)
-        
+        # Generated here so live alert subscribers and the feed share one id
+        anomaly_id = uuid.uuid4() if risk == "HIGH" else None
+
         # 1. Hot Storage (Postgres)
-        async with self.pool.acquire() as conn:
-            # Insert Telemetry
-            row_id = await conn.fetchval('''
-                INSERT INTO device_telemetry 
-                (device_id, patient_id_hash, timestamp, heart_rate, spo2, battery_level)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                RETURNING id
-            ''', payload.device_id, pii_hash, payload.timestamp, 
-                 payload.heart_rate, payload.spo2, payload.battery_level)
-
-            # Insert Anomaly Alert if High Risk
-            if risk == "HIGH":
-                await conn.execute('''
-                    INSERT INTO anomalies (telemetry_id, device_id, anomaly_score, risk_level)
-                    VALUES ($1, $2, $3, $4)
-                ''', row_id, payload.device_id, score, risk)
-
-        # 2. Cold Storage Buffering
+        write_queue = self._write_queue
+        if write_queue is not None:
+            # Write-behind: hand the row to the background batcher
+            row_id = uuid.uuid4()
+            telemetry_row = (
+                row_id, payload.device_id, pii_hash, payload.timestamp,
+                payload.heart_rate, payload.spo2, payload.battery_level
+            )
+            anomaly_row = (anomaly_id, row_id, payload.device_id, score, risk) if anomaly_id else None
+
+            if settings.WRITE_BEHIND_DURABILITY == "flush":
+                done = asyncio.get_running_loop().create_future()
+                await write_queue.put((telemetry_row, anomaly_row, done))
+                await done # Resolved once the batch containing this row commits
+            else:
+                await write_queue.put((telemetry_row, anomaly_row, None))
+        else:
+            with INGEST_STAGE_SECONDS.time(stage="pg_insert"):
+                async with self.write_connection() as conn:
+                    # Insert Telemetry
+                    row_id = await conn.fetchval('''
+                        INSERT INTO device_telemetry 
+                        (device_id, patient_id_hash, timestamp, heart_rate, spo2, battery_level)
+                        VALUES ($1, $2, $3, $4, $5, $6)
+                        RETURNING id
+                    ''', payload.device_id, pii_hash, payload.timestamp, 
+                         payload.heart_rate, payload.spo2, payload.battery_level)
+
+                    # Insert Anomaly Alert if High Risk
+                    if risk == "HIGH":
+                        await conn.execute('''
+                            INSERT INTO anomalies (id, telemetry_id, device_id, anomaly_score, risk_level)
+                            VALUES ($1, $2, $3, $4, $5)
+                        ''', anomaly_id, row_id, payload.device_id, score, risk)
+
+        # 2. Live alert stream, assistant context cache, rollups + Cold Storage Buffering
+        self._publish_alert(payload, risk, score, anomaly_id)
+        device_cache.record(
+            payload.device_id, payload.timestamp, payload.heart_rate,
+            payload.spo2, payload.battery_level, risk, score
+        )
+        self.rollups.record(payload.device_id, payload.timestamp, payload.heart_rate, payload.spo2)
+        self._buffer_for_archive(row_id, payload, pii_hash, risk, score)
+
+    async def store_telemetry_batch(self, payloads: List[TelemetryPayload], risks: List[str], scores: List[float]):
+        """
+        Bulk variant of store_telemetry() for gateway batches.
+        Row ids are generated client-side so the telemetry rows and their
+        HIGH-risk anomalies can each be written with a single COPY.
+        """
+        telemetry_rows = []
+        anomaly_rows = []
+        anomaly_ids = []
+        pii_hashes = []
+        row_ids = []
+
+        for payload, risk, score in zip(payloads, risks, scores):
+            row_id = uuid.uuid4()
+            row_ids.append(row_id)
+            pii_hash = self.hash_pii(payload.patient_id)
+            pii_hashes.append(pii_hash)
+
+            telemetry_rows.append((
+                row_id, payload.device_id, pii_hash, payload.timestamp,
+                payload.heart_rate, payload.spo2, payload.battery_level
+            ))
+            anomaly_id = uuid.uuid4() if risk == "HIGH" else None
+            anomaly_ids.append(anomaly_id)
+            if anomaly_id:
+                anomaly_rows.append((anomaly_id, row_id, payload.device_id, float(score), risk))
+
+        # 1. Hot Storage (Postgres) - one transaction, one COPY per table
+        await self._write_hot_batch(telemetry_rows, anomaly_rows)
+
+        # 2. Live alert stream, assistant context cache, rollups + Cold Storage Buffering
+        for row_id, payload, pii_hash, risk, score, anomaly_id in zip(row_ids, payloads, pii_hashes, risks, scores, anomaly_ids):
+            self._publish_alert(payload, risk, score, anomaly_id)
+            device_cache.record(
+                payload.device_id, payload.timestamp, payload.heart_rate,
+                payload.spo2, payload.battery_level, risk, score
+            )
+            self.rollups.record(payload.device_id, payload.timestamp, payload.heart_rate, payload.spo2)
+            self._buffer_for_archive(row_id, payload, pii_hash, risk, float(score))
+
+    async def _write_hot_batch(self, telemetry_rows: List[Tuple], anomaly_rows: List[Tuple]):
+        """
+        Writes telemetry rows and their anomalies in one transaction.
+        Telemetry is copied first so every anomaly's telemetry_id already exists.
+        """
+        with INGEST_STAGE_SECONDS.time(stage="pg_insert"):
+            async with self.write_connection() as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table(
+                        "device_telemetry",
+                        records=telemetry_rows,
+                        columns=TELEMETRY_COLUMNS
+                    )
+                    if anomaly_rows:
+                        await conn.copy_records_to_table(
+                            "anomalies",
+                            records=anomaly_rows,
+                            columns=ANOMALY_COLUMNS
+                        )
+
+    async def _run_write_behind(self, queue: asyncio.Queue):
+        """
+        Background batcher: collects queued rows until the batch is full or
+        WRITE_BEHIND_MAX_DELAY_MS has elapsed since its first row, then flushes.
+        """
+        loop = asyncio.get_running_loop()
+        max_batch = settings.WRITE_BEHIND_MAX_BATCH
+        max_delay = settings.WRITE_BEHIND_MAX_DELAY_MS / 1000
+        stopping = False
+
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + max_delay
+
+            while len(batch) < max_batch:
+                # Take whatever is already queued without yielding first
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush_write_batch(batch)
+
+    async def _flush_write_batch(self, batch: List[Tuple]):
+        """Commits one write-behind batch and resolves the waiting requests."""
+        telemetry_rows = [telemetry_row for telemetry_row, _, _ in batch]
+        anomaly_rows = [anomaly_row for _, anomaly_row, _ in batch if anomaly_row is not None]
+
+        try:
+            await self._write_hot_batch(telemetry_rows, anomaly_rows)
+        except Exception as e:
+            logger.error(f"STORAGE ERROR: Write-behind flush of {len(batch)} rows failed: {e}")
+            for _, _, done in batch:
+                if done is not None and not done.done():
+                    done.set_exception(e)
+            return
+
+        for _, _, done in batch:
+            if done is not None and not done.done():
+                done.set_result(None)
+
+    def _publish_alert(self, payload: TelemetryPayload, risk: str, score: float, anomaly_id: Optional[uuid.UUID]):
+        """Pushes HIGH/MEDIUM readings to live subscribers (non-blocking)."""
+        if risk not in ("HIGH", "MEDIUM") or not alert_hub.has_subscribers:
+            return
+        alert_hub.publish({
+            # HIGH alerts carry their anomalies row id; MEDIUM ones are not persisted
+            "id": str(anomaly_id or uuid.uuid4()),
+            "device_id": payload.device_id,
+            "risk_level": risk,
+            "anomaly_score": score,
+            "heart_rate": payload.heart_rate,
+            "spo2": payload.spo2,
+            "timestamp": payload.timestamp.isoformat(),
+            "detected_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    def _buffer_for_archive(self, row_id: uuid.UUID, payload: TelemetryPayload, pii_hash: str, risk: str, score: float):
+        """
+        Appends a reading to the cold storage buffer and flushes when full.
+        The row id and score are archived too, so retention can confirm each
+        telemetry and anomaly row before dropping its hot partition.
+        """
+        if not self.buffer:
+            self._buffer_since = time.monotonic()
         self.buffer.append({
+            "id": str(row_id),
             "device_id": payload.device_id,
             "patient_id_hash": pii_hash,
-            "timestamp": payload.timestamp,
+            # Normalized to UTC so every archive file shares one schema
+            "timestamp": payload.timestamp.astimezone(timezone.utc),
             "heart_rate": payload.heart_rate,
             "spo2": payload.spo2,
-            "risk_level": risk
+            "risk_level": risk,
+            "anomaly_score": score
         })
 
         if len(self.buffer) >= self.BATCH_SIZE:
             self._flush_to_minio()
 
+    def _take_buffer(self) -> List[Dict[str, Any]]:
+        batch, self.buffer = self.buffer, []
+        self._buffer_since = None
+        return batch
+
     def _flush_to_minio(self):
-        """Writes the buffer to a Parquet file and uploads to MinIO."""
-        try:
-            # Create DataFrame
-            df = pl.DataFrame(self.buffer)
-            
-            # Write to in-memory buffer
-            parquet_buffer = io.BytesIO()
-            df.write_parquet(parquet_buffer)
-            parquet_buffer.seek(0)
-            
-            # Upload to MinIO
-            filename = f"telemetry_batch_{uuid.uuid4()}.parquet"
-            # Hardcoded bucket name from docker-compose logic
-            bucket_name = "telemetry-raw" 
-            
-            # Check if bucket exists (idempotency)
-            if not self.minio_client.bucket_exists(bucket_name):
-                 self.minio_client.make_bucket(bucket_name)
-
-            self.minio_client.put_object(
-                bucket_name,
-                filename,
-                parquet_buffer,
-                length=parquet_buffer.getbuffer().nbytes,
-                content_type="application/octet-stream"
-            )
-            
-            logger.info(f"ARCHIVE: Flushed {len(self.buffer)} records to MinIO/{filename}")
-            self.buffer.clear() # Reset buffer
-            
-        except Exception as e:
-            logger.error(f"ARCHIVE ERROR: Failed to flush to MinIO: {e}")
+        """Hands the current buffer to the background archiver and starts a new one."""
+        batch = self._take_buffer()
+        if batch:
+            self.archiver.submit(batch)
 
     async def get_recent_anomalies(self, limit: int = 20):
         """Fetches the most recent high-risk events for the dashboard."""
-        if not self.pool:
+        rows, _ = await self.get_anomalies_page(limit=limit)
+        return rows
+
+    async def get_training_sample(self, since: datetime, limit: int) -> List[Tuple[str, float, float, float]]:
+        """
+        Recent (device_id, heart_rate, spo2, battery_level) readings for model
+        retraining, oldest first so they can be replayed through the feature
+        engine. Readings already flagged HIGH are excluded so confirmed
+        emergencies are not learned as normal behaviour.
+        """
+        if not self.read_pool:
             return []
-            
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch('''
-                SELECT device_id, risk_level, anomaly_score, detected_at
+        async with self.read_connection() as conn, conn.transaction(readonly=True):
+            # Background bulk read: exempt from the interactive statement timeout
+            await conn.execute("SET LOCAL statement_timeout = 0")
+            rows = await conn.fetch("""
+                SELECT t.device_id, t.heart_rate, t.spo2, t.battery_level
+                FROM device_telemetry t
+                WHERE t.timestamp >= $1
+                  AND NOT EXISTS (
+                      SELECT 1 FROM anomalies a
+                      WHERE a.telemetry_id = t.id AND a.risk_level = 'HIGH'
+                        -- Lets the planner use idx_anomalies_device_time and prune partitions
+                        AND a.device_id = t.device_id AND a.detected_at >= $1
+                  )
+                ORDER BY t.timestamp DESC
+                LIMIT $2
+            """, since, limit)
+        # Newest N are selected; replay needs them in arrival order
+        return [(r["device_id"], r["heart_rate"], r["spo2"], r["battery_level"]) for r in reversed(rows)]
+
+    async def get_anomalies_page(
+        self,
+        limit: int = 20,
+        older_than: Optional[Tuple[datetime, uuid.UUID]] = None,
+        newer_than: Optional[Tuple[datetime, uuid.UUID]] = None,
+        device_id: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Keyset pagination over anomalies, newest first, ordered by (detected_at, id).
+        `older_than` / `newer_than` are (detected_at, id) keys of a row already seen;
+        seeking on the index keeps every page O(limit) regardless of table size.
+        Returns (rows, has_more) where has_more refers to the direction of travel.
+        """
+        if not self.read_pool:
+            return [], False
+
+        conditions, params = [], []
+
+        def bind(value) -> str:
+            params.append(value)
+            return f"${len(params)}"
+
+        if device_id:
+            conditions.append(f"device_id = {bind(device_id)}")
+        if risk_level:
+            conditions.append(f"risk_level = {bind(risk_level)}")
+        if start:
+            conditions.append(f"detected_at >= {bind(start)}")
+        if end:
+            conditions.append(f"detected_at < {bind(end)}")
+
+        # Walking towards newer rows (incremental polling) scans ascending from the key
+        ascending = newer_than is not None
+        if older_than:
+            conditions.append(f"(detected_at, id) < ({bind(older_than[0])}, {bind(older_than[1])})")
+        if newer_than:
+            conditions.append(f"(detected_at, id) > ({bind(newer_than[0])}, {bind(newer_than[1])})")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "ASC" if ascending else "DESC"
+
+        async with self.read_connection() as conn:
+            rows = await conn.fetch(f'''
+                SELECT id, device_id, risk_level, anomaly_score, detected_at
                 FROM anomalies
-                ORDER BY detected_at DESC
-                LIMIT $1
-            ''', limit)
-            
-            return [dict(row) for row in rows]
+                {where}
+                ORDER BY detected_at {direction}, id {direction}
+                LIMIT {bind(limit + 1)}
+            ''', *params)
+
+        has_more = len(rows) > limit
+        rows = [dict(row) for row in rows[:limit]]
+        if ascending:
+            rows.reverse() # Always return newest first
+        return rows, has_more
+
+    async def get_rollup_series(self, device_id: str, resolution: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Downsampled min/avg/max vitals for one device, oldest bucket first."""
+        if not self.read_pool:
+            return []
+        # Include the bucket that start falls into
+        first_bucket = bucket_start(start, RESOLUTIONS[resolution])
+        async with self.read_connection() as conn:
+            rows = await conn.fetch(f'''
+                SELECT bucket, n AS count,
+                       hr_min, hr_sum / n AS hr_avg, hr_max,
+                       spo2_min, spo2_sum / n AS spo2_avg, spo2_max
+                FROM {ROLLUP_TABLES[resolution]}
+                WHERE device_id = $1 AND bucket >= $2 AND bucket <= $3
+                ORDER BY bucket
+            ''', device_id, first_bucket, end)
+        return [dict(row) for row in rows]
 
 # Singleton
-storage = StorageService()
\ No newline at end of file
+storage = StorageService()
+
+# Scrape-time gauges (read directly, no bookkeeping on the hot path)
+metrics.gauge("biostream_archive_buffer_records", "Readings buffered for the next Parquet batch.", lambda: len(storage.buffer))
+metrics.gauge("biostream_archive_queue_batches", "Batches waiting for the cold archiver thread.", lambda: storage.archiver.queue_depth)
+metrics.gauge("biostream_archive_spilled_batches", "Batches spilled to local disk awaiting upload.", lambda: storage.archiver.spill_depth)
+metrics.gauge("biostream_write_behind_queue_rows", "Rows waiting in the write-behind queue.", lambda: storage._write_queue.qsize() if storage._write_queue else 0)
+metrics.gauge("biostream_rollup_pending_buckets", "Minute rollup partials not yet merged into Postgres.", lambda: storage.rollups.pending)
+metrics.gauge("biostream_pg_pool_size", "Open asyncpg connections in the write pool.", lambda: storage.pool.get_size() if storage.pool else 0)
+metrics.gauge("biostream_pg_pool_in_use", "Write pool connections currently acquired.", lambda: storage.pool.get_size() - storage.pool.get_idle_size() if storage.pool else 0)
+metrics.gauge("biostream_pg_read_pool_size", "Open asyncpg connections in the read pool.", lambda: storage.read_pool.get_size() if storage.read_pool else 0)
+metrics.gauge("biostream_pg_read_pool_in_use", "Read pool connections currently acquired.", lambda: storage.read_pool.get_size() - storage.read_pool.get_idle_size() if storage.read_pool else 0)
\ No newline at end of file
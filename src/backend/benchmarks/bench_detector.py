@@ -0,0 +1,57 @@
+"""
+Microbenchmark: per-reading anomaly scoring latency.
+
+Compares the original sklearn path (decision_function + predict on a
+one-row array) with the compiled single-sample and batch paths.
+
+    cd src/backend && python -m benchmarks.bench_detector
+"""
+import time
+import numpy as np
+from app.core.config import settings
+from app.services.detector import AnomalyDetector
+from app.services.features import RollingFeatureStore, build_feature_matrix, cold_features
+
+def per_call_us(fn, repeat: int) -> float:
+    fn() # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main(repeat: int = 2000, batch_size: int = 500):
+    detector = AnomalyDetector()
+    detector.train_baseline()
+    model, engine = detector.model, detector.engine
+
+    reading = cold_features(np.array([142.0, 91.0, 40.0]), settings.FEATURE_WINDOWS)
+
+    def sklearn_single():
+        model.decision_function(reading)[0]
+        model.predict(reading)[0]
+
+    raw = np.c_[
+        np.random.uniform(40, 180, batch_size),
+        np.random.uniform(85, 100, batch_size),
+        np.random.uniform(0, 100, batch_size)
+    ]
+    batch = build_feature_matrix([f"dev-{i % 50}" for i in range(batch_size)], raw, settings.FEATURE_WINDOWS)
+    store = RollingFeatureStore(settings.FEATURE_WINDOWS)
+    rows = iter(range(10**9))
+
+    legacy = per_call_us(sklearn_single, repeat)
+    single = per_call_us(lambda: detector.predict_features(reading[0]), repeat)
+    feature_update = per_call_us(lambda: store.update(f"dev-{next(rows) % 500}", (142.0, 91.0, 40.0)), repeat)
+    batched = per_call_us(lambda: detector.predict_batch(batch), max(repeat // 50, 10)) / batch_size
+    sklearn_batched = per_call_us(lambda: model.decision_function(batch), max(repeat // 50, 10)) / batch_size
+
+    print(f"Forest: {engine.n_trees} trees, max depth {engine.max_depth}")
+    print(f"{'path':<40}{'µs / reading':>14}")
+    print(f"{'sklearn decision_function + predict':<40}{legacy:>14.1f}")
+    print(f"{'compiled single-sample':<40}{single:>14.1f}   ({legacy / single:.1f}x)")
+    print(f"{'sklearn decision_function, batch ' + str(batch_size):<40}{sklearn_batched:>14.2f}")
+    print(f"{'compiled batch ' + str(batch_size):<40}{batched:>14.2f}   ({legacy / batched:.0f}x vs legacy single)")
+    print(f"{'rolling feature update (per device)':<40}{feature_update:>14.1f}   ({store.n_features} features)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Microbenchmark: decode + validation cost per reading for each ingest format.
+
+JSON goes through pydantic (one TelemetryPayload per reading); MessagePack
+singles decode to a dict first; Arrow IPC batches are validated with
+column expressions and only turned into plain tuples for storage.
+
+    cd src/backend && python -m benchmarks.bench_ingest_formats
+"""
+import io
+import time
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+import orjson
+import polars as pl
+from app.api.v1.ingestion import TELEMETRY_BATCH, decode_arrow_batch, decode_msgpack_payload
+from app.domain.columnar import frame_rows
+from app.domain.schemas import TelemetryPayload
+
+def per_reading_us(fn, readings: int, repeat: int) -> float:
+    fn() # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / (repeat * readings) * 1e6
+
+def main(batch_size: int = 1000, repeat: int = 20):
+    start = datetime(2026, 2, 7, 12, tzinfo=timezone.utc)
+    readings = [
+        {
+            "device_id": f"WEARABLE-{i % 100:03d}",
+            "patient_id": f"PATIENT-{i % 100:03d}",
+            "timestamp": start + timedelta(seconds=i),
+            "heart_rate": 60 + i % 40,
+            "spo2": 95.0 + (i % 5),
+            "battery_level": 100.0 - (i % 100)
+        }
+        for i in range(batch_size)
+    ]
+
+    json_single = orjson.dumps(readings[0])
+    msgpack_single = msgpack.packb(readings[0], datetime=True)
+    json_batch = orjson.dumps(readings)
+    arrow = io.BytesIO()
+    pl.DataFrame(readings).write_ipc_stream(arrow)
+    arrow_batch = arrow.getvalue()
+
+    rows = [
+        ("JSON single (pydantic)", per_reading_us(lambda: TelemetryPayload.model_validate_json(json_single), 1, repeat * 500), len(json_single)),
+        ("MessagePack single", per_reading_us(lambda: decode_msgpack_payload(msgpack_single), 1, repeat * 500), len(msgpack_single)),
+        (f"JSON batch {batch_size} (pydantic)", per_reading_us(lambda: TELEMETRY_BATCH.validate_json(json_batch), batch_size, repeat), len(json_batch) / batch_size),
+        (f"Arrow IPC batch {batch_size}", per_reading_us(lambda: decode_arrow_batch(arrow_batch), batch_size, repeat), len(arrow_batch) / batch_size),
+        (f"Arrow IPC batch {batch_size} + rows", per_reading_us(lambda: frame_rows(decode_arrow_batch(arrow_batch)), batch_size, repeat), len(arrow_batch) / batch_size),
+    ]
+
+    print(f"{'format':<36}{'µs / reading':>14}{'bytes / reading':>18}")
+    for name, us, size in rows:
+        print(f"{name:<36}{us:>14.2f}{size:>18.0f}")
+
+if __name__ == "__main__":
+    main()
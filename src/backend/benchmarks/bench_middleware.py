@@ -0,0 +1,78 @@
+"""
+Microbenchmark: per-request overhead of the correlation-id middleware.
+
+Drives a minimal app through raw ASGI calls (no sockets, no TestClient) so
+the numbers isolate middleware cost: no middleware, the previous
+BaseHTTPMiddleware implementation, and the current pure-ASGI one.
+
+    cd src/backend && python -m benchmarks.bench_middleware
+"""
+import asyncio
+import logging
+import time
+from uuid import uuid4
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.core.logging import CorrelationIdMiddleware
+
+class LegacyCorrelationIdMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version this module replaced."""
+    async def dispatch(self, request, call_next):
+        correlation_id = request.headers.get("X-Correlation-ID", str(uuid4()))
+        request.state.correlation_id = correlation_id
+        start_time = time.time()
+        response = await call_next(request)
+        process_time = time.time() - start_time
+        logging.getLogger("api.access").info(
+            f"{request.method} {request.url.path} - {response.status_code} - {process_time:.4f}s",
+            extra={"correlation_id": correlation_id}
+        )
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+def build(middleware_cls=None):
+    middleware = [Middleware(middleware_cls)] if middleware_cls else []
+    return Starlette(routes=[Route("/ping", ok)], middleware=middleware)
+
+async def per_request_us(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/ping", "raw_path": b"/ping",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200): # Warm up
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+async def main(requests: int = 20000):
+    # Access logs are measured as disabled-level calls, like a production WARNING threshold
+    logging.getLogger("api.access").setLevel(logging.WARNING)
+    baseline = await per_request_us(build(), requests)
+    legacy = await per_request_us(build(LegacyCorrelationIdMiddleware), requests)
+    current = await per_request_us(build(CorrelationIdMiddleware), requests)
+
+    print(f"{'app':<34}{'µs / request':>14}{'overhead':>12}")
+    print(f"{'no middleware':<34}{baseline:>14.1f}")
+    print(f"{'BaseHTTPMiddleware (before)':<34}{legacy:>14.1f}{legacy - baseline:>12.1f}")
+    print(f"{'pure ASGI (after)':<34}{current:>14.1f}{current - baseline:>12.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
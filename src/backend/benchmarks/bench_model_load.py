@@ -0,0 +1,43 @@
+"""
+Startup benchmark: training the baseline model vs loading the persisted,
+memory-mapped artifact. Each variant runs in a fresh interpreter so import
+cost (sklearn is only imported when training) and peak RSS are included.
+
+    cd src/backend && python -m benchmarks.bench_model_load
+"""
+import subprocess
+import sys
+import tempfile
+
+SNIPPET = """
+import resource, time
+start = time.perf_counter()
+from app.services.detector import AnomalyDetector
+from app.services.model_registry import ModelRegistry
+detector = AnomalyDetector()
+detector.load_or_train(ModelRegistry({root!r}))
+elapsed = (time.perf_counter() - start) * 1000
+print(f"{{elapsed:.1f}} {{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}}")
+"""
+
+def run(root: str):
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(root=root)],
+        check=True, capture_output=True, text=True
+    ).stdout.strip().splitlines()[-1]
+    ms, rss = out.split()
+    return float(ms), float(rss)
+
+def main(repeat: int = 3):
+    with tempfile.TemporaryDirectory() as root:
+        train_ms, train_rss = run(root) # Empty registry: trains and saves
+        loads = [run(root) for _ in range(repeat)]
+
+    load_ms = min(ms for ms, _ in loads)
+    load_rss = min(rss for _, rss in loads)
+    print(f"{'train + save (cold)':<22} {train_ms:>9.1f} ms  peak RSS {train_rss:>7.1f} MiB")
+    print(f"{'load artifact (mmap)':<22} {load_ms:>9.1f} ms  peak RSS {load_rss:>7.1f} MiB")
+    print(f"speedup: {train_ms / load_ms:.1f}x")
+
+if __name__ == "__main__":
+    main()
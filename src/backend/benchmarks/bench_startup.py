@@ -0,0 +1,57 @@
+"""
+Startup benchmark: import time and RSS of `app.main` per deployment profile.
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules. Also
+lists which heavy optional dependencies were pulled in by the import alone
+(they should load on first use). Use --budget-ms to fail CI on regressions.
+
+    cd src/backend && python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ["sklearn", "reportlab", "openai", "polars", "pyarrow", "minio", "msgpack"]
+
+SNIPPET = """
+import resource, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = (time.perf_counter() - start) * 1000
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed:.1f}} {{rss:.1f}} {{','.join(loaded) or '-'}}")
+"""
+
+def run(profile: str):
+    env = {**os.environ, "DEPLOYMENT_PROFILE": profile, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench")}
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(heavy=HEAVY_MODULES)],
+        check=True, capture_output=True, text=True, env=env
+    ).stdout.strip().splitlines()[-1]
+    ms, rss, loaded = out.split()
+    return float(ms), float(rss), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app.main import time and RSS per profile.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Exit non-zero if a profile's median exceeds this")
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'import ms (median)':>20}{'peak RSS MB':>14}  heavy modules loaded")
+    over_budget = False
+    for profile in ("full", "ingest"):
+        results = [run(profile) for _ in range(args.runs)]
+        ms = statistics.median(r[0] for r in results)
+        rss = statistics.median(r[1] for r in results)
+        print(f"{profile:<10}{ms:>20.1f}{rss:>14.1f}  {results[-1][2]}")
+        over_budget |= args.budget_ms is not None and ms > args.budget_ms
+
+    if over_budget:
+        print(f"❌ Import time exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ def client():
     # This prevents tests from trying to connect to real Postgres/MinIO
     with patch("app.services.storage.storage.connect", new_callable=AsyncMock), \
          patch("app.services.storage.storage.close", new_callable=AsyncMock), \
-         patch("app.services.detector.detector.train_baseline", return_value=None):
+         patch("app.services.detector.detector.load_or_train", return_value=None):
         
         with TestClient(app) as c:
             yield c
\ No newline at end of file
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.services.admission import AdmissionController, IngestOverloadedError
+
+
+def test_routine_is_shed_and_high_waits_in_priority_lane():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=3, high_reserve=1, high_queue_size=1)
+        await controller.acquire(high_priority=False)
+        await controller.acquire(high_priority=False)
+        with pytest.raises(IngestOverloadedError):
+            await controller.acquire(high_priority=False) # Routine cannot touch the reserve
+
+        await controller.acquire(high_priority=True) # HIGH uses the reserved slot
+        waiting = asyncio.create_task(controller.acquire(high_priority=True))
+        await asyncio.sleep(0)
+        assert controller.high_waiting == 1
+        with pytest.raises(IngestOverloadedError):
+            await controller.acquire(high_priority=True) # Priority lane is full
+
+        controller.release() # Freed slot goes straight to the waiting HIGH reading
+        await waiting
+        assert controller.in_flight == 3 and controller.high_waiting == 0
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed_routine"] == 1 and stats["shed_high"] == 1
+
+
+def test_overloaded_ingest_returns_429_with_retry_after(client):
+    payload = {
+        "device_id": "LOAD-001",
+        "patient_id": "PATIENT-TEST",
+        "timestamp": "2026-02-07T12:00:00Z",
+        "heart_rate": 80,
+        "spo2": 98.0,
+        "battery_level": 60.0
+    }
+    from app.services.admission import admission
+    from app.services.features import feature_store
+
+    with patch("app.services.storage.storage.store_telemetry", new_callable=AsyncMock) as mock_store, \
+         patch.object(admission, "in_flight", admission.routine_limit):
+        response = client.post(f"{settings.API_PREFIX}/telemetry", json=payload)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(settings.INGEST_RETRY_AFTER_S)
+    mock_store.assert_not_awaited()
+    assert admission.in_flight == 0
+    # The rejected reading left no trace in the rolling window
+    assert "LOAD-001" not in feature_store.slots
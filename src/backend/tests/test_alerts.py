@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from app.domain.schemas import TelemetryPayload
+from app.services.alerts import AlertHub
+from app.services.storage import StorageService
+
+
+def make_alert(device_id: str = "TEST-001", risk_level: str = "HIGH"):
+    return {"id": "x", "device_id": device_id, "risk_level": risk_level, "anomaly_score": -0.3}
+
+
+async def test_hub_filters_and_fans_out():
+    hub = AlertHub(buffer_size=4)
+    everyone = hub.subscribe()
+    one_device = hub.subscribe(device_ids=["TEST-002"], risk_levels=["HIGH", "MEDIUM"])
+
+    hub.publish(make_alert("TEST-001"))
+    hub.publish(make_alert("TEST-002", "MEDIUM"))
+
+    assert (await everyone.next(timeout=1))["device_id"] == "TEST-001"
+    assert everyone.queue.empty() # MEDIUM filtered out by default
+    assert (await one_device.next(timeout=1))["risk_level"] == "MEDIUM"
+
+
+async def test_hub_drops_slow_subscriber_without_blocking():
+    hub = AlertHub(buffer_size=2)
+    slow = hub.subscribe()
+    fast = hub.subscribe()
+
+    for _ in range(3):
+        hub.publish(make_alert())
+        await fast.next(timeout=1)
+
+    assert slow.dropped and not fast.dropped
+    assert await slow.next(timeout=1) is None # End-of-stream marker
+    assert hub.stats() == {"subscribers": 1, "published": 3, "dropped_subscribers": 1}
+
+
+async def test_ingest_publishes_high_risk_with_feed_id():
+    """The storage path pushes HIGH readings with the same id written to `anomalies`."""
+    hub = AlertHub(buffer_size=4)
+    subscriber = hub.subscribe()
+    service = StorageService()
+    service._write_hot_batch = AsyncMock()
+    payloads = [
+        TelemetryPayload(device_id=f"TEST-00{i}", patient_id="PATIENT-TEST", heart_rate=hr, spo2=90.0, battery_level=50.0)
+        for i, hr in enumerate((80, 180))
+    ]
+
+    with patch("app.services.storage.alert_hub", hub):
+        await service.store_telemetry_batch(payloads, ["LOW", "HIGH"], [0.1, -0.3])
+
+    alert = await subscriber.next(timeout=1)
+    _, anomaly_rows = service._write_hot_batch.await_args.args
+    assert alert["device_id"] == "TEST-001"
+    assert alert["id"] == str(anomaly_rows[0][0])
+    assert subscriber.queue.empty()
@@ -48,4 +48,215 @@ def test_accept_valid_telemetry(client):
 def test_health_check(client):
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json()["status"] == "ok"
\ No newline at end of file
+    assert response.json()["status"] == "ok"
+
+# 4. Test Batch Ingestion
+def test_accept_valid_telemetry_batch(client):
+    """
+    Ensure a gateway batch is scored and persisted in one bulk call.
+    Expected: 202 Accepted with one assessment per reading
+    """
+    payloads = [
+        {
+            "device_id": f"TEST-10{i}",
+            "patient_id": "PATIENT-TEST",
+            "timestamp": "2026-02-07T12:00:00Z",
+            "heart_rate": 80 + i,
+            "spo2": 98.0,
+            "battery_level": 60.0
+        }
+        for i in range(3)
+    ]
+
+    with patch("app.services.storage.storage.store_telemetry_batch", new_callable=AsyncMock) as mock_store:
+        response = client.post(f"{settings.API_PREFIX}/telemetry/batch", json=payloads)
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["accepted"] == 3
+        assert [r["device_id"] for r in data["results"]] == ["TEST-100", "TEST-101", "TEST-102"]
+        mock_store.assert_awaited_once()
+
+
+def test_reject_batch_with_impossible_reading(client):
+    """
+    A single invalid reading rejects the whole batch before anything is stored.
+    Expected: 422 Unprocessable Entity
+    """
+    payloads = [
+        {"device_id": "TEST-200", "patient_id": "PATIENT-TEST", "heart_rate": 80, "spo2": 98.0, "battery_level": 60.0},
+        {"device_id": "TEST-201", "patient_id": "PATIENT-TEST", "heart_rate": 300, "spo2": 98.0, "battery_level": 60.0},
+    ]
+
+    with patch("app.services.storage.storage.store_telemetry_batch", new_callable=AsyncMock) as mock_store:
+        response = client.post(f"{settings.API_PREFIX}/telemetry/batch", json=payloads)
+
+        assert response.status_code == 422
+        mock_store.assert_not_awaited()
+
+
+# 5. Test Alert Feed Pagination
+def test_anomalies_feed_cursors_and_etag(client):
+    """Cursors round-trip into keyset bounds, and an unchanged poll returns 304."""
+    import uuid
+    from datetime import datetime, timezone
+
+    rows = [
+        {"id": uuid.uuid4(), "device_id": "TEST-001", "risk_level": "HIGH", "anomaly_score": -0.2,
+         "detected_at": datetime(2026, 2, 7, 12, minute, tzinfo=timezone.utc)}
+        for minute in (5, 4)
+    ]
+
+    with patch("app.services.storage.storage.get_anomalies_page", new_callable=AsyncMock) as mock_page:
+        mock_page.return_value = (rows, True)
+        first = client.get(f"{settings.API_PREFIX}/anomalies", params={"limit": 2, "device_id": "TEST-001"})
+        body = first.json()
+        assert first.status_code == 200
+        assert len(body["data"]) == 2 and body["has_more"] is True
+
+        # Next (older) page seeks past the last row
+        client.get(f"{settings.API_PREFIX}/anomalies", params={"after": body["next_cursor"]})
+        assert mock_page.await_args.kwargs["older_than"] == (rows[-1]["detected_at"], rows[-1]["id"])
+
+        # Incremental poll from the newest row; nothing new -> 304 with the same ETag
+        mock_page.return_value = ([], False)
+        poll = client.get(f"{settings.API_PREFIX}/anomalies", params={"since": body["latest_cursor"]})
+        assert mock_page.await_args.kwargs["newer_than"] == (rows[0]["detected_at"], rows[0]["id"])
+        repeat = client.get(
+            f"{settings.API_PREFIX}/anomalies",
+            params={"since": body["latest_cursor"]},
+            headers={"If-None-Match": poll.headers["ETag"]}
+        )
+        assert repeat.status_code == 304
+
+    assert client.get(f"{settings.API_PREFIX}/anomalies", params={"after": "not-a-cursor"}).status_code == 400
+
+# 6. Test Binary Ingest Formats
+def test_accept_msgpack_reading_and_arrow_batch(client):
+    """MessagePack singles and Arrow IPC batches go through the same pipeline as JSON."""
+    import io
+    from datetime import datetime, timezone
+    import msgpack
+    import polars as pl
+
+    reading = {
+        "device_id": "BIN-001",
+        "patient_id": "PATIENT-TEST",
+        "timestamp": datetime(2026, 2, 7, 12, tzinfo=timezone.utc),
+        "heart_rate": 80,
+        "spo2": 98.0,
+        "battery_level": 60.0
+    }
+    with patch("app.services.storage.storage.store_telemetry", new_callable=AsyncMock) as mock_store:
+        response = client.post(
+            f"{settings.API_PREFIX}/telemetry",
+            content=msgpack.packb(reading, datetime=True),
+            headers={"Content-Type": "application/msgpack"}
+        )
+        assert response.status_code == 202
+        assert mock_store.await_args.args[0].timestamp == reading["timestamp"]
+
+    frame = pl.DataFrame({
+        "device_id": ["BIN-100", "BIN-101"],
+        "patient_id": ["PATIENT-TEST", "PATIENT-TEST"],
+        "timestamp": [datetime(2026, 2, 7, 12), datetime(2026, 2, 7, 12, 1)],
+        "heart_rate": [80, 95],
+        "spo2": [98.0, 97.5],
+        "battery_level": [60.0, 59.5]
+    })
+    body = io.BytesIO()
+    frame.write_ipc_stream(body)
+
+    with patch("app.services.storage.storage.store_telemetry_batch", new_callable=AsyncMock) as mock_store:
+        response = client.post(
+            f"{settings.API_PREFIX}/telemetry/batch",
+            content=body.getvalue(),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+        )
+        assert response.status_code == 202
+        assert [r["device_id"] for r in response.json()["results"]] == ["BIN-100", "BIN-101"]
+        rows = mock_store.await_args.args[0]
+        assert rows[1].heart_rate == 95 and rows[1].timestamp.tzinfo is not None
+
+
+def test_reject_impossible_heart_rate_in_arrow_batch(client):
+    """The vectorized path enforces the same physiological limits as the model validator."""
+    import io
+    import polars as pl
+
+    body = io.BytesIO()
+    pl.DataFrame({
+        "device_id": ["BIN-200", "BIN-201"],
+        "patient_id": ["PATIENT-TEST", "PATIENT-TEST"],
+        "heart_rate": [80, 300],
+        "spo2": [98.0, 98.0],
+        "battery_level": [60.0, 60.0]
+    }).write_ipc_stream(body)
+
+    response = client.post(
+        f"{settings.API_PREFIX}/telemetry/batch",
+        content=body.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "heart_rate"]
+
+
+def test_reject_device_ids_unsafe_for_object_keys(client):
+    """Device ids end up in archive paths, so separators and traversal are rejected on every path."""
+    import io
+    import polars as pl
+    from app.services.archive import partition_prefix
+
+    payload = {"device_id": "../../etc", "patient_id": "PATIENT-TEST", "heart_rate": 80, "spo2": 98.0, "battery_level": 50.0}
+    response = client.post(f"{settings.API_PREFIX}/telemetry", json=payload)
+    assert response.status_code == 422
+
+    body = io.BytesIO()
+    pl.DataFrame({
+        "device_id": ["BIN-300", "BIN/301"],
+        "patient_id": ["PATIENT-TEST", "PATIENT-TEST"],
+        "heart_rate": [80, 80],
+        "spo2": [98.0, 98.0],
+        "battery_level": [60.0, 60.0]
+    }).write_ipc_stream(body)
+    response = client.post(
+        f"{settings.API_PREFIX}/telemetry/batch",
+        content=body.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 1, "device_id"]
+
+    response = client.get(f"{settings.API_PREFIX}/archive/telemetry", params={
+        "device_id": "a=b", "start": "2026-02-07T00:00:00Z", "end": "2026-02-07T12:00:00Z"
+    })
+    assert response.status_code == 422
+
+    assert partition_prefix("WEARABLE-001", "2026-02-07", 9) == "device_id=WEARABLE-001/date=2026-02-07/hour=09"
+    with pytest.raises(ValueError):
+        partition_prefix("..", "2026-02-07", 9)
+
+
+def test_oversized_batch_is_refused_before_item_validation(client):
+    """The 413 comes from the item count or declared size, not after every reading was validated."""
+    import io
+    import polars as pl
+
+    url = f"{settings.API_PREFIX}/telemetry/batch"
+    n = settings.INGEST_BATCH_MAX_SIZE + 1
+    # The items are not valid readings: a 422 would mean they were validated first
+    response = client.post(url, json=[{}] * n)
+    assert response.status_code == 413
+
+    body = io.BytesIO()
+    pl.DataFrame({"device_id": ["BIN-400"] * n, "heart_rate": [999] * n}).write_ipc_stream(body)
+    response = client.post(url, content=body.getvalue(), headers={"Content-Type": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 413
+
+    with patch.object(settings, "INGEST_BATCH_MAX_BYTES", 16):
+        response = client.post(url, json=[{}, {}, {}, {}, {}, {}])
+    assert response.status_code == 413
+
+    response = client.post(url, content=b"[{", headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
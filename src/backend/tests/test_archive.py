@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+import polars as pl
+from app.core.config import settings
+from app.services.archive import ColdArchiver
+from app.services.compaction import compact_archive
+from app.services.object_store import LocalObjectStore
+from app.services.storage import StorageService
+from tests.test_storage import make_payload
+
+
+def make_records(n: int = 3, device_id: str = "TEST-001", hour: int = 10):
+    return [
+        {
+            "device_id": device_id,
+            "patient_id_hash": "x",
+            "timestamp": datetime(2026, 2, 7, hour, i, tzinfo=timezone.utc),
+            "heart_rate": 80,
+            "spo2": 98.0,
+            "risk_level": "LOW"
+        }
+        for i in range(n)
+    ]
+
+
+def test_archiver_retries_and_caches_bucket():
+    """A transient MinIO failure is retried, and the bucket is only checked once per success."""
+    store = MagicMock()
+    store.put.side_effect = [ConnectionError("minio down"), None, None]
+
+    archiver = ColdArchiver("telemetry-raw")
+    with patch.object(settings, "ARCHIVE_RETRY_BACKOFF_S", 0.0):
+        archiver.start(store)
+        archiver.submit(make_records())
+        archiver.submit(make_records())
+        archiver.stop(timeout=5)
+
+    assert store.put.call_count == 3
+    assert archiver.uploaded_batches == 2
+    assert archiver.failed_batches == 0
+    assert archiver.queue_depth == 0
+    # Once before the first attempt, once more after the failure invalidated the cache
+    assert store.ensure_bucket.call_count == 2
+
+
+def test_archiver_spills_when_saturated_and_replays(tmp_path):
+    """submit() never blocks: a full queue spills to disk, and the batch is uploaded once the archiver runs."""
+    spill_path = str(tmp_path / "spill")
+    with patch.object(settings, "ARCHIVE_QUEUE_SIZE", 1):
+        archiver = ColdArchiver("telemetry-raw", worker_id="w1", spill_path=spill_path) # Not started, nothing drains
+
+    assert archiver.submit(make_records()) is True
+    assert archiver.submit(make_records(hour=11)) is False
+    assert (archiver.queue_depth, archiver.spill_depth, archiver.dropped_batches) == (1, 1, 0)
+    assert not os.path.exists(spill_path) # The caller never encodes or writes: the archiver thread spills
+
+    store = LocalObjectStore(str(tmp_path / "archive"), "telemetry-raw")
+    archiver.start(store)
+    archiver.stop(timeout=5)
+
+    assert archiver.spill_depth == 0
+    assert archiver.uploaded_batches == 2
+    assert [obj.key.split("/")[2] for obj in store.list("device_id=TEST-001/")] == ["hour=10", "hour=11"]
+
+
+def test_archiver_spills_batches_that_keep_failing(tmp_path):
+    """A batch that exhausts its retries is parked on disk under its original key, not discarded."""
+    store = MagicMock()
+    store.put.side_effect = ConnectionError("minio down")
+    archiver = ColdArchiver("telemetry-raw", worker_id="w1", spill_path=str(tmp_path))
+
+    with patch.object(settings, "ARCHIVE_RETRY_BACKOFF_S", 0.0), \
+         patch.object(settings, "ARCHIVE_MAX_RETRIES", 2):
+        archiver.start(store)
+        archiver.submit(make_records())
+        archiver.stop(timeout=5)
+
+    assert (archiver.failed_batches, archiver.spilled_batches, archiver.spill_depth) == (1, 1, 1)
+    batch_id = archiver._spilled_paths()[0].rsplit("--", 1)[1][:-len(".arrow")]
+
+    store.put.side_effect = None
+    assert archiver._replay_spilled() == 1
+    assert store.put.call_args.args[0].endswith(f"part-w1-{batch_id}.parquet")
+    assert archiver.spill_depth == 0
+
+
+def test_archiver_thread_survives_a_failed_pass(tmp_path):
+    """An unexpected error (e.g. a spill file vanishing mid-replay) must not end the uploader thread."""
+    store = LocalObjectStore(str(tmp_path / "archive"), "telemetry-raw")
+    archiver = ColdArchiver("telemetry-raw", worker_id="w1", spill_path=str(tmp_path / "spill"))
+
+    with patch.object(archiver, "_replay_spilled", side_effect=FileNotFoundError("gone")), \
+         patch.object(settings, "ARCHIVE_SPILL_RETRY_S", 0.01):
+        archiver.start(store)
+        archiver.submit(make_records())
+        archiver.stop(timeout=5)
+
+    assert archiver.uploaded_batches == 1
+
+
+def test_workers_write_disjoint_objects(tmp_path):
+    """Two workers archiving the same partition never collide on an object name."""
+    store = LocalObjectStore(str(tmp_path), "telemetry-raw")
+    for worker_id in ("host-1", "host-2"):
+        archiver = ColdArchiver("telemetry-raw", worker_id=worker_id)
+        archiver.start(store)
+        archiver.submit(make_records())
+        archiver.stop(timeout=5)
+
+    names = sorted(obj.key.rsplit("/", 1)[1] for obj in store.list("device_id=TEST-001/date=2026-02-07/hour=10/"))
+    assert [name.split("-")[:3] for name in names] == [["part", "host", "1"], ["part", "host", "2"]]
+
+
+async def test_buffer_flushes_on_age_and_drains_on_close(tmp_path):
+    """A partial buffer is flushed once it is old enough, and whatever is left is archived on shutdown."""
+    service = StorageService()
+    service.archiver = ColdArchiver("telemetry-raw", worker_id="w1")
+    service.archiver.start(LocalObjectStore(str(tmp_path), "telemetry-raw"))
+
+    with patch.object(settings, "ARCHIVE_FLUSH_INTERVAL_S", 0.05):
+        service.start_archive_flusher()
+        service._buffer_for_archive(uuid.uuid4(), make_payload("TEST-001"), "x", "LOW", 0.1)
+        await asyncio.sleep(0.2)
+        assert service.buffer == []
+
+        service._buffer_for_archive(uuid.uuid4(), make_payload("TEST-002"), "x", "LOW", 0.1)
+        await service.close()
+
+    assert service.buffer == []
+    assert service.archiver.uploaded_batches == 2
+
+
+def test_archive_layout_and_compaction(tmp_path):
+    """Flushes land in Hive partitions and compaction merges them into one sorted file."""
+    store = LocalObjectStore(str(tmp_path), "telemetry-raw")
+    archiver = ColdArchiver("telemetry-raw")
+    archiver.start(store)
+    archiver.submit(make_records(3, "TEST-001", hour=10) + make_records(2, "TEST-002", hour=11))
+    archiver.submit(make_records(3, "TEST-001", hour=10))
+    archiver.stop(timeout=5)
+
+    keys = [o.key for o in store.list()]
+    assert len(keys) == 3
+    assert sum(k.startswith("device_id=TEST-001/date=2026-02-07/hour=10/") for k in keys) == 2
+
+    summary = compact_archive(store)
+    assert summary == {"device_id=TEST-001/date=2026-02-07/hour=10": 2}
+
+    partition = store.list("device_id=TEST-001/date=2026-02-07/hour=10/")
+    assert len(partition) == 1
+    assert "compacted-" in partition[0].key
+    df = pl.read_parquet(store.get(partition[0].key))
+    assert df.height == 6
+    assert df["timestamp"].is_sorted()
+    assert "device_id" not in df.columns # Encoded in the path
+
+
+def test_query_archive_streams_ndjson_and_arrow(client, tmp_path):
+    """The history endpoint prunes to the requested device/time range and projects columns."""
+    store = LocalObjectStore(str(tmp_path), "telemetry-raw")
+    archiver = ColdArchiver("telemetry-raw")
+    archiver.start(store)
+    archiver.submit(make_records(3, "TEST-001", hour=10) + make_records(3, "TEST-001", hour=12) + make_records(2, "TEST-002", hour=10))
+    archiver.stop(timeout=5)
+
+    params = {
+        "device_id": "TEST-001",
+        "start": "2026-02-07T10:00:00Z",
+        "end": "2026-02-07T10:59:59Z",
+        "columns": "timestamp,heart_rate"
+    }
+    with patch("app.services.storage.storage.archive_store", store):
+        response = client.get(f"{settings.API_PREFIX}/archive/telemetry", params=params)
+        arrow = client.get(f"{settings.API_PREFIX}/archive/telemetry", params={**params, "format": "arrow"})
+
+    assert response.status_code == 200
+    lines = response.text.strip().splitlines()
+    assert len(lines) == 3 # Hour 12 and TEST-002 are pruned
+    assert set(json.loads(lines[0])) == {"timestamp", "heart_rate"}
+
+    assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert pl.read_ipc_stream(arrow.content).shape == (3, 2)
+
+
+def test_query_archive_chunks_by_hour_and_handles_edge_ranges(client, tmp_path):
+    """Several hours stream as one ordered Arrow stream; empty ranges still carry the schema."""
+    store = LocalObjectStore(str(tmp_path), "telemetry-raw")
+    archiver = ColdArchiver("telemetry-raw")
+    archiver.start(store)
+    archiver.submit(make_records(3, "TEST-001", hour=12) + make_records(3, "TEST-001", hour=10))
+    archiver.submit(make_records(2, "TEST-001", hour=11))
+    archiver.stop(timeout=5)
+
+    url = f"{settings.API_PREFIX}/archive/telemetry"
+    params = {"device_id": "TEST-001", "start": "2026-02-07T00:00:00Z", "end": "2026-02-07T23:00:00", "format": "arrow"}
+    with patch("app.services.storage.storage.archive_store", store):
+        full = client.get(url, params=params)
+        limited = client.get(url, params={**params, "limit": 4})
+        empty = client.get(url, params={**params, "start": "2026-02-08T00:00:00Z", "end": "2026-02-08T01:00:00Z"})
+        reversed_range = client.get(url, params={**params, "start": "2026-02-07T12:00:00Z", "end": "2026-02-07T10:00:00"})
+
+    df = pl.read_ipc_stream(full.content)
+    assert df.height == 8 and df["timestamp"].is_sorted()
+    assert pl.read_ipc_stream(limited.content)["timestamp"].dt.hour().to_list() == [10, 10, 10, 11]
+
+    assert empty.status_code == 200
+    assert pl.read_ipc_stream(empty.content).columns == ["device_id", "timestamp", "heart_rate", "spo2", "risk_level"]
+    # Aware start, naive end: compared in UTC instead of raising
+    assert reversed_range.status_code == 400
+
+
+def test_query_archive_rejects_unknown_columns(client):
+    params = {"device_id": "TEST-001", "start": "2026-02-07T10:00:00Z", "end": "2026-02-07T11:00:00Z", "columns": "ssn"}
+    response = client.get(f"{settings.API_PREFIX}/archive/telemetry", params=params)
+    assert response.status_code == 400
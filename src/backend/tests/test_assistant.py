@@ -0,0 +1,154 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+from app.api.v1 import assistant
+from app.core.config import settings
+from app.services.llm import FakeLLM
+from app.services.response_cache import ResponseCache, make_cache_key
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = [line for line in block.splitlines() if not line.startswith(":")]
+        if not lines:
+            continue
+        event = next((line[len("event: "):] for line in lines if line.startswith("event: ")), "message")
+        data = next(line[len("data: "):] for line in lines if line.startswith("data: "))
+        events.append((event, json.loads(data)))
+    return events
+
+
+def test_chat_stream_emits_tokens_then_done(client):
+    """Tokens from the (offline) model arrive as SSE events and reassemble to the full reply."""
+    fake = FakeLLM(first_token_delay_ms=0, token_delay_ms=0)
+    context = "--- TELEMETRY LOG FOR WEARABLE-007 ---\nTime: now, HR: 80 bpm, SPO2: 98.0%\n"
+
+    with patch.object(assistant, "client", fake), \
+         patch.object(assistant, "get_device_context", AsyncMock(return_value=context)) as mock_context:
+        response = client.post(f"{settings.API_PREFIX}/chat/stream", json={"message": "Status of wearable-007?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    mock_context.assert_awaited_once_with("WEARABLE-007")
+
+    events = parse_sse(response.text)
+    assert events[-1] == ("done", {})
+    reply = "".join(data["token"] for event, data in events if event == "message")
+    assert reply.strip() == FakeLLM.reply_for([
+        {"content": "CURRENT PATIENT DATA"}, {"content": "Status of wearable-007?"}
+    ])
+
+
+def test_chat_uses_offline_llm(client):
+    with patch.object(assistant, "client", FakeLLM(0, 0)):
+        response = client.post(f"{settings.API_PREFIX}/chat", json={"message": "What is tachycardia?"})
+
+    assert response.status_code == 200
+    assert "general medical knowledge" in response.json()["reply"]
+
+
+async def test_response_cache_single_flight():
+    """Concurrent identical misses share one upstream call; later calls hit the cache."""
+    cache = ResponseCache(max_entries=2, ttl_s=60)
+    upstream = AsyncMock(return_value="reply")
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        return await upstream()
+
+    key = make_cache_key("Status of  WEARABLE-001?", "ctx")
+    results = await asyncio.gather(*[cache.get_or_compute(key, compute) for _ in range(5)])
+    again = await cache.get_or_compute(make_cache_key("status of wearable-001?", "ctx"), compute)
+
+    assert results == ["reply"] * 5 and again == "reply"
+    assert upstream.await_count == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["hits"] == 1
+    # A different device context is a different answer
+    assert make_cache_key("status of wearable-001?", "ctx2") != key
+
+
+async def test_response_cache_shares_streams():
+    """Concurrent identical streams (and a non-streaming caller) share one upstream stream."""
+    cache = ResponseCache(max_entries=2, ttl_s=60)
+    calls = 0
+
+    async def produce():
+        nonlocal calls
+        calls += 1
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def read_stream():
+        return "".join([token async for token in cache.stream_or_compute("k", produce)])
+
+    results = await asyncio.gather(read_stream(), read_stream(), cache.get_or_compute("k", AsyncMock()))
+    assert results == ["abc"] * 3 and calls == 1
+    assert await read_stream() == "abc"
+    assert (cache.stats()["misses"], cache.stats()["coalesced"], cache.stats()["hits"]) == (1, 2, 1)
+
+
+async def test_response_cache_cancels_stream_without_subscribers():
+    """When the last subscriber leaves, the upstream stream is closed and nothing is cached."""
+    cache = ResponseCache(max_entries=2, ttl_s=60)
+    closed = asyncio.Event()
+
+    async def produce():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "token"
+        finally:
+            closed.set()
+
+    tokens = cache.stream_or_compute("k", produce)
+    assert await tokens.__anext__() == "token"
+    await tokens.aclose()
+
+    await asyncio.wait_for(closed.wait(), 1)
+    assert cache.get("k") is None and cache.stats()["in_flight"] == 0
+
+
+def test_chat_reply_is_cached(client):
+    fake = FakeLLM(0, 0)
+    with patch.object(assistant, "client", fake), \
+         patch.object(assistant, "response_cache", ResponseCache(max_entries=8, ttl_s=60)), \
+         patch.object(fake.chat.completions, "create", wraps=fake.chat.completions.create) as create:
+        for _ in range(3):
+            response = client.post(f"{settings.API_PREFIX}/chat", json={"message": "What is hypoxia?"})
+            assert response.status_code == 200
+        stats = client.get(f"{settings.API_PREFIX}/chat/cache-stats").json()
+
+    assert create.call_count == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_generate_report_renders_off_loop_and_caches(client):
+    """Reports render in the worker pool; identical reports share one render per day."""
+    from datetime import date, timedelta
+    from app.services.report import ReportRenderer, report_id
+
+    renderer = ReportRenderer()
+    generated_on = date(2026, 2, 7)
+    try:
+        with patch.object(assistant, "report_renderer", renderer):
+            response = client.post(f"{settings.API_PREFIX}/generate-report", json={"message": "HR 150 <flagged> & rising"})
+
+        async def render_twice_then_next_day():
+            first = await renderer.render("REPORT", "HR 150", generated_on)
+            again = await renderer.render("REPORT", "HR 150", generated_on)
+            later = await renderer.render("REPORT", "HR 150", generated_on + timedelta(days=1))
+            return first, again, later
+
+        first, again, later = asyncio.run(render_twice_then_next_day())
+    finally:
+        renderer.shutdown()
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert again == first and later != first
+    assert renderer.cache.stats()["hits"] == 1
+    assert report_id("REPORT", "HR 150", generated_on).startswith("20260207-")
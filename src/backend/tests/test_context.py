@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services import context
+from app.services.device_cache import DeviceContextCache
+
+
+def ts(minute: int) -> datetime:
+    return datetime(2026, 2, 7, 12, minute, tzinfo=timezone.utc)
+
+
+def make_pool(rows, alerts):
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=[rows, alerts])
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    return pool, conn
+
+
+async def test_context_served_from_ring_after_backfill():
+    """First lookup backfills from Postgres; later lookups see ingest without a query."""
+    cache = DeviceContextCache(max_devices=10, n_vitals=3, n_alerts=2, ttl_s=0)
+    rows = [{"timestamp": ts(1), "heart_rate": 80, "spo2": 98.0, "battery_level": 70.0}]
+    pool, conn = make_pool(rows, [])
+
+    with patch.object(context, "device_cache", cache), patch.object(context.storage, "read_pool", pool):
+        first = await context.get_device_context("TEST-001")
+        cache.record("TEST-001", ts(2), 150, 90.0, 69.0, "HIGH", -0.3, detected_at=ts(2))
+        second = await context.get_device_context("TEST-001")
+
+    assert conn.fetch.await_count == 2 # Only the backfill queries
+    assert "HR: 80 bpm" in first
+    assert second.index("HR: 150 bpm") < second.index("HR: 80 bpm") # Newest first
+    assert "Risk: HIGH, Score: -0.3000" in second
+
+
+def test_ring_is_bounded_and_lru_evicts():
+    cache = DeviceContextCache(max_devices=2, n_vitals=3, n_alerts=2, ttl_s=0)
+    for device_id in ("A", "B"):
+        cache.seed(device_id, [], [])
+    for minute in range(10):
+        cache.record("A", ts(minute), 80 + minute, 98.0, 70.0, "LOW", 0.1)
+
+    assert [v["heart_rate"] for v in cache.get("A").recent_vitals()] == [89, 88, 87]
+
+    cache.seed("C", [], []) # "B" is least recently used
+    assert cache.get("B") is None
+    assert cache.get("A") is not None and len(cache) == 2
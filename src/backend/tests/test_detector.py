@@ -0,0 +1,62 @@
+import numpy as np
+from app.core.config import settings
+from app.services.detector import AnomalyDetector
+from app.services.features import build_feature_matrix, cold_features
+
+
+def test_predict_batch_matches_single_predictions():
+    """The vectorized path must agree with the per-reading path."""
+    detector = AnomalyDetector()
+    detector.train_baseline()
+
+    readings = np.array([
+        [80, 98, 75],   # Normal
+        [150, 85, 40],  # Tachycardia + hypoxia
+        [45, 92, 10],   # Bradycardia
+    ], dtype=np.float64)
+
+    batch = detector.predict_batch(cold_features(readings, settings.FEATURE_WINDOWS))
+
+    for i, (hr, spo2, battery) in enumerate(readings):
+        single = detector.predict(hr, spo2, battery)
+        assert np.isclose(batch["anomaly_score"][i], single["anomaly_score"])
+        assert batch["risk_level"][i] == single["risk_level"]
+        assert bool(batch["is_anomaly"][i]) == single["is_anomaly"]
+
+
+def test_compiled_forest_matches_sklearn():
+    """The flattened inference engine reproduces sklearn's scores and labels."""
+    detector = AnomalyDetector()
+    detector.train_baseline()
+
+    rng = np.random.RandomState(0)
+    raw = np.c_[rng.uniform(30, 250, 500), rng.uniform(70, 100, 500), rng.uniform(0, 100, 500)]
+    readings = build_feature_matrix([f"dev-{i % 20}" for i in range(500)], raw, settings.FEATURE_WINDOWS)
+
+    expected = detector.model.decision_function(readings)
+    assert np.allclose(detector.engine.decision_function(readings), expected, rtol=0, atol=1e-12)
+    assert np.array_equal(detector.predict_batch(readings)["is_anomaly"], detector.model.predict(readings) == -1)
+    for row, score in zip(readings[:20], expected[:20]):
+        assert np.isclose(detector.engine.decision_function_one(row), score, rtol=0, atol=1e-12)
+
+
+def test_registry_round_trip_loads_identical_engine(tmp_path):
+    """A persisted artifact is reused on the next start and scores identically."""
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(str(tmp_path))
+    trained = AnomalyDetector()
+    trained.load_or_train(registry)
+    assert trained.model is not None
+    assert registry.exists(trained.model_version)
+
+    loaded = AnomalyDetector()
+    loaded.load_or_train(registry)
+    assert loaded.model is None # Served from the artifact, no retraining
+    assert loaded.model_version == trained.model_version
+    assert isinstance(loaded.engine.threshold, np.ndarray)
+
+    rng = np.random.RandomState(1)
+    raw = np.c_[rng.uniform(30, 250, 200), rng.uniform(70, 100, 200), rng.uniform(0, 100, 200)]
+    readings = build_feature_matrix([f"dev-{i % 10}" for i in range(200)], raw, settings.FEATURE_WINDOWS)
+    assert np.array_equal(loaded.engine.decision_function(readings), trained.engine.decision_function(readings))
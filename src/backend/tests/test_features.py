@@ -0,0 +1,98 @@
+import numpy as np
+from app.core.config import settings
+from app.services.detector import AnomalyDetector
+from app.services.features import RollingFeatureStore, cold_features
+
+
+def test_rolling_features_match_full_recompute():
+    """O(1) updates agree with recomputing each window from the raw history."""
+    store = RollingFeatureStore([3, 5], max_devices=4)
+    rng = np.random.RandomState(0)
+    history = {}
+
+    for step in range(300):
+        device_id = f"dev-{rng.randint(3)}"
+        reading = np.array([rng.randint(60, 100), rng.normal(97, 1), 50.0])
+        features = store.update(device_id, reading, now=float(step))
+        history.setdefault(device_id, []).append(reading)
+
+        past = np.array(history[device_id])
+        expected = list(reading)
+        for signal in range(2):
+            for window in (3, 5):
+                y = past[-window:, signal]
+                slope = np.polyfit(np.arange(len(y)), y, 1)[0] if len(y) > 1 else 0.0
+                expected += [y.mean(), y.std(), slope, y.min(), y.max()]
+        assert np.allclose(features, expected, atol=1e-8)
+
+
+def test_first_reading_equals_cold_features_and_idle_devices_are_evicted():
+    store = RollingFeatureStore([3, 5], max_devices=2, idle_ttl_s=60)
+    reading = np.array([80.0, 98.0, 75.0])
+    assert np.allclose(store.update("a", reading, now=0.0), cold_features(reading, [3, 5])[0])
+
+    store.update("b", reading, now=1.0)
+    store.update("c", reading, now=2.0) # Full: least recently seen ("a") makes room
+    assert set(store.slots) == {"b", "c"}
+
+    assert store.evict_idle(now=100.0) == 2
+    assert store.stats() == {"devices": 0, "capacity": 2, "evicted": 3}
+
+
+def test_restore_rolls_back_rejected_readings():
+    """A rejected batch leaves the store as it was, so its retry is only counted once."""
+    store = RollingFeatureStore([3, 5], max_devices=4)
+    for step in range(4):
+        store.update("a", [80.0 + step, 98.0, 50.0], now=float(step))
+    expected = store.update("a", [120.0, 90.0, 50.0], now=5.0)
+
+    store = RollingFeatureStore([3, 5], max_devices=4)
+    for step in range(4):
+        store.update("a", [80.0 + step, 98.0, 50.0], now=float(step))
+    checkpoint = store.checkpoint(["a", "b", "a"])
+    store.update_batch(["a", "b", "a"], [[120.0, 90.0, 50.0], [70.0, 97.0, 50.0], [121.0, 89.0, 50.0]], now=4.0)
+    store.restore(checkpoint)
+
+    assert set(store.slots) == {"a"}
+    assert store.stats()["evicted"] == 0
+    assert np.allclose(store.update("a", [120.0, 90.0, 50.0], now=5.0), expected)
+
+
+def test_falling_spo2_trend_scores_lower_than_single_dip():
+    """A steady desaturation is more anomalous than one dip to the same SpO2."""
+    detector = AnomalyDetector()
+    detector.train_baseline()
+    store = RollingFeatureStore(settings.FEATURE_WINDOWS, max_devices=2)
+    rng = np.random.RandomState(1)
+
+    falling = np.linspace(98, 96, 30)
+    dip = np.append(98 + rng.normal(0, 0.5, 29), 96)
+    for trend_spo2, dip_spo2 in zip(falling, dip):
+        trend = store.update("falling", (80.0, trend_spo2, 70.0))
+        blip = store.update("dip", (80.0, dip_spo2, 70.0))
+
+    assert trend[1] == blip[1] # Same instantaneous reading
+    assert detector.predict_features(trend)["anomaly_score"] < detector.predict_features(blip)["anomaly_score"]
+
+
+def test_acute_readings_on_warm_device_score_high():
+    """A device with a normal history is HIGH from the first acute reading, on both scoring paths."""
+    detector = AnomalyDetector()
+    detector.train_baseline()
+    rng = np.random.RandomState(2)
+    crises = {"tachy-hypoxia": (140, 92), "tachy": (120, 95), "brady-hypoxia": (40, 85), "extreme": (200, 80)}
+
+    store = RollingFeatureStore(settings.FEATURE_WINDOWS, max_devices=len(crises) + 1)
+    for _ in range(100):
+        for device_id in list(crises) + ["falling"]:
+            store.update(device_id, (80 + rng.normal(0, 2), 98 + rng.normal(0, 0.4), 80.0))
+
+    for device_id, (hr, spo2) in crises.items():
+        rows = np.array([store.update(device_id, (hr, spo2, 80.0)) for _ in range(8)])
+        assert list(detector.predict_batch(rows)["risk_level"]) == ["HIGH"] * 8, device_id
+        assert detector.predict_features(rows[0])["risk_level"] == "HIGH"
+
+    # Steady desaturation: HIGH by the time SpO2 reaches 88
+    falling = [detector.predict_features(store.update("falling", (80.0, spo2, 80.0)))["risk_level"] for spo2 in np.linspace(97.5, 88, 8)]
+    assert falling[-1] == "HIGH"
+    assert detector.predict(80, 98, 80)["risk_level"] == "LOW"
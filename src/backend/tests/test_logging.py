@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from app.core.logging import CorrelationIdFilter, CorrelationIdMiddleware
+
+
+class RecordCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.addFilter(CorrelationIdFilter())
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_correlation_id_reaches_logs_tasks_and_streams():
+    app = FastAPI()
+    app.add_middleware(CorrelationIdMiddleware)
+    logger = logging.getLogger("test.correlation")
+
+    @app.get("/work")
+    async def work():
+        async def background():
+            logger.warning("in task")
+
+        logger.warning("in handler")
+        # Spawned tasks inherit the request's context
+        await asyncio.create_task(background())
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                logger.warning(f"chunk {i}")
+                yield f"{i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    collector = RecordCollector()
+    logger.addHandler(collector)
+    try:
+        client = TestClient(app)
+        response = client.get("/work", headers={"X-Correlation-ID": "req-123"})
+        streamed = client.get("/stream", headers={"X-Correlation-ID": "req-456"})
+        generated = client.get("/work")
+    finally:
+        logger.removeHandler(collector)
+
+    assert response.headers["X-Correlation-ID"] == "req-123"
+    assert streamed.text == "0\n1\n2\n"
+    assert streamed.headers["X-Correlation-ID"] == "req-456"
+    assert generated.headers["X-Correlation-ID"] # Generated when not supplied
+
+    ids = [(r.getMessage(), r.correlation_id) for r in collector.records]
+    assert ids[:5] == [
+        ("in handler", "req-123"), ("in task", "req-123"),
+        ("chunk 0", "req-456"), ("chunk 1", "req-456"), ("chunk 2", "req-456")
+    ]
+    assert ids[5][1] == generated.headers["X-Correlation-ID"]
+
+
+def test_sampling_never_drops_warnings_and_full_queue_never_blocks():
+    import queue
+    from app.core.logging import NonBlockingQueueHandler, SamplingFilter
+
+    sampler = SamplingFilter(0.0)
+    info = logging.LogRecord("biostream.routine", logging.INFO, __file__, 1, "Telemetry Accepted", None, None)
+    warning = logging.LogRecord("biostream.routine", logging.WARNING, __file__, 1, "ANOMALY DETECTED", None, None)
+    assert not sampler.filter(info)
+    assert sampler.filter(warning)
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(info)
+    handler.handle(info) # Queue full: routine record is dropped, not waited on
+    assert handler.dropped == 1
+
+    handler.handle(warning) # Still full: waits LOG_WARNING_PUT_TIMEOUT_S, then drops
+    assert handler.dropped == 2
+
+    handler.queue.get_nowait()
+    handler.handle(warning)
+    assert handler.queue.get_nowait().getMessage() == "ANOMALY DETECTED"
+
+
+def test_setup_logging_is_idempotent_and_flushes_json(capsys):
+    import json
+    from app.core.logging import correlation_id_var, setup_logging, shutdown_logging
+
+    root_handlers = len(logging.root.handlers)
+    setup_logging()
+    setup_logging()
+    assert len(logging.root.handlers) == root_handlers + 1
+
+    token = correlation_id_var.set("req-789")
+    try:
+        logging.getLogger("test.pipeline").warning("queued %s", "line", extra={"device_id": "DEV-1"})
+    finally:
+        correlation_id_var.reset(token)
+    shutdown_logging()
+    assert len(logging.root.handlers) == root_handlers
+
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines() if "queued line" in line]
+    assert lines == [{**lines[0], "message": "queued line", "correlation_id": "req-789", "device_id": "DEV-1", "level": "WARNING"}]
@@ -0,0 +1,47 @@
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.core.metrics import Histogram, MetricsRegistry, INGEST_STAGE_SECONDS, READINGS_TOTAL
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency.", labelnames=("stage",), buckets=(0.01, 0.1))
+    latency.observe(0.005, stage="a")
+    latency.observe(0.05, stage="a")
+    latency.observe(5.0, stage="a")
+    registry.counter("demo_events", "Demo events.", labelnames=("risk",)).inc(risk="HIGH")
+    registry.gauge("demo_depth", "Demo depth.", lambda: 7)
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="a",le="0.01"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+    assert 'demo_events_total{risk="HIGH"} 1.0' in text
+    assert 'demo_depth 7.0' in text
+
+
+def test_ingest_stages_are_exported(client):
+    payload = {
+        "device_id": "METRICS-001",
+        "patient_id": "PATIENT-TEST",
+        "timestamp": "2026-02-07T12:00:00Z",
+        "heart_rate": 80,
+        "spo2": 98.0,
+        "battery_level": 60.0
+    }
+    validated = INGEST_STAGE_SECONDS.count(stage="validate")
+    low = READINGS_TOTAL.value(risk="LOW")
+
+    with patch("app.services.storage.storage.store_telemetry", new_callable=AsyncMock):
+        assert client.post(f"{settings.API_PREFIX}/telemetry", json=payload).status_code == 202
+
+    assert INGEST_STAGE_SECONDS.count(stage="validate") == validated + 1
+    assert READINGS_TOTAL.value(risk="LOW") == low + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name in ("biostream_ingest_stage_seconds_bucket", "biostream_readings_total", "biostream_event_loop_lag_seconds", "biostream_archive_buffer_records", "biostream_pg_pool_in_use"):
+        assert name in response.text
@@ -0,0 +1,116 @@
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+import polars as pl
+from app.services.archive import ColdArchiver, encode_parquet, partition_prefix
+from app.services.object_store import LocalObjectStore
+from app.services.retention import PartitionMaintainer, archived_rows, partition_day, partition_name
+
+
+def make_records(ids, device_id: str, day: int, month: int = 2, year: int = 2026, risk: str = "LOW"):
+    return [
+        {
+            "id": row_id,
+            "device_id": device_id,
+            "patient_id_hash": "x",
+            "timestamp": datetime(year, month, day, 10, i, tzinfo=timezone.utc),
+            "heart_rate": 80,
+            "spo2": 98.0,
+            "risk_level": risk,
+            "anomaly_score": 0.1
+        }
+        for i, row_id in enumerate(ids)
+    ]
+
+
+class FakeConnection:
+    """Answers the handful of statements the maintainer issues."""
+    def __init__(self, partitions, rows):
+        self.partitions = partitions # table -> partition names
+        self.rows = rows # partition name -> {device_id: [reading ids]}
+        self.statements = []
+
+    async def fetchval(self, query, *args):
+        self.statements.append(query)
+        if "pg_try_advisory_lock" in query:
+            return True
+        return 2 # create_daily_partitions
+
+    async def fetch(self, query, *args):
+        if "pg_inherits" in query:
+            return [{"relname": name} for name in self.partitions.get(args[0], [])]
+        name = query.split('"')[1]
+        if "DISTINCT device_id" in query:
+            return [{"device_id": d} for d in self.rows[name]]
+        return [{"id": row_id} for row_id in self.rows[name][args[0]]]
+
+    async def execute(self, query, *args):
+        self.statements.append(query)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakeStorage:
+    """Long-running work on the dedicated connection, DDL on a write-pool one."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.write_conn = FakeConnection({}, {})
+
+    @asynccontextmanager
+    async def maintenance_connection(self):
+        yield self.conn
+
+    @asynccontextmanager
+    async def write_connection(self):
+        yield self.write_conn
+
+
+def test_partition_names_round_trip():
+    name = partition_name("device_telemetry", date(2026, 2, 7))
+    assert name == "device_telemetry_p20260207"
+    assert partition_day("device_telemetry", name) == date(2026, 2, 7)
+    assert partition_day("device_telemetry", "device_telemetry_default") is None
+
+
+async def test_retention_drops_only_days_whose_ids_are_archived(tmp_path):
+    """Expired telemetry and anomaly days are dropped only when the archive holds every reading id."""
+    store = LocalObjectStore(str(tmp_path), "telemetry-raw")
+    archiver = ColdArchiver("telemetry-raw", spill_path=str(tmp_path / "spill"))
+    archiver.start(store)
+    archiver.submit(make_records(["a1", "a2", "a3"], "TEST-001", day=1) + make_records(["b1", "b2"], "TEST-002", day=1))
+    archiver.submit(make_records(["a4", "a5"], "TEST-001", day=2))
+    # TEST-002's day 2 batch was lost, but b3 was archived twice: the row counts still match
+    archiver.submit(make_records(["b3"], "TEST-002", day=2))
+    archiver.submit(make_records(["b3"], "TEST-002", day=2))
+    archiver.submit(make_records(["h1"], "TEST-001", day=1, month=11, year=2025, risk="HIGH"))
+    archiver.stop(timeout=5)
+    # Written before ids were archived: can only vouch for one row of its day
+    legacy = pl.DataFrame(make_records([None], "TEST-003", day=1)).drop("id", "anomaly_score", "device_id")
+    store.put(partition_prefix("TEST-003", "2026-02-01", 10) + "/part-old.parquet", encode_parquet(legacy))
+
+    archived = archived_rows(store, "TEST-002", [date(2026, 2, 2)])
+    assert archived.ids == {"b3"} and archived.legacy == 0
+    assert archived_rows(store, "TEST-003", [date(2026, 2, 1)]).legacy == 1
+
+    conn = FakeConnection(
+        partitions={
+            "device_telemetry": ["device_telemetry_default", "device_telemetry_p20260201", "device_telemetry_p20260202", "device_telemetry_p20260220"],
+            "anomalies": ["anomalies_p20251101", "anomalies_p20251102", "anomalies_p20260201"]
+        },
+        rows={
+            "device_telemetry_p20260201": {"TEST-001": ["a1", "a2", "a3"], "TEST-002": ["b1", "b2"], "TEST-003": ["c1"]},
+            "device_telemetry_p20260202": {"TEST-001": ["a4", "a5"], "TEST-002": ["b3", "b4"]},
+            "anomalies_p20251101": {"TEST-001": ["h1"]},
+            "anomalies_p20251102": {"TEST-001": ["h2"]} # Its reading never reached the archive
+        }
+    )
+    db = FakeStorage(conn)
+    report = await PartitionMaintainer().run_once(db, store, today=date(2026, 2, 21))
+
+    assert report["created"] == 6
+    assert report["dropped"] == ["device_telemetry_p20260201", "anomalies_p20251101"]
+    assert report["retained"] == {"device_telemetry_p20260202": ["TEST-002"], "anomalies_p20251102": ["TEST-001"]}
+    assert 'ALTER TABLE "device_telemetry" DETACH PARTITION "device_telemetry_p20260201"' in db.write_conn.statements
+    assert not any("DETACH" in statement for statement in conn.statements)
+    assert conn.statements[-1].startswith("SELECT pg_advisory_unlock")
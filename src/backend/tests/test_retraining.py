@@ -0,0 +1,90 @@
+import asyncio
+import json
+import numpy as np
+from app.core.config import settings
+from app.services.detector import BASELINE_CONFIG, AnomalyDetector, synthetic_sequences
+from app.services.model_registry import config_hash
+from app.services.retraining import ModelRetrainer, validate_engine
+
+
+class MediumCanaryEngine:
+    """Plausible on training data, but scores every canary as merely MEDIUM."""
+    def decision_function(self, X):
+        return np.full(len(X), 0.1) if len(X) > 10 else np.full(len(X), settings.RISK_HIGH_SCORE + 0.01)
+
+
+def test_retrain_swaps_validated_model_and_rejects_bad_one(tmp_path):
+    """Accepted candidates are hot-swapped and activated; rejected ones never serve."""
+    target = AnomalyDetector()
+    target.train_baseline()
+    baseline_engine = target.engine
+    retrainer = ModelRetrainer(target, registry_root=str(tmp_path))
+
+    # Recent "real" population: normal patients, different draw than the baseline
+    recent_ids, recent = synthetic_sequences(100, 60, seed=7)
+    # Garbage: patients parked anywhere in the vital range would teach the model that emergencies are normal
+    rng = np.random.RandomState(7)
+    levels = np.c_[rng.uniform(30, 200, 100), rng.uniform(65, 100, 100), rng.uniform(0, 100, 100)]
+    garbage = np.repeat(levels, 30, axis=0) + rng.normal(0, 0.5, (3000, 3))
+    garbage_ids = [f"garbage-{i // 30}" for i in range(3000)]
+
+    async def scenario():
+        try:
+            accepted = await retrainer.retrain_once(recent_ids, recent)
+            swapped_engine = target.engine
+            rejected = await retrainer.retrain_once(garbage_ids, garbage)
+            return accepted, swapped_engine, rejected
+        finally:
+            await retrainer.stop()
+
+    accepted, swapped_engine, rejected = asyncio.run(scenario())
+
+    assert accepted["accepted"]
+    assert swapped_engine is not baseline_engine
+    assert target.model_version == accepted["artifact_id"]
+    assert retrainer.registry.active() == accepted["artifact_id"]
+    assert target.predict(150, 85, 40)["is_anomaly"]
+
+    assert not rejected["accepted"]
+    assert "canary readings not flagged HIGH" in rejected["problems"]
+    assert target.engine is swapped_engine # The rejected model never served
+    assert not retrainer.registry.exists(rejected["artifact_id"])
+    assert retrainer.stats()["swaps"] == 1 and retrainer.stats()["rejected"] == 1
+
+
+def test_load_or_train_prefers_active_artifact(tmp_path):
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(str(tmp_path))
+    retrainer = ModelRetrainer(AnomalyDetector(), registry_root=str(tmp_path))
+    recent_ids, recent = synthetic_sequences(100, 60, seed=3)
+
+    async def scenario():
+        try:
+            return await retrainer.retrain_once(recent_ids, recent)
+        finally:
+            await retrainer.stop()
+
+    report = asyncio.run(scenario())
+
+    restarted = AnomalyDetector()
+    restarted.load_or_train(registry)
+    assert restarted.model_version == report["artifact_id"]
+
+    # FEATURE_WINDOWS changed since the promotion: the active engine has the wrong width
+    meta_path = registry.path(report["artifact_id"]) / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta["config"]["feature_windows"] = [5, 30]
+    meta_path.write_text(json.dumps(meta))
+
+    restarted = AnomalyDetector()
+    restarted.load_or_train(registry)
+    assert restarted.model_version == registry.artifact_id(settings.MODEL_VERSION, config_hash(BASELINE_CONFIG))
+    assert restarted.predict(190, 80, 50)["risk_level"] == "HIGH"
+
+
+def test_validation_requires_high_canaries():
+    report = validate_engine(MediumCanaryEngine(), np.zeros((100, 33)), contamination=0.05)
+    assert not report["accepted"]
+    assert report["problems"] == ["canary readings not flagged HIGH"]
+
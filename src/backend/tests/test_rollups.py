@@ -0,0 +1,99 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.services.rollups import RollupAggregator, choose_resolution
+
+
+class FakePool:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = [] # (table, column arrays)
+
+    async def execute(self, query, *args):
+        if self.fail:
+            raise ConnectionError("postgres down")
+        self.calls.append((query.split("INSERT INTO ")[1].split()[0], args))
+
+    @asynccontextmanager
+    async def write_connection(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+async def test_rollups_merge_minutes_into_hours_and_days():
+    """Readings fold into minute partials; each flush upserts all three resolutions."""
+    aggregator = RollupAggregator()
+    base = datetime(2026, 2, 7, 10, 0, 5, tzinfo=timezone.utc)
+    aggregator.record("TEST-001", base, 80, 98.0)
+    aggregator.record("TEST-001", base + timedelta(seconds=30), 100, 96.0)
+    aggregator.record("TEST-001", base + timedelta(minutes=5), 60, 99.0)
+    assert aggregator.pending == 2
+
+    pool = FakePool()
+    assert await aggregator.flush(pool.write_connection) == 2
+    assert aggregator.pending == 0
+
+    tables = {table: args for table, args in pool.calls}
+    assert list(tables) == ["telemetry_rollup_1m", "telemetry_rollup_1h", "telemetry_rollup_1d"]
+    device_ids, buckets, n, hr_sum, hr_min, hr_max, *_ = tables["telemetry_rollup_1m"]
+    assert buckets == [datetime(2026, 2, 7, 10, 0, tzinfo=timezone.utc), datetime(2026, 2, 7, 10, 5, tzinfo=timezone.utc)]
+    assert n == [2, 1] and hr_sum == [180.0, 60.0] and hr_min == [80.0, 60.0]
+
+    _, buckets, n, hr_sum, hr_min, hr_max, spo2_sum, spo2_min, spo2_max = tables["telemetry_rollup_1h"]
+    assert buckets == [datetime(2026, 2, 7, 10, tzinfo=timezone.utc)]
+    assert (n, hr_sum, hr_min, hr_max, spo2_min, spo2_max) == ([3], [240.0], [60.0], [100.0], [96.0], [99.0])
+
+
+async def test_failed_flush_keeps_partials():
+    """A failed upsert leaves its partials pending, merged with newer readings."""
+    aggregator = RollupAggregator()
+    ts = datetime(2026, 2, 7, 10, 0, tzinfo=timezone.utc)
+    aggregator.record("TEST-001", ts, 80, 98.0)
+
+    with pytest.raises(ConnectionError):
+        await aggregator.flush(FakePool(fail=True).write_connection)
+    aggregator.record("TEST-001", ts, 120, 97.0)
+
+    pool = FakePool()
+    await aggregator.flush(pool.write_connection)
+    _, _, n, hr_sum, hr_min, hr_max, *_ = pool.calls[0][1]
+    assert (n, hr_sum, hr_min, hr_max) == ([2], [200.0], [80.0], [120.0])
+
+
+def test_choose_resolution_prefers_coarsest_sufficient():
+    start = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    assert choose_resolution(start, start + timedelta(days=90), 60, 5000) == "1d"
+    assert choose_resolution(start, start + timedelta(days=7), 100, 5000) == "1h"
+    assert choose_resolution(start, start + timedelta(hours=6), 100, 5000) == "1m"
+    # Not enough hours for 500 points, but 1m would exceed the response cap
+    assert choose_resolution(start, start + timedelta(days=7), 500, 5000) == "1h"
+    # Minute buckets already expired for this range
+    assert choose_resolution(start, start + timedelta(hours=6), 100, 5000, oldest_minute=start + timedelta(days=1)) == "1h"
+
+
+def test_series_endpoint(client):
+    rows = [{"bucket": datetime(2026, 2, 7, h, tzinfo=timezone.utc), "count": 60, "hr_min": 70.0, "hr_avg": 80.0,
+             "hr_max": 95.0, "spo2_min": 96.0, "spo2_avg": 97.5, "spo2_max": 99.0} for h in range(3)]
+    with patch("app.services.storage.storage.get_rollup_series", new_callable=AsyncMock) as mock_series:
+        mock_series.return_value = rows
+        response = client.get(f"{settings.API_PREFIX}/telemetry/series", params={
+            "device_id": "TEST-001", "start": "2026-01-01T00:00:00Z", "end": "2026-01-08T00:00:00Z", "points": 100
+        })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["resolution"] == "1h"
+    assert len(body["points"]) == 3
+    assert mock_series.await_args.args[:2] == ("TEST-001", "1h")
+
+
+def test_series_endpoint_compares_mixed_timezones(client):
+    response = client.get(f"{settings.API_PREFIX}/telemetry/series", params={
+        "device_id": "TEST-001", "start": "2026-01-08T00:00:00Z", "end": "2026-01-01T00:00:00"
+    })
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import pytest
+
+SNIPPET = """
+import sys
+import app.main
+heavy = [m for m in ("sklearn", "reportlab", "openai", "polars", "minio") if m in sys.modules]
+print(",".join(heavy) or "-", "/api/v1/chat" in app.main.app.openapi()["paths"])
+"""
+
+
+def import_app(profile: str, **extra_env):
+    env = {**os.environ, "DEPLOYMENT_PROFILE": profile, "OPENAI_API_KEY": "test", **extra_env}
+    env = {name: value for name, value in env.items() if value is not None}
+    out = subprocess.run([sys.executable, "-c", SNIPPET], check=True, capture_output=True, text=True, env=env)
+    heavy, has_chat = out.stdout.split()
+    return heavy, has_chat == "True"
+
+
+def test_heavy_dependencies_load_lazily():
+    """Importing the app pulls in no heavy optional dependency; the ingest profile drops the assistant."""
+    assert import_app("full") == ("-", True)
+    assert import_app("ingest") == ("-", False)
+
+
+def test_openai_key_is_only_required_by_the_full_profile():
+    assert import_app("ingest", OPENAI_API_KEY=None) == ("-", False)
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        import_app("full", OPENAI_API_KEY=None)
+    assert "OPENAI_API_KEY is required" in e.value.stderr
+
+
+def test_refuses_to_start_with_several_workers(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY"):
+        with TestClient(app):
+            pass
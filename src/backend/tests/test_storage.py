@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+from app.core.config import settings
+from app.domain.schemas import TelemetryPayload
+from app.services.storage import PG_ACQUIRE_SECONDS, PG_ACQUIRE_TIMEOUTS, DatabaseBusyError, StorageService
+
+
+def make_payload(device_id: str, heart_rate: int = 80) -> TelemetryPayload:
+    return TelemetryPayload(
+        device_id=device_id,
+        patient_id="PATIENT-TEST",
+        heart_rate=heart_rate,
+        spo2=98.0,
+        battery_level=60.0
+    )
+
+
+async def test_write_behind_coalesces_and_drains():
+    """Concurrent readings are flushed as one COPY batch, anomalies after their telemetry."""
+    service = StorageService()
+    service._write_hot_batch = AsyncMock()
+
+    with patch.object(settings, "WRITE_BEHIND_DURABILITY", "flush"), \
+         patch.object(settings, "WRITE_BEHIND_MAX_DELAY_MS", 50.0):
+        service.start_write_behind()
+        await asyncio.gather(
+            service.store_telemetry(make_payload("TEST-001"), "LOW", 0.1),
+            service.store_telemetry(make_payload("TEST-002", 180), "HIGH", -0.3),
+            service.store_telemetry(make_payload("TEST-003"), "LOW", 0.1),
+        )
+        await service.stop_write_behind()
+
+    service._write_hot_batch.assert_awaited_once()
+    telemetry_rows, anomaly_rows = service._write_hot_batch.await_args.args
+    assert [row[1] for row in telemetry_rows] == ["TEST-001", "TEST-002", "TEST-003"]
+    assert len(anomaly_rows) == 1
+    assert anomaly_rows[0][1] == telemetry_rows[1][0] # Anomaly references its telemetry row
+
+
+async def test_write_behind_enqueue_mode_flushes_on_shutdown():
+    """With ack-on-enqueue, shutdown must still flush everything that was queued."""
+    service = StorageService()
+    service._write_hot_batch = AsyncMock()
+
+    with patch.object(settings, "WRITE_BEHIND_DURABILITY", "enqueue"), \
+         patch.object(settings, "WRITE_BEHIND_MAX_DELAY_MS", 10_000.0):
+        service.start_write_behind()
+        for i in range(5):
+            await service.store_telemetry(make_payload(f"TEST-00{i}"), "LOW", 0.1)
+        service._write_hot_batch.assert_not_awaited()
+
+        await service.stop_write_behind()
+
+    telemetry_rows, _ = service._write_hot_batch.await_args.args
+    assert len(telemetry_rows) == 5
+
+
+async def test_write_behind_shutdown_flushes_puts_behind_sentinel():
+    """Requests blocked on a full queue when shutdown starts still get flushed and acknowledged."""
+    service = StorageService()
+    service._write_hot_batch = AsyncMock()
+
+    with patch.object(settings, "WRITE_BEHIND_DURABILITY", "flush"), \
+         patch.object(settings, "WRITE_BEHIND_QUEUE_SIZE", 1), \
+         patch.object(settings, "WRITE_BEHIND_MAX_DELAY_MS", 0.0):
+        service.start_write_behind()
+        writes = [asyncio.create_task(service.store_telemetry(make_payload(f"TEST-{i:03d}"), "LOW", 0.1)) for i in range(8)]
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await service.stop_write_behind()
+        await asyncio.wait_for(asyncio.gather(*writes), 1)
+
+    assert sum(len(call.args[0]) for call in service._write_hot_batch.await_args_list) == 8
+
+
+class SingleConnectionPool:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        await asyncio.wait_for(self.lock.acquire(), timeout)
+        try:
+            yield object()
+        finally:
+            self.lock.release()
+
+
+async def test_saturated_read_pool_never_blocks_writes():
+    """Reads time out on their own pool (DatabaseBusyError) while writes still get a connection."""
+    service = StorageService()
+    service.pool, service.read_pool = SingleConnectionPool(), SingleConnectionPool()
+    timeouts = PG_ACQUIRE_TIMEOUTS.value(pool="read")
+    acquired = PG_ACQUIRE_SECONDS.count(pool="write")
+
+    with patch.object(settings, "PG_READ_ACQUIRE_TIMEOUT_S", 0.05):
+        async with service.read_connection():
+            with pytest.raises(DatabaseBusyError):
+                async with service.read_connection():
+                    pass
+            async with service.write_connection():
+                pass
+
+    assert PG_ACQUIRE_TIMEOUTS.value(pool="read") == timeouts + 1
+    assert PG_ACQUIRE_SECONDS.count(pool="write") == acquired + 1
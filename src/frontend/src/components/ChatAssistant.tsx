@@ -16,8 +16,41 @@ export default function ChatAssistant() {
         setLoading(true);
 
         try {
-            const res = await axios.post('http://localhost:8000/api/v1/chat', { message: userMsg });
-            setMessages(prev => [...prev, { role: 'ai', content: res.data.reply }]);
+            // Stream tokens (Server-Sent Events) so the reply renders as it is generated
+            const res = await fetch('http://localhost:8000/api/v1/chat/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: userMsg }),
+            });
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+            setMessages(prev => [...prev, { role: 'ai', content: '' }]);
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let pending = '';
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                pending += decoder.decode(value, { stream: true });
+
+                const events = pending.split('\n\n');
+                pending = events.pop() ?? '';
+                for (const block of events) {
+                    const data = block.split('\n').find(line => line.startsWith('data: '));
+                    if (!data) continue;
+                    if (block.startsWith('event: error')) throw new Error(JSON.parse(data.slice(6)).detail);
+
+                    const token = JSON.parse(data.slice(6)).token;
+                    if (token) {
+                        setLoading(false);
+                        setMessages(prev => [
+                            ...prev.slice(0, -1),
+                            { role: 'ai', content: prev[prev.length - 1].content + token },
+                        ]);
+                    }
+                }
+            }
         } catch (err) {
             setMessages(prev => [...prev, { role: 'ai', content: "Error connecting to AI." }]);
         } finally {
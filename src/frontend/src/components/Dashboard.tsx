@@ -1,23 +1,35 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import axios from 'axios';
 import { AlertTriangle, Activity, ShieldCheck, RefreshCw } from 'lucide-react';
 import ChatAssistant from './ChatAssistant'; // Import the AI Component
 
 interface Anomaly {
+    id: string;
     device_id: string;
     risk_level: string;
     anomaly_score: number;
     detected_at: string;
 }
 
+// Alerts kept in the table; older rows are dropped as new ones arrive
+const MAX_ALERTS = 100;
+
 export default function Dashboard() {
     const [anomalies, setAnomalies] = useState<Anomaly[]>([]);
     const [lastUpdated, setLastUpdated] = useState<Date>(new Date());
+    // Newest alert seen so far; subsequent polls only fetch alerts after it
+    const latestCursor = useRef<string | null>(null);
 
     const fetchData = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/v1/anomalies');
-            setAnomalies(response.data.data);
+            const params = latestCursor.current ? { since: latestCursor.current } : {};
+            const response = await axios.get('http://localhost:8000/api/v1/anomalies', { params });
+            const fresh: Anomaly[] = response.data.data;
+            if (response.data.latest_cursor) latestCursor.current = response.data.latest_cursor;
+            if (fresh.length > 0) {
+                const ids = new Set(fresh.map(a => a.id));
+                setAnomalies(prev => [...fresh, ...prev.filter(a => !ids.has(a.id))].slice(0, MAX_ALERTS));
+            }
             setLastUpdated(new Date());
         } catch (error) {
             console.error("Failed to fetch telemetry", error);
@@ -26,7 +38,22 @@ export default function Dashboard() {
 
     useEffect(() => {
         fetchData(); // Initial fetch
-        const interval = setInterval(fetchData, 2000); // Poll every 2s
+
+        // Push: new HIGH-risk alerts arrive over Server-Sent Events as they are detected
+        if (typeof EventSource !== 'undefined') {
+            const source = new EventSource('http://localhost:8000/api/v1/anomalies/stream');
+            source.onmessage = (event) => {
+                const alert: Anomaly = JSON.parse(event.data);
+                setAnomalies(prev => [alert, ...prev.filter(a => a.id !== alert.id)].slice(0, MAX_ALERTS));
+                setLastUpdated(new Date());
+            };
+            // (Re)connected: catch up on anything missed while disconnected
+            source.onopen = () => fetchData();
+            return () => source.close();
+        }
+
+        // Fallback: incremental polling every 2s
+        const interval = setInterval(fetchData, 2000);
         return () => clearInterval(interval);
     }, []);
 
@@ -97,8 +124,8 @@ export default function Dashboard() {
                                 </tr>
                             </thead>
                             <tbody className="divide-y divide-gray-100">
-                                {anomalies.map((alert, idx) => (
-                                    <tr key={idx} className="hover:bg-blue-50 transition-colors">
+                                {anomalies.map((alert) => (
+                                    <tr key={alert.id} className="hover:bg-blue-50 transition-colors">
                                         <td className="px-6 py-4 font-medium text-slate-900">{alert.device_id}</td>
                                         <td className="px-6 py-4 text-slate-500">
                                             {new Date(alert.detected_at).toLocaleString()}